@@ -0,0 +1,134 @@
+"""
+Availability pre-pass for OR-Tools Schedule Solver
+Decides, before any variable exists, which (employee, date, shift) cells are
+really free. Cells pinned by absences, role rules, the first-day 11h history
+check or FIXED shifts become constants instead of decision variables.
+"""
+from models import SolverInput, ShiftType, SHIFT_CATALOG
+from typing import Dict, List, Optional, Tuple
+
+FIXED_TYPES = ("SHIFT", "FIXED", "FIXED_SHIFT")
+
+
+class Availability:
+    """
+    Per-employee availability bitmap.
+
+    free[emp_id][day_offset] is a bitmask over emp.allowed_shifts positions
+    (bit j set = allowed_shifts[j] is a free decision). fixed holds cells
+    pinned to 1 by hard FIXED shifts. Everything else is pinned to 0.
+    """
+
+    def __init__(self, input_data: SolverInput):
+        self.input_data = input_data
+        self.free: Dict[str, List[int]] = {}
+        self.fixed: Dict[Tuple[str, int], set] = {}  # (emp_id, offset) -> {shift position}
+
+    def is_free(self, emp_id: str, offset: int, position: int) -> bool:
+        return bool(self.free[emp_id][offset] >> position & 1)
+
+    def is_fixed(self, emp_id: str, offset: int, position: int) -> bool:
+        return position in self.fixed.get((emp_id, offset), ())
+
+    def stats(self) -> Dict[str, int]:
+        """Cell counts: free decision variables, cells pinned to 0 (pruned) and to 1"""
+        total = free = 0
+        for emp in self.input_data.employees:
+            full = (1 << len(emp.allowed_shifts)) - 1
+            for mask in self.free.get(emp.id, []):
+                total += len(emp.allowed_shifts)
+                free += bin(mask & full).count('1')
+        pinned = sum(len(positions) for positions in self.fixed.values())
+        return {
+            "cells": total,
+            "free": free,
+            "pruned": total - free - pinned,
+            "pinned": pinned,
+        }
+
+
+def build_availability(
+    input_data: SolverInput,
+    history_shifts: Dict[str, ShiftType],
+    frozen: Dict[str, Dict[str, Optional[str]]] = None,
+    prune: bool = True
+) -> Availability:
+    """
+    Build the availability bitmap. Mirrors the pins added later by
+    add_absence_constraints, add_role_based_shift_restrictions, the history
+    block of add_11h_rest_constraint and add_fixed_shift_constraints, so the
+    builders see constants where they would have forced a variable.
+
+    frozen[emp_id][date] = shift_id (or None = day off) pins whole cells,
+    e.g. everything outside the repair neighbourhood.
+
+    prune=False skips rules 1-4 (only frozen cells are pinned): the rules then
+    exist only as constraints, which explain mode needs to guard them.
+    """
+    cal = input_data.calendar
+    availability = Availability(input_data)
+    absences = input_data.get_absence_dates()
+
+    for emp in input_data.employees:
+        full = (1 << len(emp.allowed_shifts)) - 1
+        days = [full] * len(cal.dates)
+        if not prune:
+            availability.free[emp.id] = days
+            continue
+
+        # 1. Absencje - cały dzień wolny
+        for date_str in absences.get(emp.id, ()):
+            days[cal.offset[date_str]] = 0
+
+        # 2. LIDER: bez weekendów, bez startu przed 8:00 i końca po 20:00
+        if 'LIDER' in emp.roles:
+            blocked = 0
+            for position, shift_type in enumerate(emp.allowed_shifts):
+                if shift_type.start_hour < 8 or shift_type.end_hour > 20:
+                    blocked |= 1 << position
+            for i in range(len(days)):
+                if cal.weekday[i] >= 5:
+                    days[i] = 0
+                else:
+                    days[i] &= ~blocked
+
+        # 3. Historia - zmiany pierwszego dnia bez 11h odpoczynku
+        shift_before = history_shifts.get(emp.id)
+        if shift_before is not None and days:
+            for position, shift_now in enumerate(emp.allowed_shifts):
+                if SHIFT_CATALOG.is_forbidden(shift_before, shift_now):
+                    days[0] &= ~(1 << position)
+
+        availability.free[emp.id] = days
+
+    # 4. Zmiany wymuszone (FIXED) - komórka = 1, reszta dnia = 0 (jedna zmiana na dzień).
+    # Konflikt z regułami 1-3 zostaje w modelu jako sprzeczność (INFEASIBLE jak dotąd).
+    positions = {emp.id: {st.id: j for j, st in enumerate(emp.allowed_shifts)} for emp in input_data.employees}
+    for constraint in (input_data.constraints if prune else ()):
+        if constraint.type not in FIXED_TYPES or not constraint.is_hard:
+            continue
+        emp_positions = positions.get(constraint.employee_id)
+        offset = cal.offset.get(constraint.date)
+        if emp_positions is None or offset is None or constraint.value not in emp_positions:
+            continue
+
+        availability.fixed.setdefault((constraint.employee_id, offset), set()).add(emp_positions[constraint.value])
+        availability.free[constraint.employee_id][offset] = 0
+
+    # 5. Komórki zamrożone (repair) - wartość z gotowego grafiku
+    for emp_id, days in (frozen or {}).items():
+        emp_positions = positions.get(emp_id)
+        if emp_positions is None:
+            continue
+        for date_str, shift_id in days.items():
+            offset = cal.offset.get(date_str)
+            if offset is None:
+                continue
+            if shift_id and shift_id not in emp_positions:
+                raise ValueError(f"Frozen cell {emp_id} {date_str}: shift {shift_id} is not in allowedShifts")
+            availability.free[emp_id][offset] = 0
+            availability.fixed.pop((emp_id, offset), None)
+            if shift_id:
+                availability.fixed[(emp_id, offset)] = {emp_positions[shift_id]}
+
+    return availability
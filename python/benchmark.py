@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for OR-Tools Schedule Solver
+Solves synthetic instances (instance_generator.py) or JSON files in a child
+process, exactly like server.js does (scheduler_solver.py --events), and
+records per run: build time, time to the first feasible solution, time to
+within --gap % of the final bound, final objective / bound and peak RSS.
+
+Every run is appended to history.jsonl and history.csv (--history-dir) and
+compared with the previous run of the same case, so a slower or worse
+constraints.py shows up as a regression. POSIX only (events arrive on an extra pipe).
+
+Usage:
+    python3 benchmark.py                                  # default suite
+    python3 benchmark.py --preset month --seeds 1 2 3 --time-limit 60
+    python3 benchmark.py --instance ../data/real.json --gap 2
+    python3 benchmark.py --fail-on-regression             # exit 1 on regression (CI)
+    python3 benchmark.py --variant quadratic='{"fairness": "quadratic"}' \
+                         --variant linear='{"fairness": "linear"}'    # same cases, several option sets
+"""
+import os
+import sys
+import csv
+import json
+import time
+import platform
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from instance_generator import GeneratorConfig, PRESETS, generate_instance, config_from_args, add_generator_arguments
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOLVER = os.path.join(HERE, 'scheduler_solver.py')
+DEFAULT_HISTORY_DIR = os.path.join(HERE, 'benchmark_results')
+
+DEFAULT_SUITE = [("small", 1), ("month", 1), ("month", 2)]
+DEFAULT_TIME_LIMIT = 60.0
+DEFAULT_GAP_PERCENT = 5.0
+
+# Próg regresji względem poprzedniego przebiegu tego samego przypadku
+REGRESSION_THRESHOLDS = {
+    "build_seconds": 0.25,            # +25% czasu budowy
+    "first_feasible_seconds": 0.25,   # +25% do pierwszego rozwiązania
+    "peak_rss_mb": 0.25,              # +25% pamięci
+    "objective": 0.02,                # +2% gorszy wynik (minimalizacja)
+}
+# Poniżej tych wartości różnice to szum
+NOISE_FLOOR = {"build_seconds": 0.2, "first_feasible_seconds": 0.5, "peak_rss_mb": 10.0, "objective": 5.0}
+
+CSV_COLUMNS = [
+    "timestamp", "commit", "case", "seed", "employees", "days", "time_limit", "status", "exit_code",
+    "build_seconds", "first_feasible_seconds", "gap_target_percent", "seconds_to_gap",
+    "objective", "bound", "gap_percent", "solutions", "solve_seconds", "wall_seconds",
+    "variables", "constraints", "peak_rss_mb", "early_stop", "ortools", "python", "machine", "variant"
+]
+DEFAULT_VARIANT = "default"
+
+
+def git_commit() -> Optional[str]:
+    """Short hash of HEAD (+ '-dirty'), None outside a git checkout"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=HERE,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ortools_version() -> Optional[str]:
+    try:
+        from ortools import __version__
+        return __version__
+    except ImportError:
+        return None
+
+
+def gap_percent(objective: Optional[float], bound: Optional[float]) -> Optional[float]:
+    """Relative distance between objective and bound, in % of the objective"""
+    if objective is None or bound is None:
+        return None
+    return round(100.0 * abs(objective - bound) / max(abs(objective), 1.0), 3)
+
+
+def run_solver(input_json: Dict[str, Any], time_limit: float, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Solve input_json in a child process; returns the events it emitted,
+    its exit code, peak RSS (MB, POSIX only) and total wall time.
+    options are merged into input_json["options"] (benchmark variants).
+    """
+    input_json = dict(input_json)
+    input_json['options'] = {**input_json.get('options', {}), **(options or {}), "maxTimeSeconds": time_limit}
+
+    read_fd, write_fd = os.pipe()
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        [sys.executable, SOLVER, '--no-cache', '--events', str(write_fd)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        pass_fds=(write_fd,), cwd=HERE
+    )
+    os.close(write_fd)
+
+    events: List[Dict[str, Any]] = []
+
+    def read_events():
+        with os.fdopen(read_fd, 'r', encoding='utf-8') as stream:
+            for line in stream:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    pass
+
+    reader = threading.Thread(target=read_events, daemon=True)
+    reader.start()
+    payload = json.dumps(input_json).encode('utf-8')
+    peak_rss_mb = None
+    if hasattr(os, 'wait4'):
+        # Własne wait4 zamiast communicate(): rusage tylko tego procesu (peak RSS).
+        # Solver czyta całe wejście przed wypisaniem wyniku, więc kolejność jest bezpieczna.
+        proc.stdin.write(payload)
+        proc.stdin.close()
+        stdout_data = proc.stdout.read()
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # Linux: kB, macOS: bajty
+        peak_rss_mb = rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    else:
+        stdout_data, _ = proc.communicate(payload)
+    wall_seconds = time.monotonic() - started
+    reader.join()
+
+    try:
+        output = json.loads(stdout_data.decode('utf-8'))
+    except ValueError:
+        output = {}
+
+    return {
+        "events": events,
+        "output": output,
+        "exit_code": proc.returncode,
+        "peak_rss_mb": round(peak_rss_mb, 1) if peak_rss_mb is not None else None,
+        "wall_seconds": round(wall_seconds, 3),
+    }
+
+
+def summarize(run: Dict[str, Any], gap_target: float) -> Dict[str, Any]:
+    """Metrics of one run from its event stream"""
+    by_type: Dict[str, List[Dict[str, Any]]] = {}
+    for event in run["events"]:
+        by_type.setdefault(event["event"], []).append(event)
+
+    parse = (by_type.get("parse") or [{}])[0]
+    model = next((e for e in by_type.get("build", []) if e.get("phase") == "model"), {})
+    final = (by_type.get("final") or [{}])[-1]
+    incumbents = by_type.get("incumbent", [])
+    early_stop = (by_type.get("early_stop") or [{}])[0].get("reason")
+
+    objective = final.get("objective")
+    bound = final.get("bound")
+    if final.get("status") == "OPTIMAL":
+        bound = objective
+
+    # Pierwsze rozwiązanie w odległości gap_target % od końcowego ograniczenia
+    seconds_to_gap = None
+    if bound is not None:
+        for incumbent in incumbents:
+            if gap_percent(incumbent["objective"], bound) <= gap_target:
+                seconds_to_gap = incumbent["wall_time"]
+                break
+
+    build_seconds = None
+    if model and parse:
+        build_seconds = round(model["t"] - parse["t"], 3)
+
+    return {
+        "status": final.get("status") or run["output"].get("status") or "ERROR",
+        "exit_code": run["exit_code"],
+        "build_seconds": build_seconds,
+        "first_feasible_seconds": incumbents[0]["wall_time"] if incumbents else None,
+        "gap_target_percent": gap_target,
+        "seconds_to_gap": seconds_to_gap,
+        "objective": objective,
+        "bound": bound,
+        "gap_percent": gap_percent(objective, bound),
+        "solutions": len(incumbents),
+        "solve_seconds": final.get("solve_time"),
+        "wall_seconds": run["wall_seconds"],
+        "variables": model.get("variables"),
+        "constraints": model.get("constraints"),
+        "peak_rss_mb": run["peak_rss_mb"],
+        "early_stop": early_stop,
+    }
+
+
+def load_history(history_dir: str) -> List[Dict[str, Any]]:
+    path = os.path.join(history_dir, 'history.jsonl')
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def append_history(history_dir: str, records: List[Dict[str, Any]]):
+    """Append to history.jsonl (full records) and history.csv (flat columns)"""
+    os.makedirs(history_dir, exist_ok=True)
+    with open(os.path.join(history_dir, 'history.jsonl'), 'a', encoding='utf-8') as handle:
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    csv_path = os.path.join(history_dir, 'history.csv')
+    new_file = not os.path.exists(csv_path)
+    with open(csv_path, 'a', newline='', encoding='utf-8') as handle:
+        writer = csv.DictWriter(handle, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+        if new_file:
+            writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+
+
+def case_key(record: Dict[str, Any]) -> tuple:
+    """Runs are comparable only for the same instance, seed, time limit and variant"""
+    return (record["case"], record["seed"], record["time_limit"], record.get("variant", DEFAULT_VARIANT))
+
+
+def compare(record: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+    """Regressions of record against the previous run of the same case"""
+    if previous["status"] in ("OPTIMAL", "FEASIBLE") and record["status"] not in ("OPTIMAL", "FEASIBLE"):
+        return [f"status {previous['status']} -> {record['status']}"]
+
+    regressions = []
+    for metric, threshold in REGRESSION_THRESHOLDS.items():
+        old, new = previous.get(metric), record.get(metric)
+        if old is None or new is None:
+            continue
+        if new - old > max(abs(old) * threshold, NOISE_FLOOR[metric]):
+            regressions.append(f"{metric} {old} -> {new}")
+    return regressions
+
+
+def parse_variants(values: Optional[List[str]]) -> List[tuple]:
+    """--variant NAME=JSON options -> [(name, options)]; none = one default run"""
+    if not values:
+        return [(DEFAULT_VARIANT, {})]
+    variants = []
+    for value in values:
+        name, sep, options = value.partition('=')
+        if not sep or not name:
+            raise ValueError(f"--variant expects NAME=JSON, got {value!r}")
+        try:
+            parsed = json.loads(options)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"--variant {name}: invalid JSON ({e})")
+        if not isinstance(parsed, dict):
+            raise ValueError(f"--variant {name}: options must be a JSON object")
+        variants.append((name, parsed))
+    return variants
+
+
+def variant_table(records: List[Dict[str, Any]]) -> str:
+    """Side-by-side metrics of the variants, one line per case and variant"""
+    header = f"{'case':<16} {'seed':>4} {'variant':<12} {'status':<10} {'build s':>8} {'first s':>8} {'gap s':>8} {'objective':>10} {'bound':>10} {'gap %':>7}"
+    lines = [header, "-" * len(header)]
+    for record in sorted(records, key=lambda r: (r["case"], str(r["seed"]))):
+        cells = [record.get(key) for key in ("build_seconds", "first_feasible_seconds", "seconds_to_gap",
+                                               "objective", "bound", "gap_percent")]
+        shown = ["-" if value is None else f"{value:g}" for value in cells]
+        lines.append(f"{record['case']:<16} {str(record['seed']):>4} {record['variant']:<12} {record['status']:<10} "
+                     f"{shown[0]:>8} {shown[1]:>8} {shown[2]:>8} {shown[3]:>10} {shown[4]:>10} {shown[5]:>7}")
+    return "\n".join(lines)
+
+
+def build_cases(args: argparse.Namespace) -> List[tuple]:
+    """(case name, seed, input JSON) for every run"""
+    if args.instance:
+        cases = []
+        for path in args.instance:
+            with open(path, 'r', encoding='utf-8') as handle:
+                cases.append((os.path.basename(path), None, json.load(handle)))
+        return cases
+
+    custom = any(getattr(args, name) is not None for name in
+                 ("employees", "days", "leaders", "shift_mix", "absence_density",
+                  "preference_density", "demand_profile", "day_demand", "night_demand"))
+    if args.preset or custom:
+        base = config_from_args(args)
+        name = args.preset or f"custom-{base.employees}x{base.days}"
+        suite = [(name, seed, base) for seed in (args.seeds or [base.seed])]
+    else:
+        suite = [(name, seed, PRESETS[name]) for name, seed in DEFAULT_SUITE]
+
+    cases = []
+    for name, seed, base in suite:
+        config = GeneratorConfig(**{**base.__dict__, "seed": seed})
+        cases.append((name, seed, generate_instance(config)))
+    return cases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the schedule solver on synthetic or saved instances")
+    add_generator_arguments(parser)
+    parser.add_argument('--seeds', type=int, nargs='+', help="Generator seeds to run (one run each)")
+    parser.add_argument('--instance', nargs='+', metavar='JSON', help="Benchmark saved SolverInput files instead")
+    parser.add_argument('--time-limit', dest='time_limit', type=float, default=DEFAULT_TIME_LIMIT,
+                        help=f"maxTimeSeconds per run (default {DEFAULT_TIME_LIMIT:.0f})")
+    parser.add_argument('--gap', type=float, default=DEFAULT_GAP_PERCENT,
+                        help=f"Report time to within this %% of the final bound (default {DEFAULT_GAP_PERCENT:.0f})")
+    parser.add_argument('--history-dir', dest='history_dir', default=DEFAULT_HISTORY_DIR)
+    parser.add_argument('--no-history', dest='no_history', action='store_true', help="Do not append the results")
+    parser.add_argument('--fail-on-regression', dest='fail_on_regression', action='store_true')
+    parser.add_argument('--variant', action='append', metavar='NAME=JSON',
+                        help="Run every case with these solver options (repeat to compare variants)")
+    args = parser.parse_args(argv)
+
+    try:
+        cases = build_cases(args)
+        variants = parse_variants(args.variant)
+    except (ValueError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    history = load_history(args.history_dir)
+    context = {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "commit": git_commit(),
+        "ortools": ortools_version(),
+        "python": platform.python_version(),
+        "machine": f"{platform.machine()} x{os.cpu_count()}",
+    }
+
+    records = []
+    regressions = {}
+    for name, seed, instance in cases:
+        for variant, options in variants:
+            label = name if variant == DEFAULT_VARIANT else f"{name} [{variant}]"
+            print(f"Running {label} (seed {seed})...", file=sys.stderr)
+            metrics = summarize(run_solver(instance, args.time_limit, options), args.gap)
+            record = {
+                **context,
+                "case": name,
+                "seed": seed,
+                "variant": variant,
+                "options": options,
+                "employees": len(instance.get('employees', [])),
+                "days": len(instance.get('demand', {})),
+                "time_limit": args.time_limit,
+                **metrics,
+                "generator": instance.get('generator'),
+            }
+            records.append(record)
+
+            previous = next((r for r in reversed(history) if case_key(r) == case_key(record)), None)
+            found = compare(record, previous) if previous else []
+            if found:
+                regressions[f"{label}/{seed}"] = found
+            print(f"  {record['status']} build={record['build_seconds']}s first={record['first_feasible_seconds']}s "
+                  f"gap<={args.gap:g}%={record['seconds_to_gap']}s objective={record['objective']} "
+                  f"bound={record['bound']} rss={record['peak_rss_mb']}MB"
+                  + (f"  vs {previous['commit']}: REGRESSION {', '.join(found)}" if found else ""),
+                  file=sys.stderr)
+
+    if len(variants) > 1:
+        print(variant_table(records), file=sys.stderr)
+
+    if not args.no_history:
+        append_history(args.history_dir, records)
+
+    print(json.dumps({"runs": records, "regressions": regressions}, indent=2, ensure_ascii=False))
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
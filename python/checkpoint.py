@@ -0,0 +1,116 @@
+"""
+Incumbent checkpoints for OR-Tools Schedule Solver
+With options.checkpointPath an improving incumbent is written at most every
+options.checkpointSeconds as a solver output - improvements inside the
+interval are not extracted at all, the final incumbent is written once when
+the search ends. In two-phase mode the first phase schedule is written as
+soon as it exists:
+{"status": "SUCCESS", "schedule": ..., "stats": ...}.
+
+The file is replaced atomically, so a killed process leaves the last complete
+checkpoint behind. It can be passed back as options.previousSchedule (or
+with --resume PATH) to warm start the next run.
+"""
+import os
+import sys
+import json
+import time
+from datetime import datetime
+from ortools.sat.python import cp_model
+from models import SolverInput
+from typing import Any, Dict, List
+
+
+def incumbent_schedule(callback: cp_model.CpSolverSolutionCallback, shifts: Dict) -> Dict[str, Dict[str, str]]:
+    """
+    Schedule of the current incumbent (same shape as extract_schedule). One
+    Value() per cell - listeners use StoppingCallback.incumbent, which
+    extracts once per solution; also works with a finished CpSolver.
+    """
+    schedule: Dict[str, Dict[str, str]] = {}
+    for emp_id, days in shifts.items():
+        schedule[emp_id] = {}
+        for date_str, date_shifts in days.items():
+            for shift_type_id, shift_var in date_shifts.items():
+                if callback.Value(shift_var) == 1:
+                    schedule[emp_id][date_str] = shift_type_id
+                    break
+    return schedule
+
+
+def write_json_atomic(path: str, payload: Dict[str, Any]):
+    """Write to a temporary file in the same directory, then rename over path"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+class Checkpointer:
+    """Incumbent listener for StoppingCallback; writes improving incumbents, rate-limited"""
+
+    def __init__(self, input_data: SolverInput, shifts: Dict):
+        self.path: str = input_data.options.checkpoint_path
+        self.interval = input_data.options.checkpoint_seconds
+        self.shifts = shifts
+        self.date_range = list(input_data.date_range)
+        self.last_write = 0.0
+        self.writes = 0
+        self.behind = False  # poprawa w trakcie interwału - nie zapisana
+
+    def __call__(self, callback: cp_model.CpSolverSolutionCallback):
+        if not callback.improved:
+            return
+        if time.monotonic() - self.last_write < self.interval:
+            self.behind = True
+            return
+        self.write(callback.incumbent(self.shifts), {
+            "objective_value": callback.ObjectiveValue(),
+            "bound": callback.BestObjectiveBound(),
+            "solution": callback.solution_count,
+            "solve_time": round(callback.WallTime(), 3),
+        }, ["Checkpoint: best schedule found so far, the search was still running"])
+
+    def finish(self, solver: cp_model.CpSolver, callback: cp_model.CpSolverSolutionCallback, found: bool):
+        """End of the search: write the final incumbent if its improvement fell inside the interval"""
+        if not (self.behind and found):
+            return
+        self.write(incumbent_schedule(solver, self.shifts), {
+            "objective_value": solver.ObjectiveValue(),
+            "bound": solver.BestObjectiveBound(),
+            "solution": callback.solution_count,
+            "solve_time": round(solver.WallTime(), 3),
+        }, ["Checkpoint: best schedule of the finished search"])
+
+    def publish_first_phase(self, schedule: Dict[str, Dict[str, str]], first_phase: Dict[str, Any]):
+        """Write the two-phase mode's hard-rules schedule right away (not rate-limited)"""
+        self.write(schedule, {
+            "phase": "feasible",
+            "objective_value": first_phase.get("objective_value"),
+            "solve_time": first_phase["seconds"],
+        }, ["Checkpoint: first phase schedule (hard rules only), the optimisation was still running"])
+
+    def write(self, schedule: Dict[str, Dict[str, str]], stats: Dict[str, Any], violations: List[str]):
+        payload = {
+            "status": "SUCCESS",
+            "schedule": schedule,
+            "stats": {
+                "status": "CHECKPOINT",
+                **stats,
+                "date_range": self.date_range,
+                "written_at": datetime.now().isoformat(timespec='seconds'),
+            },
+            "violations": violations,
+            "error": None,
+        }
+        self.last_write = time.monotonic()
+        self.behind = False
+        try:
+            write_json_atomic(self.path, payload)
+        except OSError as e:
+            print(f"Warning: checkpoint not written to {self.path}: {e}", file=sys.stderr)
+            return
+        self.writes += 1
+
+    def report(self) -> Dict[str, Any]:
+        return {"path": self.path, "writes": self.writes}
@@ -3,44 +3,69 @@ Constraint builders for OR-Tools Schedule Solver
 Implements all hard and soft constraints from Polish Labor Law and project rules
 """
 from ortools.sat.python import cp_model
-from models import SolverInput, Employee, ShiftType, Constraint
+from models import SolverInput, Employee, ShiftType, Constraint, SHIFT_CATALOG, trailing_work_days, history_in_first_week
 from typing import Dict, List
-from datetime import datetime, timedelta
 import calendar
 import sys
+from derived_vars import DerivedVars, day_shift, night_start_shift
+from sequence_automata import add_sequence_automata
+from warm_start import add_stability_objective
+from profiler import run_builder
+from elastic import ElasticSlack, require_at_least, require_at_most
+from fairness import add_linear_hour_balancing, add_linear_weekend_fairness
 from role_constraints import (
     add_role_based_shift_restrictions,
     add_leader_support_constraint,
     add_leader_must_work_weekdays
 )
 
-def add_all_constraints(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, history_shifts: Dict[str, ShiftType]):
+def add_all_constraints(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, history_shifts: Dict[str, ShiftType], slack: ElasticSlack = None) -> DerivedVars:
     """
     Add all constraints to the model
+    Returns the shared DerivedVars layer (its stats go to SolverOutput.stats)
+    slack: elastic mode - relaxed hard rules add their slack there (and to the objective)
     """
+    # Wspólna warstwa wskaźników "czy pracuje" - jedna na model
+    derived = DerivedVars(model, shifts, input_data)
+
     # Ta linia jest kluczowa - przekazuje historię dalej
-    add_hard_constraints(model, shifts, input_data, history_shifts)
+    add_hard_constraints(model, shifts, input_data, history_shifts, derived, slack)
     
-    objectives = add_soft_constraints(model, shifts, input_data)
+    objectives = add_soft_constraints(model, shifts, input_data, derived)
+
+    # Tryb elastyczny: luz na twardych regułach z dużą karą
+    slack_penalty = slack.penalty() if slack is not None else None
+    if slack_penalty is not None:
+        objectives.append(slack_penalty)
     
     # Minimize total penalty from soft constraints
     if objectives:
         model.Minimize(sum(objectives))
 
-def add_hard_constraints(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, history_shifts: Dict[str, ShiftType]):
+    return derived
+
+def add_hard_constraints(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, history_shifts: Dict[str, ShiftType], derived: DerivedVars = None, slack: ElasticSlack = None):
     """
     Add all hard constraints (MUST be satisfied)
     """
-    print("Adding hard constraints...")
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+
+    print("Adding hard constraints...", file=sys.stderr)
     
     # 1. One shift per day (or day off)
-    add_one_shift_per_day(model, shifts, input_data)
+    run_builder("one_shift_per_day", "hard", add_one_shift_per_day, model, shifts, input_data)
     
     # 2. 11h daily rest
-    add_11h_rest_constraint(model, shifts, input_data, history_shifts)
+    run_builder("11h_rest", "hard", add_11h_rest_constraint, model, shifts, input_data, history_shifts)
     
-    # 3. 35h weekly rest (continuous)
-    add_35h_weekly_rest(model, shifts, input_data)
+    # 3 + 6. 35h weekly rest and max 5 consecutive work days
+    if input_data.options.sequence_encoding == "automaton":
+        # Jeden automat per pracownik zamiast okien przesuwnych
+        run_builder("sequence_automata", "hard", add_sequence_automata, model, shifts, input_data, derived)
+    else:
+        run_builder("35h_weekly_rest", "hard", add_35h_weekly_rest, model, shifts, input_data, derived)
+        run_builder("max_consecutive_days", "hard", add_max_consecutive_days, model, shifts, input_data, derived)
     
     # 4. 40h max per week
     #add_40h_weekly_limit(model, shifts, input_data)
@@ -48,46 +73,43 @@ def add_hard_constraints(model: cp_model.CpModel, shifts: Dict, input_data: Solv
     # 5. 2 night shifts -> 2 days off
     #add_night_shift_recovery(model, shifts, input_data)
     
-    # 6. Max 5 consecutive work days
-    add_max_consecutive_days(model, shifts, input_data)
-    
     # 7. Maria Pankowska special rules
     #add_maria_rules(model, shifts, input_data)
     
     # 🆕 Phase 2: Role-based constraints (replaces add_maria_rules)
-    add_role_based_shift_restrictions(model, shifts, input_data)
-    add_leader_support_constraint(model, shifts, input_data)
+    run_builder("role_restrictions", "hard", add_role_based_shift_restrictions, model, shifts, input_data)
+    run_builder("leader_support", "hard", add_leader_support_constraint, model, shifts, input_data, derived)
     
     # 8. Absences (L4, UW from existing schedule + user constraints)
-    add_absence_constraints(model, shifts, input_data)
+    run_builder("absences", "hard", add_absence_constraints, model, shifts, input_data)
     
     # 9. Minimum staffing (demand)
-    add_demand_constraints(model, shifts, input_data)
+    run_builder("demand", "hard", add_demand_constraints, model, shifts, input_data, derived, slack)
 
     # 10. Minimum one night shift per day
-    add_min_one_night_shift_per_day(model, shifts, input_data)
+    run_builder("min_one_night_shift", "hard", add_min_one_night_shift_per_day, model, shifts, input_data, slack)
 
     # --- 1. NOWOŚĆ: Obsługa walidacji ręcznej (wymuszanie zmian) ---
-    add_fixed_shift_constraints(model, shifts, input_data)
+    run_builder("fixed_shifts", "hard", add_fixed_shift_constraints, model, shifts, input_data)
     
     # --- 2. NOWOŚĆ: Ciągłość obsady 24h (Rano/Popołudnie/Noc) ---
-    add_coverage_constraints(model, shifts, input_data)
+    run_builder("coverage", "hard", add_coverage_constraints, model, shifts, input_data, slack)
     
     # --- 3. NOWOŚĆ: Wsparcie lidera (Lider nie może być sam) ---
     #add_leader_support_rule(model, shifts, input_data)
 
     # --- 4. NOWOŚĆ: Minimum jeden wolny weekend w miesiącu ---
-    add_min_one_free_weekend(model, shifts, input_data)
+    run_builder("min_one_free_weekend", "hard", add_min_one_free_weekend, model, shifts, input_data, derived, slack)
 
     # --- 5. NOWOŚĆ: Lider musi pracować każdy dzień roboczy ---
-    add_leader_must_work_weekdays(model, shifts, input_data)
+    run_builder("leader_weekdays", "hard", add_leader_must_work_weekdays, model, shifts, input_data, slack)
     
-    print("Hard constraints added successfully")
+    print("Hard constraints added successfully", file=sys.stderr)
 
 def add_one_shift_per_day(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
     """Each employee works at most one shift per day"""
     for emp in input_data.employees:
-        for date_str in input_data.get_date_list():
+        for date_str in input_data.calendar.dates:
             if emp.id in shifts and date_str in shifts[emp.id]:
                 day_shifts = list(shifts[emp.id][date_str].values())
                 if day_shifts:
@@ -95,7 +117,7 @@ def add_one_shift_per_day(model: cp_model.CpModel, shifts: Dict, input_data: Sol
 
 def add_11h_rest_constraint(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, history_shifts: Dict[str, ShiftType]):
     """Twoja funkcja z obsługą historii."""
-    dates = input_data.get_date_list()
+    dates = input_data.calendar.dates
     if not dates: return
     
     first_date = dates[0]
@@ -103,62 +125,64 @@ def add_11h_rest_constraint(model: cp_model.CpModel, shifts: Dict, input_data: S
         if emp.id in history_shifts:
             shift_before = history_shifts[emp.id]
             for shift_now in emp.allowed_shifts:
-                gap = calculate_rest_gap(shift_before, shift_now)
-                if gap < 11:
+                if SHIFT_CATALOG.is_forbidden(shift_before, shift_now):
                     if shift_now.id in shifts[emp.id][first_date]:
                         # print(f"DEBUG: Blocking {shift_now.id} for {emp.name} on {first_date}", file=sys.stderr)
                         model.Add(shifts[emp.id][first_date][shift_now.id] == 0)
 
-    for i in range(len(dates) - 1):
-        today = dates[i]
-        tomorrow = dates[i + 1]
-        for emp in input_data.employees:
-            if emp.id not in shifts or today not in shifts[emp.id] or tomorrow not in shifts[emp.id]: continue
+    for emp in input_data.employees:
+        if emp.id not in shifts: continue
+        
+        # Zakazane pary (dziś, jutro) z macierzy katalogu - liczone raz na zestaw zmian
+        forbidden = SHIFT_CATALOG.forbidden_pairs(emp.allowed_shifts)
+        if not forbidden: continue
+        
+        emp_shifts = shifts[emp.id]
+        for i in range(len(dates) - 1):
+            today_vars = emp_shifts.get(dates[i])
+            tomorrow_vars = emp_shifts.get(dates[i + 1])
+            if today_vars is None or tomorrow_vars is None: continue
             
-            for s1 in emp.allowed_shifts:
-                for s2 in emp.allowed_shifts:
-                    gap = calculate_rest_gap(s1, s2)
-                    if gap < 11:
-                        if s1.id in shifts[emp.id][today] and s2.id in shifts[emp.id][tomorrow]:
-                            v1 = shifts[emp.id][today][s1.id]
-                            v2 = shifts[emp.id][tomorrow][s2.id]
-                            model.AddImplication(v1, v2.Not())
+            for s1, s2 in forbidden:
+                if s1.id in today_vars and s2.id in tomorrow_vars:
+                    model.AddImplication(today_vars[s1.id], tomorrow_vars[s2.id].Not())
 
 def calculate_rest_gap(shift1: ShiftType, shift2: ShiftType) -> int:
-    """Oblicza przerwę w godzinach (NAPRAWIONA)."""
-    if shift1.start_hour > shift1.end_hour: # Nocka
-        return shift2.start_hour - shift1.end_hour
-    else:
-        return (24 - shift1.end_hour) + shift2.start_hour
+    """Oblicza przerwę w godzinach (z macierzy SHIFT_CATALOG)."""
+    return SHIFT_CATALOG.rest_gap(shift1, shift2)
 
-def add_35h_weekly_rest(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_35h_weekly_rest(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
     """
     35h continuous weekly rest
     This means at least 35 consecutive hours off per week
     Simplified: ensure at least 1 full day off per week
     """
-    dates = input_data.get_date_list()
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+    dates = input_data.calendar.dates
+    
+    # Dates grouped by ISO week (precomputed calendar)
+    weeks = input_data.calendar.weeks
+    
+    recent_history = input_data.get_recent_history()
     
     for emp in input_data.employees:
-        # Group dates by week
-        weeks = group_by_week(dates)
+        # Tydzień przecięty startem zakresu: dzień wolny z historii już spełnia regułę
+        first_week_done = None in history_in_first_week(recent_history.get(emp.id, []), input_data.calendar)
         
-        for week_dates in weeks:
+        for week_index, week_dates in enumerate(weeks):
             if emp.id not in shifts:
                 continue
+            if week_index == 0 and first_week_done:
+                continue
             
             # At least one day must be completely free
             days_off = []
             for date_str in week_dates:
-                if date_str in shifts[emp.id]:
-                    # Sum of all shifts on this day
-                    day_shifts = list(shifts[emp.id][date_str].values())
-                    if day_shifts:
-                        # Create a variable: is_day_off = (sum of shifts == 0)
-                        is_working = model.NewBoolVar(f'{emp.id}_{date_str}_working')
-                        model.Add(sum(day_shifts) >= 1).OnlyEnforceIf(is_working)
-                        model.Add(sum(day_shifts) == 0).OnlyEnforceIf(is_working.Not())
-                        days_off.append(is_working.Not())
+                # is_day_off = NOT is_working (shared indicator)
+                is_working = derived.is_working(emp.id, date_str)
+                if is_working is not None:
+                    days_off.append(is_working.Not())
             
             # At least one day off per week
             if days_off:
@@ -166,11 +190,11 @@ def add_35h_weekly_rest(model: cp_model.CpModel, shifts: Dict, input_data: Solve
 
 def add_40h_weekly_limit(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
     """Max 40 hours per week"""
-    dates = input_data.get_date_list()
+    dates = input_data.calendar.dates
+    
+    weeks = input_data.calendar.weeks
     
     for emp in input_data.employees:
-        weeks = group_by_week(dates)
-        
         for week_dates in weeks:
             if emp.id not in shifts:
                 continue
@@ -187,11 +211,13 @@ def add_40h_weekly_limit(model: cp_model.CpModel, shifts: Dict, input_data: Solv
             if weekly_hours:
                 model.Add(sum(weekly_hours) <= 40)
 
-def add_night_shift_recovery(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_night_shift_recovery(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
     """
     After 2 consecutive night shifts, employee must have 2 days off
     """
-    dates = input_data.get_date_list()
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+    dates = input_data.calendar.dates
     
     for emp in input_data.employees:
         # Find night shifts
@@ -207,26 +233,18 @@ def add_night_shift_recovery(model: cp_model.CpModel, shifts: Dict, input_data:
                 night1 = shifts[emp.id].get(day1, {}).get(night_shift.id)
                 night2 = shifts[emp.id].get(day2, {}).get(night_shift.id)
                 
-                if night1 and night2:
-                    # If both nights worked, day3 and day4 must be off
-                    both_nights = model.NewBoolVar(f'{emp.id}_nights_{day1}_{day2}')
-                    model.AddMultiplicationEquality(both_nights, [night1, night2])
-                    
-                    # Day 3 must be off
-                    if day3 in shifts[emp.id]:
-                        day3_shifts = list(shifts[emp.id][day3].values())
-                        if day3_shifts:
-                            model.Add(sum(day3_shifts) == 0).OnlyEnforceIf(both_nights)
-                    
-                    # Day 4 must be off
-                    if day4 in shifts[emp.id]:
-                        day4_shifts = list(shifts[emp.id][day4].values())
-                        if day4_shifts:
-                            model.Add(sum(day4_shifts) == 0).OnlyEnforceIf(both_nights)
-
-def add_max_consecutive_days(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+                if night1 is not None and night2 is not None:
+                    # If both nights worked, day3 and day4 must be off (clauses, no product)
+                    for day in (day3, day4):
+                        works = derived.is_working(emp.id, day)
+                        if works is not None:
+                            model.AddBoolOr([night1.Not(), night2.Not(), works.Not()])
+
+def add_max_consecutive_days(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
     """Max 5 consecutive work days"""
-    dates = input_data.get_date_list()
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+    dates = input_data.calendar.dates
     
     for emp in input_data.employees:
         if emp.id not in shifts:
@@ -238,18 +256,22 @@ def add_max_consecutive_days(model: cp_model.CpModel, shifts: Dict, input_data:
             # At least one day in this 6-day window must be off
             days_working = []
             for date_str in window:
-                if date_str in shifts[emp.id]:
-                    day_shifts = list(shifts[emp.id][date_str].values())
-                    if day_shifts:
-                        is_working = model.NewBoolVar(f'{emp.id}_{date_str}_work_check')
-                        model.Add(sum(day_shifts) >= 1).OnlyEnforceIf(is_working)
-                        model.Add(sum(day_shifts) == 0).OnlyEnforceIf(is_working.Not())
-                        days_working.append(is_working)
+                is_working = derived.is_working(emp.id, date_str)
+                if is_working is not None:
+                    days_working.append(is_working)
             
             # At least one day off in 6-day window
             if days_working:
                 model.Add(sum(days_working) <= 5)
 
+        # Okno 6 dni przecinające start zakresu: r dni pracy z historii + pierwsze 6-r dni
+        worked_before = min(trailing_work_days(input_data.get_recent_history().get(emp.id, [])), 5)
+        if worked_before and len(dates) >= 6 - worked_before:
+            days_working = [derived.is_working(emp.id, date_str) for date_str in dates[:6 - worked_before]]
+            days_working = [d for d in days_working if d is not None]
+            if days_working:
+                model.Add(sum(days_working) <= 5 - worked_before)
+
 #def add_maria_rules(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
 #"""
 #Special rules for Maria Pankowska (leader):
@@ -309,27 +331,23 @@ def add_absence_constraints(model: cp_model.CpModel, shifts: Dict, input_data: S
                 if day_shifts:
                     model.Add(sum(day_shifts) == 0)
         
-        # Date range absence
+        # Date range absence (only days inside the schedule range matter)
         if constraint.date_range:
             start_str, end_str = constraint.date_range
-            start = datetime.strptime(start_str, '%Y-%m-%d')
-            end = datetime.strptime(end_str, '%Y-%m-%d')
-            
-            current = start
-            while current <= end:
-                date_str = current.strftime('%Y-%m-%d')
+            for date_str in input_data.calendar.dates_between(start_str, end_str):
                 if date_str in shifts[emp_id]:
                     day_shifts = list(shifts[emp_id][date_str].values())
                     if day_shifts:
                         model.Add(sum(day_shifts) == 0)
-                current += timedelta(days=1)
 
-def add_demand_constraints(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_demand_constraints(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None, slack: ElasticSlack = None):
     """
     Minimum staffing requirements per day, split by shift type (day/night)
     Day shifts: start_hour < 20
     Night shifts: start_hour >= 20
     """
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
     for date_str, demand_spec in input_data.demand.items():
         min_day = demand_spec.day
         min_night = demand_spec.night
@@ -338,74 +356,58 @@ def add_demand_constraints(model: cp_model.CpModel, shifts: Dict, input_data: So
         if min_day > 0:
             day_workers = []
             for emp in input_data.employees:
-                if emp.id not in shifts or date_str not in shifts[emp.id]:
-                    continue
-                
-                # Sum only shifts that start before 20:00
-                day_shift_vars = []
-                for shift_type in emp.allowed_shifts:
-                    if shift_type.start_hour < 20:  # Day shift
-                        shift_var = shifts[emp.id][date_str].get(shift_type.id)
-                        if shift_var is not None:
-                            day_shift_vars.append(shift_var)
-                
-                if day_shift_vars:
-                    is_working_day = model.NewBoolVar(f'{emp.id}_{date_str}_day_demand')
-                    model.Add(sum(day_shift_vars) >= 1).OnlyEnforceIf(is_working_day)
-                    model.Add(sum(day_shift_vars) == 0).OnlyEnforceIf(is_working_day.Not())
+                # Only shifts that start before 20:00
+                is_working_day = derived.is_working(emp.id, date_str, day_shift, tag='day')
+                if is_working_day is not None:
                     day_workers.append(is_working_day)
             
             if day_workers:
-                model.Add(sum(day_workers) >= min_day)
+                require_at_least(model, slack, "demand", day_workers, min_day, date=date_str, shift="day")
         
         # Track night shift workers (shifts starting at or after 20:00)
         if min_night > 0:
             night_workers = []
             for emp in input_data.employees:
-                if emp.id not in shifts or date_str not in shifts[emp.id]:
-                    continue
-                
-                # Sum only shifts that start at or after 20:00
-                night_shift_vars = []
-                for shift_type in emp.allowed_shifts:
-                    if shift_type.start_hour >= 20:  # Night shift
-                        shift_var = shifts[emp.id][date_str].get(shift_type.id)
-                        if shift_var is not None:
-                            night_shift_vars.append(shift_var)
-                
-                if night_shift_vars:
-                    is_working_night = model.NewBoolVar(f'{emp.id}_{date_str}_night_demand')
-                    model.Add(sum(night_shift_vars) >= 1).OnlyEnforceIf(is_working_night)
-                    model.Add(sum(night_shift_vars) == 0).OnlyEnforceIf(is_working_night.Not())
+                # Only shifts that start at or after 20:00
+                is_working_night = derived.is_working(emp.id, date_str, night_start_shift, tag='night')
+                if is_working_night is not None:
                     night_workers.append(is_working_night)
             
             if night_workers:
-                model.Add(sum(night_workers) >= min_night)
+                require_at_least(model, slack, "demand", night_workers, min_night, date=date_str, shift="night")
 
-def add_soft_constraints(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput) -> List:
+def add_soft_constraints(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None) -> List:
     """
     Add soft constraints as weighted objectives
     Returns list of penalty terms
     """
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
     objectives = []
+
+    # Sformułowanie sprawiedliwości: kwadratowe (domyślne) albo liniowe (fairness.py)
+    if input_data.options.fairness == "linear":
+        hour_balancing, weekend_fairness = add_linear_hour_balancing, add_linear_weekend_fairness
+    else:
+        hour_balancing, weekend_fairness = add_hour_balancing_objective, add_weekend_fairness_objective
     
     # 1. Hour balancing (prefer equal hours among employees)
-    balance_penalty = add_hour_balancing_objective(model, shifts, input_data)
+    balance_penalty = run_builder("hour_balancing", "soft", hour_balancing, model, shifts, input_data, derived)
     if balance_penalty is not None:
         objectives.append(balance_penalty * 10)  # Weight: 10
     
     # 2. Weekend fairness
-    weekend_penalty = add_weekend_fairness_objective(model, shifts, input_data)
+    weekend_penalty = run_builder("weekend_fairness", "soft", weekend_fairness, model, shifts, input_data, derived)
     if weekend_penalty is not None:
         objectives.append(weekend_penalty * 5)  # Weight: 5
     
     # 3. Employee preferences
-    preference_penalty = add_preference_objective(model, shifts, input_data)
+    preference_penalty = run_builder("preferences", "soft", add_preference_objective, model, shifts, input_data, derived)
     if preference_penalty is not None:
         objectives.append(preference_penalty * 10)  # Weight: 10 (Boosted from 3 to make preferences stronger)
     
     # 3.5 FREE_TIME (soft absence) ← DODAJ TO
-    free_time_penalty = add_free_time_objective(model, shifts, input_data)
+    free_time_penalty = run_builder("free_time", "soft", add_free_time_objective, model, shifts, input_data, derived)
     if free_time_penalty is not None:
         objectives.append(free_time_penalty * 20)  # Weight: 20 (wyżej niż PREFERENCE)
 
@@ -413,62 +415,67 @@ def add_soft_constraints(model: cp_model.CpModel, shifts: Dict, input_data: Solv
 
     # 4. Soft 40h limit (Weight: 50 per hour over 40)
     # Przenosimy z HARD do SOFT
-    overtime_penalty = add_soft_40h_limit(model, shifts, input_data)
+    overtime_penalty = run_builder("40h_limit", "soft", add_soft_40h_limit, model, shifts, input_data, derived)
     if overtime_penalty is not None:
         objectives.append(overtime_penalty * 50) # 50 pkt kary za każdą nadgodzinę
 
     # 5. Soft Night Shift Recovery (Weight: 100 per violation)
     # Przenosimy z HARD do SOFT
-    recovery_penalty = add_soft_night_recovery(model, shifts, input_data)
+    recovery_penalty = run_builder("night_recovery", "soft", add_soft_night_recovery, model, shifts, input_data, derived)
     if recovery_penalty is not None:
         objectives.append(recovery_penalty * 100) # 100 pkt kary za brak regeneracji po nocce 
 
     # 6. Minimize Total Shifts (Prevent Overstaffing)
     # Weight: 1 per shift. This acts as a regularizer.
     # If other objectives are equal, prefer fewer shifts.
-    shifts_penalty = add_minimize_shifts_objective(model, shifts, input_data)
+    shifts_penalty = run_builder("minimize_shifts", "soft", add_minimize_shifts_objective, model, shifts, input_data)
     if shifts_penalty is not None:
         objectives.append(shifts_penalty * 2) # Weight 2 to ensure it's noticeable but doesn't override preferences
 
+    # 7. Stability (warm start) - kara za każdą komórkę zmienioną względem szkicu
+    # Weight: options.stabilityWeight (domyślnie 0 = wyłączone)
+    stability_penalty = run_builder("stability", "soft", add_stability_objective, model, shifts, input_data, derived)
+    if stability_penalty is not None:
+        objectives.append(stability_penalty * input_data.options.stability_weight)
+
     return objectives
 
-def add_hour_balancing_objective(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_hour_balancing_objective(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
     """Minimize difference in total hours between employees"""
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+    # Rolling horizon: godziny z zatwierdzonych dni przed oknem (liczy się tylko różnica)
+    hours_before = input_data.get_committed_hours()
+    base = min(hours_before.values(), default=0)
+
     # Calculate total hours for each employee
     employee_hours = []
     for emp in input_data.employees:
-        if emp.id not in shifts:
-            continue
-        
-        total_hours = []
-        for date_str in input_data.get_date_list():
-            if date_str in shifts[emp.id]:
-                for shift_type in emp.allowed_shifts:
-                    shift_var = shifts[emp.id][date_str].get(shift_type.id)
-                    if shift_var is not None:
-                        total_hours.append(shift_var * shift_type.hours)
-        
-        if total_hours:
-            emp_total = model.NewIntVar(0, 1000, f'{emp.id}_total_hours')
-            model.Add(emp_total == sum(total_hours))
-            employee_hours.append(emp_total)
+        emp_total = derived.total_hours(emp.id)
+        if emp_total is not None:
+            employee_hours.append(emp_total + (hours_before.get(emp.id, 0) - base))
     
     if len(employee_hours) < 2:
         return None
     
     # Minimize max - min
-    max_hours = model.NewIntVar(0, 1000, 'max_hours')
-    min_hours = model.NewIntVar(0, 1000, 'min_hours')
+    upper = 1000 + max(hours_before.values(), default=0) - base
+    max_hours = model.NewIntVar(0, upper, 'max_hours')
+    min_hours = model.NewIntVar(0, upper, 'min_hours')
     model.AddMaxEquality(max_hours, employee_hours)
     model.AddMinEquality(min_hours, employee_hours)
     
-    diff = model.NewIntVar(0, 1000, 'hours_diff')
+    diff = model.NewIntVar(0, upper, 'hours_diff')
     model.Add(diff == max_hours - min_hours)
     
     return diff
 
-def add_weekend_fairness_objective(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_weekend_fairness_objective(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
     """Prefer equal weekend work distribution"""
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+    # Rolling horizon: dni weekendowe przepracowane w zatwierdzonych dniach przed oknem
+    weekend_days_before = input_data.get_committed_weekend_days()
     weekend_counts = []
     
     for emp in input_data.employees:
@@ -476,20 +483,17 @@ def add_weekend_fairness_objective(model: cp_model.CpModel, shifts: Dict, input_
             continue
         
         weekend_shifts = []
-        for date_str in input_data.get_date_list():
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            if date_obj.weekday() >= 5:  # Weekend
-                if date_str in shifts[emp.id]:
-                    day_shifts = list(shifts[emp.id][date_str].values())
-                    if day_shifts:
-                        is_working = model.NewBoolVar(f'{emp.id}_{date_str}_weekend')
-                        model.Add(sum(day_shifts) >= 1).OnlyEnforceIf(is_working)
-                        weekend_shifts.append(is_working)
+        for date_str in input_data.calendar.dates:
+            if input_data.calendar.is_weekend(date_str):
+                is_working = derived.is_working(emp.id, date_str)
+                if is_working is not None:
+                    weekend_shifts.append(is_working)
         
         if weekend_shifts:
-            emp_weekends = model.NewIntVar(0, 100, f'{emp.id}_weekends')
-            model.Add(emp_weekends == sum(weekend_shifts))
-            weekend_counts.append(emp_weekends)
+            before = weekend_days_before.get(emp.id, 0)
+            emp_weekends = model.NewIntVar(0, 100 + before, f'{emp.id}_weekends')
+            model.Add(emp_weekends == sum(weekend_shifts) + before)
+            weekend_counts.append((emp_weekends, 100 + before))
     
     if len(weekend_counts) < 2:
         return None
@@ -501,30 +505,28 @@ def add_weekend_fairness_objective(model: cp_model.CpModel, shifts: Dict, input_
     # 0,3,3 -> 0+9+9 = 18 (worse)
     
     squares = []
-    for count in weekend_counts:
-        sq = model.NewIntVar(0, 10000, 'weekend_sq')
+    for count, upper in weekend_counts:
+        sq = model.NewIntVar(0, upper * upper, 'weekend_sq')
         model.AddMultiplicationEquality(sq, [count, count])
         squares.append(sq)
         
     return sum(squares)
 
-def add_min_one_free_weekend(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_min_one_free_weekend(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None, slack: ElasticSlack = None):
     """
     HARD CONSTRAINT:
     Ensure each employee has at least one full weekend off (Sat+Sun) in the schedule.
     Only applies if the schedule covers at least one full weekend.
+    Rolling horizon: counted over the whole range - committed weekends before
+    the window are known, and the rule waits for the window that holds the
+    last weekend of the range.
     """
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
     print("Adding min one free weekend constraint...", file=sys.stderr)
     
-    # 1. Identify weekends (Saturday dates)
-    weekend_starts = []
-    dates = input_data.get_date_list()
-    
-    for i, date_str in enumerate(dates):
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-        # If it's Saturday and next day (Sunday) is also in range
-        if date_obj.weekday() == 5 and i + 1 < len(dates):
-            weekend_starts.append(date_str)
+    # 1. Identify weekends (Saturday + Sunday both in range)
+    weekend_starts = input_data.range_calendar.weekends
             
     if not weekend_starts:
         return
@@ -536,34 +538,39 @@ def add_min_one_free_weekend(model: cp_model.CpModel, shifts: Dict, input_data:
         print(f"Skipping min_one_free_weekend constraint (only {len(weekend_starts)} weekend in range)", file=sys.stderr)
         return
 
+    # Rolling horizon: późniejsze okno obejmie pozostałe weekendy - tam reguła jest wymagana
+    if weekend_starts[-1][1] > input_data.calendar.dates[-1]:
+        print("Deferring min_one_free_weekend constraint to the window with the last weekend", file=sys.stderr)
+        return
+    committed = input_data.get_committed_shifts()
+
     # 2. For each employee, ensure at least one weekend is fully free
     for emp in input_data.employees:
         if emp.id not in shifts:
             continue
             
         weekend_worked_vars = []
-        
-        for sat_date in weekend_starts:
-            sat_obj = datetime.strptime(sat_date, '%Y-%m-%d')
-            sun_obj = sat_obj + timedelta(days=1)
-            sun_date = sun_obj.strftime('%Y-%m-%d')
-            
-            # Check if working on Sat OR Sun
-            # We create a bool var: is_working_weekend
-            is_working_weekend = model.NewBoolVar(f'{emp.id}_weekend_{sat_date}')
-            
-            day_shifts_sat = list(shifts[emp.id][sat_date].values())
-            day_shifts_sun = list(shifts[emp.id][sun_date].values())
-            
-            # If working any shift on Sat OR Sun => is_working_weekend = 1
-            # sum(shifts) >= 1  <==> is_working_weekend
-            all_weekend_shifts = day_shifts_sat + day_shifts_sun
-            if all_weekend_shifts:
-                model.Add(sum(all_weekend_shifts) >= 1).OnlyEnforceIf(is_working_weekend)
-                model.Add(sum(all_weekend_shifts) == 0).OnlyEnforceIf(is_working_weekend.Not())
+        committed_days = committed.get(emp.id, {})
+        free_before = False
+        
+        for sat_date, sun_date in weekend_starts:
+            # Dni zatwierdzone przed oknem (rolling horizon) są już znane
+            days_before = [d for d in (sat_date, sun_date) if d in committed_days]
+            if any(committed_days[d] is not None for d in days_before):
+                continue  # przepracowany - nie może być tym wolnym
+            if len(days_before) == 2:
+                free_before = True
+                break
+            if days_before:
+                # Sobota wolna przed oknem - decyduje niedziela
+                is_working_weekend = derived.is_working(emp.id, sun_date)
+            else:
+                # Check if working on Sat OR Sun (shared weekend flag)
+                is_working_weekend = derived.works_weekend(emp.id, sat_date, sun_date)
+            if is_working_weekend is not None:
                 weekend_worked_vars.append(is_working_weekend)
         
-        if weekend_worked_vars:
+        if weekend_worked_vars and not free_before:
             # Must have at least one free weekend
             # Sum of worked weekends <= Total weekends - 1
             # OR: Sum of free weekends >= 1
@@ -572,10 +579,12 @@ def add_min_one_free_weekend(model: cp_model.CpModel, shifts: Dict, input_data:
             # Note: If someone takes L4 for a month, this might be impossible if we count L4 as "work" (usually we don't)
             # But here shifts[] only contains working shifts (not absences), so L4 is naturally "free" from work.
             
-            model.Add(sum(weekend_worked_vars) < len(weekend_worked_vars))
+            require_at_most(model, slack, "min_one_free_weekend", weekend_worked_vars, len(weekend_worked_vars) - 1, employee=emp.id)
 
-def add_preference_objective(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_preference_objective(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
     """Handle soft employee preferences (PREFERENCE and FREE_TIME)"""
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
     penalties = []
     
     for constraint in input_data.constraints:
@@ -597,13 +606,7 @@ def add_preference_objective(model: cp_model.CpModel, shifts: Dict, input_data:
             
         # Handle date range FREE_TIME
         elif constraint.type == "FREE_TIME" and constraint.date_range:
-            start_date = datetime.strptime(constraint.date_range[0], '%Y-%m-%d')
-            end_date = datetime.strptime(constraint.date_range[1], '%Y-%m-%d')
-            
-            current = start_date
-            while current <= end_date:
-                target_dates.append(current.strftime('%Y-%m-%d'))
-                current += timedelta(days=1)
+            target_dates.extend(input_data.calendar.dates_between(*constraint.date_range))
         
         # Apply penalties/bonuses for working on these dates
         for date_str in target_dates:
@@ -627,36 +630,19 @@ def add_preference_objective(model: cp_model.CpModel, shifts: Dict, input_data:
             
             # STARE: Proste "wolne" (gdy brak preferred/avoid)
             else:
-                day_shifts = list(shifts[emp_id][date_str].values())
-                if day_shifts:
-                    # Create a boolean variable: is_working_on_preferred_off_day
-                    is_working = model.NewBoolVar(f'{emp_id}_{date_str}_pref_violation')
-                    model.Add(sum(day_shifts) >= 1).OnlyEnforceIf(is_working)
-                    model.Add(sum(day_shifts) == 0).OnlyEnforceIf(is_working.Not())
-                    
+                is_working = derived.is_working(emp_id, date_str)
+                if is_working is not None:
                     # Kara za pracę (użyj wagi z constraint)
                     penalties.append(is_working * constraint.weight)
         
     return sum(penalties) if penalties else None
 
-def group_by_week(dates: List[str]) -> List[List[str]]:
-    """Group dates by ISO week"""
-    weeks = {}
-    for date_str in dates:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-        week_key = date_obj.isocalendar()[:2]  # (year, week)
-        if week_key not in weeks:
-            weeks[week_key] = []
-        weeks[week_key].append(date_str)
-    
-    return list(weeks.values())
-
-def add_min_one_night_shift_per_day(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_min_one_night_shift_per_day(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, slack: ElasticSlack = None):
     """
     Ensures that there is always at least one person working the night shift (e.g. 20-8).
     This guarantees 24/7 coverage if day shifts cover the rest.
     """
-    dates = input_data.get_date_list()
+    dates = input_data.calendar.dates
     
     for date_str in dates:
         night_vars = []
@@ -674,53 +660,62 @@ def add_min_one_night_shift_per_day(model: cp_model.CpModel, shifts: Dict, input
         
         if night_vars:
             # Suma osób na nocce >= 1
-            model.Add(sum(night_vars) >= 1)
+            require_at_least(model, slack, "min_one_night_shift", night_vars, 1, date=date_str)
 
-def add_soft_40h_limit(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_soft_40h_limit(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
     """
     Soft constraint: Try to keep weekly hours <= 40.
     If > 40, penalty is proportional to excess.
     Hard limit is 48h (legal max with overtime).
     """
-    dates = input_data.get_date_list()
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+    dates = input_data.calendar.dates
     penalties = []
     
+    weeks = input_data.calendar.weeks
+    
+    recent_history = input_data.get_recent_history()
+    
     for emp in input_data.employees:
-        weeks = group_by_week(dates)
-        for week_dates in weeks:
+        # Godziny z historii w tygodniu przeciętym startem zakresu
+        hours_before = sum(
+            shift_type.hours
+            for shift_type in history_in_first_week(recent_history.get(emp.id, []), input_data.calendar)
+            if shift_type is not None
+        )
+        
+        for week_index, week_dates in enumerate(weeks):
             if emp.id not in shifts: continue
             
-            weekly_hours = []
-            for date_str in week_dates:
-                if date_str in shifts[emp.id]:
-                    for shift_type in emp.allowed_shifts:
-                        shift_var = shifts[emp.id][date_str].get(shift_type.id)
-                        if shift_var is not None:
-                            weekly_hours.append(shift_var * shift_type.hours)
-            
-            if weekly_hours:
-                total_week_hours = model.NewIntVar(0, 168, f'week_hours_{emp.id}_{week_dates[0]}')
-                model.Add(total_week_hours == sum(weekly_hours))
+            total_week_hours = derived.weekly_hours(emp.id, week_dates)
+            if total_week_hours is not None:
+                offset = hours_before if week_index == 0 else 0
                 
                 # HARD LIMIT: Max 48h (Kodeks Pracy z nadgodzinami)
-                model.Add(total_week_hours <= 48)
+                model.Add(total_week_hours + offset <= 48)
                 
                 # SOFT TARGET: Max 40h
                 # excess = max(0, total - 40)
                 excess = model.NewIntVar(0, 48, f'excess_{emp.id}_{week_dates[0]}')
                 # Logic: excess >= total - 40
-                model.Add(excess >= total_week_hours - 40)
+                model.Add(excess >= total_week_hours + offset - 40)
                 penalties.append(excess)
                 
     return sum(penalties) if penalties else None
 
 
-def add_soft_night_recovery(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_soft_night_recovery(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
     """
     Soft constraint: Prefer 2 days off after 2 consecutive night shifts.
     Violation penalty is applied if they work on day 3 or 4.
     """
-    dates = input_data.get_date_list()
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+    
+    is_night = lambda st: st.is_night
+    dates = input_data.calendar.dates
+    recent_history = input_data.get_recent_history()
     penalties = []
     
     for emp in input_data.employees:
@@ -730,34 +725,39 @@ def add_soft_night_recovery(model: cp_model.CpModel, shifts: Dict, input_data: S
         for i in range(len(dates) - 3):
             day1, day2, day3, day4 = dates[i:i+4]
             
-            # Sprawdź czy 2 noce z rzędu
-            # Uproszczenie: Sumujemy zmienne nocne. Jeśli suma = 2, to są 2 noce.
-            night_vars = []
-            for d in [day1, day2]:
-                for ns in night_shifts:
-                    v = shifts[emp.id].get(d, {}).get(ns.id)
-                    if v is not None: night_vars.append(v)
-            
-            if len(night_vars) < 2: continue # Nie ma opcji na 2 noce
+            # Sprawdź czy 2 noce z rzędu (wspólne wskaźniki nocy)
+            night1 = derived.is_working(emp.id, day1, is_night, tag='night_shift')
+            night2 = derived.is_working(emp.id, day2, is_night, tag='night_shift')
+            if night1 is None or night2 is None: continue # Nie ma opcji na 2 noce
             
-            two_nights = model.NewBoolVar(f'{emp.id}_2nights_{day1}')
-            # Jeśli suma nocnych zmian w day1 i day2 == 2, to two_nights = 1
-            model.Add(sum(night_vars) == 2).OnlyEnforceIf(two_nights)
-            model.Add(sum(night_vars) < 2).OnlyEnforceIf(two_nights.Not())
+            two_nights = derived.all_of([night1, night2], f'{emp.id}_2nights_{day1}')
             
             # Sprawdź czy pracuje w day3
-            day3_work_vars = list(shifts[emp.id][day3].values())
-            if day3_work_vars:
-                works_day3 = model.NewBoolVar(f'{emp.id}_works_{day3}')
-                model.Add(sum(day3_work_vars) >= 1).OnlyEnforceIf(works_day3)
-                model.Add(sum(day3_work_vars) == 0).OnlyEnforceIf(works_day3.Not())
-                
-                # Penalty: Jeśli (2 noce) ORAZ (pracuje w day3)
+            works_day3 = derived.is_working(emp.id, day3)
+            if works_day3 is not None:
+                # Penalty: Jeśli (2 noce) ORAZ (pracuje w day3) => violation3 = 1
                 violation3 = model.NewBoolVar(f'viol_recov3_{emp.id}_{day1}')
-                model.AddBoolAnd([two_nights, works_day3]).OnlyEnforceIf(violation3)
+                model.AddBoolOr([two_nights.Not(), works_day3.Not(), violation3])
                 penalties.append(violation3)
 
             # Analogicznie dla day4 (opcjonalnie, można odpuścić dla uproszczenia)
+        
+        # Noce tuż przed startem zakresu (historia wielodniowa)
+        history = recent_history.get(emp.id, [])
+        if len(history) >= 1 and history[-1] is not None and history[-1].is_night and dates:
+            if len(history) >= 2 and history[-2] is not None and history[-2].is_night:
+                # Noc, noc w historii -> day3 = pierwszy dzień zakresu
+                works_day3 = derived.is_working(emp.id, dates[0])
+                if works_day3 is not None:
+                    penalties.append(works_day3)
+            if len(dates) >= 2:
+                # Noc w historii + noc pierwszego dnia -> day3 = drugi dzień zakresu
+                night2 = derived.is_working(emp.id, dates[0], is_night, tag='night_shift')
+                works_day3 = derived.is_working(emp.id, dates[1])
+                if night2 is not None and works_day3 is not None:
+                    violation3 = model.NewBoolVar(f'viol_recov3_{emp.id}_{input_data.calendar.prev_day}')
+                    model.AddBoolOr([night2.Not(), works_day3.Not(), violation3])
+                    penalties.append(violation3)
             
     return sum(penalties) if penalties else None
 
@@ -769,7 +769,7 @@ def add_minimize_shifts_objective(model: cp_model.CpModel, shifts: Dict, input_d
     all_shifts = []
     for emp in input_data.employees:
         if emp.id not in shifts: continue
-        for date_str in input_data.get_date_list():
+        for date_str in input_data.calendar.dates:
             if date_str in shifts[emp.id]:
                 for shift_var in shifts[emp.id][date_str].values():
                     all_shifts.append(shift_var)
@@ -805,7 +805,30 @@ def add_fixed_shift_constraints(model: cp_model.CpModel, shifts: Dict, input_dat
             # Ostrzeżenie w logach, jeśli GUI wysłało zmianę, której model nie zna
             print(f"Warning: Forced shift '{target_shift_id}' not found for {emp_id} on {date_str}", file=sys.stderr)
 
-def add_coverage_constraints(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def covers_9(shift_type: ShiftType) -> bool:
+    """Zmiana obejmuje 9:00 (nocka 20-8 nie, nocka 20-10 tak)"""
+    if not shift_type.is_night:
+        return shift_type.start_hour <= 9 and shift_type.end_hour > 9
+    return shift_type.end_hour > 9
+
+
+def covers_17(shift_type: ShiftType) -> bool:
+    """Zmiana obejmuje 17:00 (nocka 16-4 tak, nocka 20-8 nie)"""
+    if not shift_type.is_night:
+        return shift_type.start_hour <= 17 and shift_type.end_hour > 17
+    return shift_type.start_hour <= 17
+
+
+def covers_1(shift_type: ShiftType) -> bool:
+    """Zmiana obejmuje 1:00 następnego dnia - tylko nocki (start > end), np. 20-8"""
+    return shift_type.is_night and shift_type.end_hour > 1
+
+
+# Punkty kontrolne ciągłości obsady 24/7 (add_coverage_constraints, screening)
+COVERAGE_POINTS = (("9:00", covers_9), ("17:00", covers_17), ("1:00", covers_1))
+
+
+def add_coverage_constraints(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, slack: ElasticSlack = None):
     """
     Gwarantuje ciągłość pracy 24/7 poprzez sprawdzanie pokrycia w kluczowych punktach czasowych.
     Zamiast stref, sprawdzamy czy ktoś pracuje o konkretnych godzinach:
@@ -813,65 +836,18 @@ def add_coverage_constraints(model: cp_model.CpModel, shifts: Dict, input_data:
     - 17:00 (pokrywa popołudnie, eliminuje luki 16-20)
     - 1:00 (pokrywa noc)
     """
-    for date_str in input_data.get_date_list():
-        staff_at_9 = []
-        staff_at_17 = []
-        staff_at_1 = [] # 1:00 dnia następnego (noc)
+    for date_str in input_data.calendar.dates:
+        for label, covers in COVERAGE_POINTS:
+            staff = []
+            for emp in input_data.employees:
+                if emp.id not in shifts or date_str not in shifts[emp.id]:
+                    continue
+                for shift_type in emp.allowed_shifts:
+                    if shift_type.id in shifts[emp.id][date_str] and covers(shift_type):
+                        staff.append(shifts[emp.id][date_str][shift_type.id])
 
-        for emp in input_data.employees:
-            if emp.id not in shifts or date_str not in shifts[emp.id]:
-                continue
-                
-            for shift_type in emp.allowed_shifts:
-                if shift_type.id in shifts[emp.id][date_str]:
-                    var = shifts[emp.id][date_str][shift_type.id]
-                    
-                    start = shift_type.start_hour
-                    end = shift_type.end_hour
-                    
-                    # Sprawdź pokrycie o 9:00
-                    # Zmiana dzienna: start <= 9 i end > 9
-                    # Zmiana nocna (rzadkość rano): start <= 9 lub end > 9
-                    covers_9 = False
-                    if not shift_type.is_night:
-                        if start <= 9 and end > 9: covers_9 = True
-                    else:
-                        # Nocka (np. 20-8) nie pokrywa 9:00. Nocka (20-10) pokrywa.
-                        if end > 9: covers_9 = True
-                    
-                    if covers_9: staff_at_9.append(var)
-
-                    # Sprawdź pokrycie o 17:00
-                    covers_17 = False
-                    if not shift_type.is_night:
-                        if start <= 17 and end > 17: covers_17 = True
-                    else:
-                        # Nocka (np. 16-4) pokrywa 17. Nocka (20-8) nie.
-                        if start <= 17: covers_17 = True
-                    
-                    if covers_17: staff_at_17.append(var)
-
-                    # Sprawdź pokrycie o 1:00 (noc)
-                    # To dotyczy nocy zaczynającej się w date_str i trwającej do dnia następnego.
-                    covers_1 = False
-                    if shift_type.is_night:
-                        # Nocka (start > end). Np. 20-8.
-                        # Pokrywa [start..24] i [0..end].
-                        # 1:00 mieści się w [0..end] jeśli end > 1.
-                        if end > 1: covers_1 = True
-                    else:
-                        # Zmiana dzienna (start < end). Np. 16-2.
-                        # Jeśli end > 24 (nieobsługiwane standardowo w prostym modelu int, ale sprawdźmy)
-                        # W tym modelu end może być > 24 tylko jeśli tak zdefiniowano.
-                        # Standardowo nocki mają is_night=True.
-                        pass
-                    
-                    if covers_1: staff_at_1.append(var)
-
-        # Wymuś minimum 1 osobę o każdej z tych godzin
-        if staff_at_9: model.Add(sum(staff_at_9) >= 1)
-        if staff_at_17: model.Add(sum(staff_at_17) >= 1)
-        if staff_at_1: model.Add(sum(staff_at_1) >= 1)
+            # Wymuś minimum 1 osobę o tej godzinie
+            if staff: require_at_least(model, slack, "coverage", staff, 1, date=date_str, point=label)
 
 def add_leader_support_rule(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
     """
@@ -884,7 +860,7 @@ def add_leader_support_rule(model: cp_model.CpModel, shifts: Dict, input_data: S
     if not leader: 
         return
 
-    for date_str in input_data.get_date_list():
+    for date_str in input_data.calendar.dates:
         if leader.id not in shifts or date_str not in shifts[leader.id]:
             continue
             
@@ -910,12 +886,14 @@ def add_leader_support_rule(model: cp_model.CpModel, shifts: Dict, input_data: S
         if support_staff:
             model.Add(sum(support_staff) >= 1).OnlyEnforceIf(leader_working)
 
-def add_free_time_objective(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+def add_free_time_objective(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
     """
     Handle FREE_TIME constraints (soft absence with date range).
     User wants time off but solver can override if necessary.
     Penalty is applied for each day worked during the requested period.
     """
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
     penalties = []
     
     for constraint in input_data.constraints:
@@ -933,25 +911,13 @@ def add_free_time_objective(model: cp_model.CpModel, shifts: Dict, input_data: S
             continue
         
         start_str, end_str = constraint.date_range
-        start = datetime.strptime(start_str, '%Y-%m-%d')
-        end = datetime.strptime(end_str, '%Y-%m-%d')
         
-        # Iteruj po każdym dniu w zakresie
-        current = start
-        while current <= end:
-            date_str = current.strftime('%Y-%m-%d')
-            
-            if date_str in shifts[emp_id]:
-                day_shifts = list(shifts[emp_id][date_str].values())
-                if day_shifts:
-                    # Utwórz zmienną: czy pracownik pracuje w tym dniu?
-                    is_working = model.NewBoolVar(f'free_time_violation_{emp_id}_{date_str}')
-                    model.Add(sum(day_shifts) >= 1).OnlyEnforceIf(is_working)
-                    model.Add(sum(day_shifts) == 0).OnlyEnforceIf(is_working.Not())
-                    
-                    # Kara za pracę w dniu wolnym
-                    penalties.append(is_working)
-            
-            current += timedelta(days=1)
+        # Iteruj po każdym dniu w zakresie (w obrębie grafiku)
+        for date_str in input_data.calendar.dates_between(start_str, end_str):
+            # Czy pracownik pracuje w tym dniu? (wspólny wskaźnik)
+            is_working = derived.is_working(emp_id, date_str)
+            if is_working is not None:
+                # Kara za pracę w dniu wolnym
+                penalties.append(is_working)
     
     return sum(penalties) if penalties else None
@@ -0,0 +1,228 @@
+"""
+Shared derived variables for OR-Tools Schedule Solver
+One cached layer per model for "is working" indicators, weekly hours and weekend flags
+"""
+from ortools.sat.python import cp_model
+from models import SolverInput, ShiftType
+from typing import Callable, Dict, List, Optional, Tuple
+
+ShiftFilter = Optional[Callable[[ShiftType], bool]]
+
+
+def day_shift(shift_type: ShiftType) -> bool:
+    """Zmiana dzienna: start przed 20:00"""
+    return shift_type.start_hour < 20
+
+
+def night_start_shift(shift_type: ShiftType) -> bool:
+    """Zmiana nocna w sensie demand: start od 20:00"""
+    return shift_type.start_hour >= 20
+
+
+class DerivedVars:
+    """
+    Cache of auxiliary variables derived from shifts[employee_id][date][shift_id].
+
+    Builders ask this layer for indicators instead of creating their own
+    reified BoolVar, so each (employee, date, shift subset) indicator exists
+    once per model no matter how many rules use it.
+    """
+
+    def __init__(self, model: cp_model.CpModel, shifts: Dict, input_data: SolverInput):
+        self.model = model
+        self.shifts = shifts
+        self.input_data = input_data
+        self._allowed = {emp.id: emp.allowed_shifts for emp in input_data.employees}
+        # Komórki przypięte do 0 przez availability mają wspólną stałą (NewConstant jest cache'owane)
+        self.zero = model.NewConstant(0)
+        self._zero_index = self.zero.Index()
+
+        self._working: Dict[Tuple, cp_model.IntVar] = {}
+        self._all_of: Dict[Tuple, cp_model.IntVar] = {}
+        self._weekend: Dict[Tuple, cp_model.IntVar] = {}
+        self._week_hours: Dict[Tuple, cp_model.IntVar] = {}
+        self._total_hours: Dict[str, cp_model.IntVar] = {}
+
+        # Indeksy ograniczeń definiujących zmienne pomocnicze (explain ich nie strzeże)
+        self.definitions: set = set()
+
+        self.created = 0   # nowe zmienne pomocnicze
+        self.reused = 0    # zapytania obsłużone z cache
+        self.direct = 0    # wskaźnik = sama zmienna zmiany (bez zmiennej pomocniczej)
+
+    def _define(self, constraint):
+        self.definitions.add(constraint.Index())
+        return constraint
+
+    # ------------------------------------------------------------------
+    # Shift variables
+    # ------------------------------------------------------------------
+    def day_vars(self, emp_id: str, date_str: str, shift_filter: ShiftFilter = None) -> List[Tuple[ShiftType, cp_model.IntVar]]:
+        """(ShiftType, BoolVar) pairs of an employee on a date, optionally filtered"""
+        day = self.shifts.get(emp_id, {}).get(date_str)
+        if not day:
+            return []
+
+        result = []
+        for shift_type in self._allowed.get(emp_id, []):
+            if shift_filter and not shift_filter(shift_type):
+                continue
+            var = day.get(shift_type.id)
+            if var is not None:
+                result.append((shift_type, var))
+        return result
+
+    # ------------------------------------------------------------------
+    # Indicators
+    # ------------------------------------------------------------------
+    def is_working(self, emp_id: str, date_str: str, shift_filter: ShiftFilter = None, tag: str = 'working'):
+        """
+        BoolVar == 1 iff the employee works any (matching) shift on date.
+        Returns None when no matching shift variable exists.
+        """
+        pairs = self.day_vars(emp_id, date_str, shift_filter)
+        if not pairs:
+            return None
+
+        key = (emp_id, date_str, tuple(shift_type.id for shift_type, _ in pairs))
+        cached = self._working.get(key)
+        if cached is not None:
+            self.reused += 1
+            return cached
+
+        # Stałe zera nie wnoszą nic do sumy
+        pairs = [(shift_type, var) for shift_type, var in pairs if var.Index() != self._zero_index]
+        if not pairs:
+            # Wszystkie zmiany przypięte do 0 - dzień na pewno wolny
+            self.direct += 1
+            indicator = self.zero
+        elif len(pairs) == 1:
+            # Jedna zmiana - wskaźnikiem jest sama zmienna
+            self.direct += 1
+            indicator = pairs[0][1]
+        else:
+            indicator = self.model.NewBoolVar(f'{emp_id}_{date_str}_{tag}')
+            # add_one_shift_per_day gwarantuje sum <= 1, więc wystarczy jedna równość
+            self._define(self.model.Add(sum(var for _, var in pairs) == indicator))
+            self.created += 1
+
+        self._working[key] = indicator
+        return indicator
+
+    def all_of(self, literals: List, name: str):
+        """BoolVar == AND(literals), cached by the set of literals"""
+        key = tuple(sorted(lit.Index() for lit in literals))
+        cached = self._all_of.get(key)
+        if cached is not None:
+            self.reused += 1
+            return cached
+
+        conj = self.model.NewBoolVar(name)
+        self._define(self.model.AddBoolAnd(literals)).OnlyEnforceIf(conj)
+        self._define(self.model.AddBoolOr([lit.Not() for lit in literals])).OnlyEnforceIf(conj.Not())
+        self.created += 1
+        self._all_of[key] = conj
+        return conj
+
+    def works_weekend(self, emp_id: str, sat_date: str, sun_date: str):
+        """BoolVar == 1 iff the employee works on Saturday or Sunday"""
+        key = (emp_id, sat_date, sun_date)
+        cached = self._weekend.get(key)
+        if cached is not None:
+            self.reused += 1
+            return cached
+
+        days = [d for d in (self.is_working(emp_id, sat_date), self.is_working(emp_id, sun_date)) if d is not None]
+        if not days:
+            return None
+
+        if len(days) == 1:
+            self.direct += 1
+            flag = days[0]
+        else:
+            flag = self.model.NewBoolVar(f'{emp_id}_weekend_{sat_date}')
+            self._define(self.model.AddMaxEquality(flag, days))
+            self.created += 1
+
+        self._weekend[key] = flag
+        return flag
+
+    # ------------------------------------------------------------------
+    # Hours
+    # ------------------------------------------------------------------
+    def hours_terms(self, emp_id: str, dates: List[str]) -> List:
+        """Linear terms shift_var * hours over the given dates"""
+        terms = []
+        for date_str in dates:
+            for shift_type, var in self.day_vars(emp_id, date_str):
+                if var.Index() != self._zero_index:
+                    terms.append(var * shift_type.hours)
+        return terms
+
+    def max_hours(self, emp_id: str, dates: List[str]) -> int:
+        """Upper bound of the employee's hours over dates (longest shift still possible each day)"""
+        total = 0
+        for date_str in dates:
+            total += max((shift_type.hours for shift_type, var in self.day_vars(emp_id, date_str)
+                          if var.Index() != self._zero_index), default=0)
+        return total
+
+    def weekly_hours(self, emp_id: str, week_dates: List[str]):
+        """IntVar with the employee's hours in the given week (None if no shifts)"""
+        key = (emp_id, tuple(week_dates))
+        cached = self._week_hours.get(key)
+        if cached is not None:
+            self.reused += 1
+            return cached
+
+        terms = self.hours_terms(emp_id, week_dates)
+        if not terms:
+            return None
+
+        total = self.model.NewIntVar(0, 168, f'week_hours_{emp_id}_{week_dates[0]}')
+        self._define(self.model.Add(total == sum(terms)))
+        self.created += 1
+        self._week_hours[key] = total
+        return total
+
+    def total_hours(self, emp_id: str):
+        """IntVar with the employee's hours over the whole range (None if no shifts)"""
+        cached = self._total_hours.get(emp_id)
+        if cached is not None:
+            self.reused += 1
+            return cached
+
+        terms = self.hours_terms(emp_id, self.input_data.calendar.dates)
+        if not terms:
+            return None
+
+        total = self.model.NewIntVar(0, 1000, f'{emp_id}_total_hours')
+        self._define(self.model.Add(total == sum(terms)))
+        self.created += 1
+        self._total_hours[emp_id] = total
+        return total
+
+    # ------------------------------------------------------------------
+    def owners(self) -> Dict[int, Tuple[str, Tuple[str, ...]]]:
+        """Auxiliary variable index -> (employee_id, dates it depends on)"""
+        owners = {}
+        for (emp_id, date_str, _), var in self._working.items():
+            owners.setdefault(var.Index(), (emp_id, (date_str,)))
+        for (emp_id, sat_date, sun_date), var in self._weekend.items():
+            owners.setdefault(var.Index(), (emp_id, (sat_date, sun_date)))
+        for (emp_id, week_dates), var in self._week_hours.items():
+            owners.setdefault(var.Index(), (emp_id, week_dates))
+        for emp_id, var in self._total_hours.items():
+            owners.setdefault(var.Index(), (emp_id, ()))
+        owners.pop(self._zero_index, None)
+        return owners
+
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, int]:
+        """How many auxiliaries were created and how many duplicates were avoided"""
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "direct": self.direct,
+            "saved": self.reused + self.direct,
+        }
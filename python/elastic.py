@@ -0,0 +1,89 @@
+"""
+Elastic mode for OR-Tools Schedule Solver
+With options.elastic the selected hard rules (demand, coverage, min one night
+shift, min one free weekend, LIDER weekdays) get an integer slack variable
+per constraint instead of failing the model:
+
+    sum(terms) + slack >= bound        (at least)
+    sum(terms) - slack <= bound        (at most)
+
+Every unit of slack costs options.elastic[rule] in the objective, so an
+over-constrained month still returns the "least bad" schedule and
+SolverOutput.stats["elastic"] lists exactly which slack was used.
+"""
+from ortools.sat.python import cp_model
+from models import SolverInput
+from typing import Any, Dict, List, Optional
+
+
+class ElasticSlack:
+    """Slack variables of one model, keyed by rule and place"""
+
+    def __init__(self, model: cp_model.CpModel, input_data: SolverInput):
+        self.model = model
+        self.penalties: Dict[str, int] = dict(input_data.options.elastic)
+        self.entries: List[Dict[str, Any]] = []  # {"rule", "var", "bound", "sense", + miejsce}
+
+    def relaxes(self, rule: str) -> bool:
+        return rule in self.penalties
+
+    def add(self, rule: str, terms: List, bound: int, sense: str, **where):
+        """Relaxed sum(terms) >= bound (sense "min") or <= bound (sense "max")"""
+        name = "_".join(str(value) for value in (rule, *where.values()))
+        slack = self.model.NewIntVar(0, max(bound, 1) if sense == "min" else len(terms), f"slack_{name}")
+        if sense == "min":
+            self.model.Add(sum(terms) + slack >= bound)
+        else:
+            self.model.Add(sum(terms) - slack <= bound)
+        self.entries.append({"rule": rule, "var": slack, "bound": bound, "sense": sense, **where})
+
+    def penalty(self):
+        """Objective term (None when nothing is relaxed)"""
+        if not self.entries:
+            return None
+        return sum(entry["var"] * self.penalties[entry["rule"]] for entry in self.entries)
+
+    def report(self, solver: cp_model.CpSolver) -> Dict[str, Any]:
+        """Slack actually used by the solution, per constraint and per rule"""
+        used = []
+        by_rule: Dict[str, int] = {}
+        for entry in self.entries:
+            value = solver.Value(entry["var"])
+            if not value:
+                continue
+            item = {key: entry[key] for key in entry if key not in ("var", "sense")}
+            item.update(slack=value, penalty=value * self.penalties[entry["rule"]])
+            used.append(item)
+            by_rule[entry["rule"]] = by_rule.get(entry["rule"], 0) + value
+        return {
+            "penalties": self.penalties,
+            "constraints": len(self.entries),
+            "used": used,
+            "slack_by_rule": by_rule,
+            "total_penalty": sum(item["penalty"] for item in used),
+        }
+
+
+def require_at_least(model: cp_model.CpModel, slack: Optional[ElasticSlack], rule: str, terms: List, bound: int, **where):
+    """sum(terms) >= bound - hard, or with slack when the rule is elastic"""
+    if slack is not None and slack.relaxes(rule):
+        slack.add(rule, terms, bound, "min", **where)
+    else:
+        model.Add(sum(terms) >= bound)
+
+
+def require_at_most(model: cp_model.CpModel, slack: Optional[ElasticSlack], rule: str, terms: List, bound: int, **where):
+    """sum(terms) <= bound - hard, or with slack when the rule is elastic"""
+    if slack is not None and slack.relaxes(rule):
+        slack.add(rule, terms, bound, "max", **where)
+    else:
+        model.Add(sum(terms) <= bound)
+
+
+def slack_messages(report: Dict[str, Any]) -> List[str]:
+    """One violation line per used slack"""
+    messages = []
+    for item in report.get("used", []):
+        where = ", ".join(f"{key}={item[key]}" for key in item if key not in ("rule", "bound", "slack", "penalty"))
+        messages.append(f"Elastic: {item['rule']} relaxed by {item['slack']} ({where})")
+    return messages
@@ -0,0 +1,76 @@
+"""
+Machine-readable progress events for OR-Tools Schedule Solver
+One JSON object per line (NDJSON) on a dedicated file descriptor, separate
+from the result (stdout) and human-readable logs (stderr).
+
+    {"event": "parse", "t": 0.004, "employees": 20, "days": 28}
+    {"event": "group", "t": 0.61, "kind": "hard", "name": "11h_rest", "seconds": 0.012}
+    {"event": "incumbent", "t": 3.2, "n": 4, "objective": 812.0, "bound": 310.0, "wall_time": 2.4}
+    {"event": "schedule", "t": 3.2, "n": 4, "mode": "diff", "changes": {...}}   (streaming.py)
+    {"event": "final", "t": 95.0, "status": "FEASIBLE", "objective": 640.0, ...}
+
+Disabled (a no-op) until open() is called, e.g. by --events FD.
+"""
+import os
+import json
+import time
+import threading
+import contextlib
+from typing import Any, Dict, Optional
+
+
+class EventStream:
+    """NDJSON writer on a raw file descriptor (one os.write per event, no buffering)"""
+
+    def __init__(self):
+        self._fd: Optional[int] = None
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()  # kontekst per wątek (np. id żądania w trybie worker)
+
+    @property
+    def enabled(self) -> bool:
+        return self._fd is not None
+
+    def open(self, fd: int):
+        """Start emitting to fd (must already be open, e.g. an extra pipe from the parent)"""
+        os.fstat(fd)  # OSError, jeśli rodzic nie otworzył deskryptora
+        self._fd = fd
+        self._start = time.monotonic()
+
+    def close(self):
+        self._fd = None
+
+    def emit(self, event: str, **fields: Any):
+        """Write one event line. Cheap no-op when the stream is disabled"""
+        if self._fd is None:
+            return
+        record = {"event": event, "t": round(time.monotonic() - self._start, 3)}
+        record.update(getattr(self._local, 'context', {}))
+        record.update(fields)
+        data = (json.dumps(record, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+        with self._lock:
+            try:
+                while data:
+                    written = os.write(self._fd, data)
+                    data = data[written:]
+            except OSError:
+                self._fd = None  # rodzic zamknął kanał - rozwiązujemy dalej bez zdarzeń
+
+    def context(self) -> Dict[str, Any]:
+        """Fields bound in this thread - to re-bind them in threads started by the solver"""
+        return dict(getattr(self._local, 'context', {}))
+
+    @contextlib.contextmanager
+    def bind(self, **context: Any):
+        """Add fields (e.g. id=request_id) to every event emitted by this thread"""
+        previous = getattr(self._local, 'context', {})
+        self._local.context = {**previous, **context}
+        try:
+            yield
+        finally:
+            self._local.context = previous
+
+
+# Jeden strumień na proces
+EVENTS = EventStream()
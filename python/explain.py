@@ -0,0 +1,278 @@
+"""
+Infeasibility explanation for OR-Tools Schedule Solver
+With options.explain the constraints of every builder are guarded by
+enforcement literals that go to CP-SAT as assumptions. On INFEASIBLE,
+SufficientAssumptionsForInfeasibility() names a subset of the literals that
+already conflicts; it is shrunk by re-solving without each literal (while
+time allows) and mapped back to rules, employees and dates.
+
+One literal per:
+    - user Constraint (ABSENCE, FIXED/SHIFT/FIXED_SHIFT)
+    - (builder, employee, first date) for single-employee constraints
+      (11h rest, consecutive days, role rules, ...)
+    - (builder, date) for constraints over several employees (demand, coverage)
+Definitions of DerivedVars auxiliaries are never guarded - turning them off
+only hides the rule that uses them. The availability pre-pass is off in this
+mode, so absences, role rules and history are real (guardable) constraints.
+"""
+import sys
+import time
+import contextlib
+from ortools.sat.python import cp_model
+from availability import FIXED_TYPES
+from derived_vars import DerivedVars
+from models import SolverInput
+from typing import Any, Dict, List, Optional, Tuple
+
+# Grupy, których ograniczenia pochodzą wprost z input_data.constraints
+USER_CONSTRAINT_GROUPS = {"absences": ("ABSENCE",), "fixed_shifts": FIXED_TYPES}
+
+# Ile sekund (maks.) na jedno rozwiązanie przy zmniejszaniu rdzenia
+MINIMIZE_STEP_SECONDS = 5.0
+
+Key = Tuple
+
+
+def _refs(ct) -> List[int]:
+    """Variable indices used by a constraint proto (negated literals folded back)"""
+    refs = list(ct.enforcement_literal)
+    if ct.has_linear():
+        refs.extend(ct.linear.vars)
+    elif ct.has_bool_or():
+        refs.extend(ct.bool_or.literals)
+    elif ct.has_bool_and():
+        refs.extend(ct.bool_and.literals)
+    elif ct.has_at_most_one():
+        refs.extend(ct.at_most_one.literals)
+    elif ct.has_exactly_one():
+        refs.extend(ct.exactly_one.literals)
+    elif ct.has_automaton():
+        for expr in ct.automaton.exprs:
+            refs.extend(expr.vars)
+        refs.extend(ct.automaton.vars)
+    return [ref if ref >= 0 else -ref - 1 for ref in refs]
+
+
+def _guardable(ct) -> bool:
+    return (ct.has_linear() or ct.has_bool_or() or ct.has_bool_and() or ct.has_at_most_one()
+            or ct.has_exactly_one() or ct.has_automaton())
+
+
+class ConstraintGuard:
+    """Records which builder added which constraints, then guards them with assumption literals"""
+
+    def __init__(self):
+        self.model: Optional[cp_model.CpModel] = None
+        self.groups: List[Tuple[str, str, int, int]] = []  # (name, kind, first, end)
+        self.items: Dict[int, Dict[str, Any]] = {}         # literal index -> opis
+        self.unguarded = 0
+
+    @property
+    def active(self) -> bool:
+        return self.model is not None
+
+    def start(self, model: cp_model.CpModel):
+        self.model = model
+        self.groups = []
+        self.items = {}
+        self.unguarded = 0
+
+    def stop(self):
+        self.model = None
+
+    @contextlib.contextmanager
+    def record(self, name: str, kind: str):
+        """Remember the constraint range added by one builder"""
+        if not self.active or kind == "setup":
+            yield
+            return
+        first = len(self.model.Proto().constraints)
+        yield
+        self.groups.append((name, kind, first, len(self.model.Proto().constraints)))
+
+    # ------------------------------------------------------------------
+    def guard(self, shifts: Dict, input_data: SolverInput, derived: DerivedVars) -> List[cp_model.IntVar]:
+        """Attach one enforcement literal per key; returns the assumption literals"""
+        proto = self.model.Proto()
+        owners = self._owners(shifts, derived)
+        user_index = self._user_constraint_index(input_data)
+        literals: Dict[Key, cp_model.IntVar] = {}
+
+        for name, kind, first, end in self.groups:
+            for index in range(first, end):
+                if index in derived.definitions:
+                    continue
+                ct = proto.constraints[index]
+                if not _guardable(ct):
+                    self.unguarded += 1
+                    continue
+
+                employees, dates = set(), set()
+                for ref in _refs(ct):
+                    owner = owners.get(ref)
+                    if owner is not None:
+                        employees.add(owner[0])
+                        dates.update(owner[1])
+
+                user = None
+                if name in USER_CONSTRAINT_GROUPS and len(employees) == 1 and dates:
+                    user = user_index.get((name, next(iter(employees)), min(dates)))
+                if user is not None:
+                    key: Key = ("constraint", user)
+                else:
+                    key = (name, next(iter(employees)) if len(employees) == 1 else None, min(dates) if dates else None)
+
+                lit = literals.get(key)
+                if lit is None:
+                    lit = self.model.NewBoolVar(f"explain_{len(literals)}")
+                    literals[key] = lit
+                    self.items[lit.Index()] = {"key": key, "rule": name, "kind": kind,
+                                               "employees": set(), "dates": set(), "constraints": 0}
+                item = self.items[lit.Index()]
+                item["employees"] |= employees
+                item["dates"] |= dates
+                item["constraints"] += 1
+                # Strażnik dopisany do istniejących (np. OnlyEnforceIf) - koniunkcja
+                ct.enforcement_literal.append(lit.Index())
+
+        return list(literals.values())
+
+    @staticmethod
+    def _owners(shifts: Dict, derived: DerivedVars) -> Dict[int, Tuple[str, Tuple[str, ...]]]:
+        """Variable index -> (employee_id, dates) for shift variables and DerivedVars auxiliaries"""
+        owners: Dict[int, Tuple[str, Tuple[str, ...]]] = {}
+        shared = set()
+        for emp_id, days in shifts.items():
+            for date_str, day in days.items():
+                for var in day.values():
+                    index = var.Index()
+                    if index in owners:
+                        shared.add(index)  # stałe 0/1 wspólne dla wielu komórek
+                    owners[index] = (emp_id, (date_str,))
+        for index in shared:
+            del owners[index]
+        for index, owner in derived.owners().items():
+            owners.setdefault(index, owner)
+        return owners
+
+    @staticmethod
+    def _user_constraint_index(input_data: SolverInput) -> Dict[Tuple[str, str, str], int]:
+        """(group, employee_id, date) -> index in input_data.constraints (first match wins)"""
+        index: Dict[Tuple[str, str, str], int] = {}
+        cal = input_data.calendar
+        for i, constraint in enumerate(input_data.constraints):
+            for group, types in USER_CONSTRAINT_GROUPS.items():
+                if constraint.type not in types or not constraint.employee_id:
+                    continue
+                dates = [constraint.date] if constraint.date else []
+                if constraint.date_range:
+                    dates.extend(cal.dates_between(*constraint.date_range))
+                for date_str in dates:
+                    index.setdefault((group, constraint.employee_id, date_str), i)
+        return index
+
+    # ------------------------------------------------------------------
+    def describe(self, literals: List[int], input_data: SolverInput) -> List[Dict[str, Any]]:
+        """Human-readable conflict items for a set of assumption literals"""
+        names = {emp.id: emp.name for emp in input_data.employees}
+        result = []
+        for lit in literals:
+            item = self.items[lit]
+            dates = sorted(item["dates"])
+            employees = sorted(item["employees"])
+            entry: Dict[str, Any] = {"rule": item["rule"], "kind": item["kind"], "dates": dates,
+                                     "constraints": item["constraints"]}
+            if item["key"][0] == "constraint":
+                constraint = input_data.constraints[item["key"][1]]
+                entry.update(rule=constraint.type, kind="constraint", constraintIndex=item["key"][1],
+                             description=constraint.description, employee=constraint.employee_id,
+                             employeeName=names.get(constraint.employee_id))
+                label = f"Constraint #{item['key'][1]} {constraint.type}"
+                if constraint.description:
+                    label += f" ({constraint.description})"
+            else:
+                label = item["rule"]
+                employee = item["key"][1]
+                if employee is not None:
+                    entry.update(employee=employee, employeeName=names.get(employee))
+                elif employees:
+                    entry["employees"] = employees
+
+            who = entry.get("employeeName") or entry.get("employee")
+            when = dates[0] if len(dates) == 1 else f"{dates[0]}..{dates[-1]}" if dates else None
+            entry["message"] = label + "".join(f", {part}" for part in (who, when) if part)
+            result.append(entry)
+
+        result.sort(key=lambda e: (e["kind"] != "constraint", e["dates"][:1], e["rule"]))
+        return result
+
+
+# Jeden strażnik na proces (rozwiązania i tak są sekwencyjne)
+GUARD = ConstraintGuard()
+
+
+@contextlib.contextmanager
+def guarding(model: cp_model.CpModel, enabled: bool):
+    """Record builder ranges inside the block (explain mode)"""
+    if not enabled:
+        yield GUARD
+        return
+    GUARD.start(model)
+    try:
+        yield GUARD
+    finally:
+        GUARD.stop()
+
+
+def _solver(seconds: float) -> cp_model.CpSolver:
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max(seconds, 0.1)
+    # Rdzeń założeń jest wiarygodny tylko przy wyszukiwaniu jednowątkowym
+    solver.parameters.num_workers = 1
+    return solver
+
+
+def _assume(model: cp_model.CpModel, by_index: Dict[int, cp_model.IntVar], indices: List[int]):
+    model.ClearAssumptions()
+    model.AddAssumptions([by_index[index] for index in indices])
+
+
+def find_conflict(model: cp_model.CpModel, assumptions: List[cp_model.IntVar], max_time: float) -> Tuple[int, cp_model.CpSolver, List[int], bool]:
+    """
+    Solve with all assumptions; on INFEASIBLE shrink the core by deletion.
+    Returns (status, solver of the first solve, core literal indices, core is minimal).
+    """
+    deadline = time.time() + max_time
+    by_index = {lit.Index(): lit for lit in assumptions}
+    _assume(model, by_index, list(by_index))
+    solver = _solver(max_time)
+    status = solver.Solve(model)
+    if status != cp_model.INFEASIBLE:
+        return status, solver, [], False
+
+    core = list(solver.SufficientAssumptionsForInfeasibility())
+    print(f"Explain: core of {len(core)} / {len(assumptions)} assumptions", file=sys.stderr)
+
+    # Usuwanie po jednym: jeśli bez literału nadal INFEASIBLE, nie jest potrzebny
+    minimal = True
+    i = 0
+    while i < len(core):
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            minimal = False
+            break
+        trial = core[:i] + core[i + 1:]
+        _assume(model, by_index, trial)
+        step = _solver(min(remaining, MINIMIZE_STEP_SECONDS))
+        step_status = step.Solve(model)
+        if step_status == cp_model.INFEASIBLE:
+            smaller = set(step.SufficientAssumptionsForInfeasibility())
+            core = [lit for lit in trial if lit in smaller] if smaller else trial
+        else:
+            if step_status != cp_model.FEASIBLE and step_status != cp_model.OPTIMAL:
+                minimal = False  # nie wiadomo - zostawiamy literał
+            i += 1
+
+    model.ClearAssumptions()
+    print(f"Explain: {len(core)} conflicting items (minimal: {minimal})", file=sys.stderr)
+    return status, solver, core, minimal
@@ -0,0 +1,80 @@
+"""
+Linear fairness objectives for OR-Tools Schedule Solver (options.fairness = "linear")
+Same objective values as add_hour_balancing_objective and
+add_weekend_fairness_objective, without the constraints that weaken the LP
+relaxation:
+    - hours range: max_hours >= total >= min_hours as plain inequalities
+      (exact at the optimum - the objective pushes both bounds onto the
+      extreme totals) with domains from DerivedVars.max_hours instead of 0..1000
+    - weekend squares: count^2 as the upper envelope of its chords,
+      sq >= (2k - 1) * count - k * (k - 1) for k = 1..n, which equals count^2
+      at every integer count
+"""
+from ortools.sat.python import cp_model
+from derived_vars import DerivedVars
+from models import SolverInput
+from typing import Dict
+
+
+def add_linear_hour_balancing(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
+    """Range of total hours (max - min) with linear constraints only"""
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+    # Rolling horizon: godziny z zatwierdzonych dni przed oknem (liczy się tylko różnica)
+    hours_before = input_data.get_committed_hours()
+    base = min(hours_before.values(), default=0)
+    totals, highs = [], []
+    for emp in input_data.employees:
+        total = derived.total_hours(emp.id)
+        if total is not None:
+            offset = hours_before.get(emp.id, 0) - base
+            totals.append(total + offset)
+            highs.append(derived.max_hours(emp.id, input_data.calendar.dates) + offset)
+
+    if len(totals) < 2:
+        return None
+
+    max_hours = model.NewIntVar(0, max(highs), 'max_hours')
+    min_hours = model.NewIntVar(0, min(highs), 'min_hours')
+    for total in totals:
+        model.Add(max_hours >= total)
+        model.Add(min_hours <= total)
+
+    diff = model.NewIntVar(0, max(highs), 'hours_diff')
+    model.Add(diff == max_hours - min_hours)
+    return diff
+
+
+def add_linear_weekend_fairness(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
+    """Sum of squared weekend-day counts, each square as a convex piecewise-linear bound"""
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+    weekend_days_before = input_data.get_committed_weekend_days()
+    squares = []
+    for emp in input_data.employees:
+        if emp.id not in shifts:
+            continue
+
+        weekend_shifts = []
+        for date_str in input_data.calendar.dates:
+            if input_data.calendar.is_weekend(date_str):
+                is_working = derived.is_working(emp.id, date_str)
+                if is_working is not None:
+                    weekend_shifts.append(is_working)
+        if not weekend_shifts:
+            continue
+
+        # Rolling horizon: count zaczyna się od dni weekendowych sprzed okna
+        before = weekend_days_before.get(emp.id, 0)
+        n = len(weekend_shifts)
+        count = model.NewIntVar(before, before + n, f'{emp.id}_weekends')
+        model.Add(count == sum(weekend_shifts) + before)
+        sq = model.NewIntVar(0, (before + n) ** 2, f'{emp.id}_weekend_sq')
+        for k in range(before + 1, before + n + 1):
+            # Cięciwa między (k-1)^2 a k^2 - dla całkowitych count maksimum cięciw = count^2
+            model.Add(sq >= (2 * k - 1) * count - k * (k - 1))
+        squares.append(sq)
+
+    if len(squares) < 2:
+        return None
+    return sum(squares)
@@ -0,0 +1,203 @@
+"""
+Incremental schedule validation for interactive grid edits
+Keeps the current violation set and per-day counters of one schedule. A cell
+edit only re-checks what it can change:
+    - 11h rest: the employee's pairs (d-1, d) and (d, d+1)
+    - consecutive days: the employee's run from d to the end of the next run
+    - coverage and leader support: day d (from the counters)
+    - leader rules: day d when the cell belongs to the leader
+and returns only the violations that appeared or disappeared. Messages and
+order are the same as validator.validate_schedule. Employees and dates are
+fixed when the state is created (a schedule without dateRange keeps the
+dates it had then).
+"""
+import numpy as np
+from typing import Any, Dict, List, Sequence, Tuple
+from models import MIN_DAILY_REST_HOURS
+from validator_engine import (
+    MAX_CONSECUTIVE_DAYS, ShiftTable, encode_schedule, rest_violation, coverage_violation,
+    support_violation, consecutive_violation, leader_violation, _run_position
+)
+
+# Klucze naruszeń sortują się w kolejności pełnego walidatora:
+#   (0, e, d)  11h rest (d = dzień "dziś")     (1, d, slot)  coverage
+#   (2, d, 0)  leader support                   (3, e, d)     max consecutive
+#   (4, d, kind) leader rules
+REST, COVERAGE, SUPPORT, CONSECUTIVE, LEADER = range(5)
+SLOTS = ("morning", "afternoon", "night_cover")
+
+Key = Tuple[int, int, int]
+
+
+class IncrementalValidator:
+    """Validation state of one schedule; apply() takes cell deltas"""
+
+    def __init__(self, input_data: Dict[str, Any]):
+        self.table = ShiftTable()
+        self.grid = encode_schedule(input_data, self.table)
+        self.codes = self.grid.codes  # (E, D), zmieniane w miejscu
+        self._refresh_lookup()
+
+        # Liczniki per dzień: sloty pokrycia i liczba pracujących
+        lut = self.table.arrays()
+        self.cover = np.stack([lut[slot][self.codes].sum(axis=0) for slot in SLOTS]).astype(np.int64)
+        self.working_count = lut["working"][self.codes].sum(axis=0).astype(np.int64)
+        self.violations: Dict[Key, Dict[str, Any]] = dict(self._full_scan())
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+    def _refresh_lookup(self):
+        """Python lists of the lookup arrays - faster than numpy for single cells"""
+        lut = self.table.arrays()
+        self._working = lut["working"].tolist()
+        self._gap = lut["rest_gap"].tolist()
+        self._slots = [lut[slot].tolist() for slot in SLOTS]
+        self._leader_bad = lut["leader_hours_bad"].tolist()
+        self._lookup_size = len(self.table.shifts)
+
+    def _full_scan(self) -> List[Tuple[Key, Dict[str, Any]]]:
+        """Every violation of the current matrix, with its key"""
+        grid, table, codes = self.grid, self.table, self.codes
+        found = []
+        if not grid.dates:
+            return found
+        lut = table.arrays()
+        working = lut["working"][codes]
+
+        if codes.shape[1] > 1:
+            gaps = lut["rest_gap"][codes[:, :-1], codes[:, 1:]]
+            bad = working[:, :-1] & working[:, 1:] & (gaps < MIN_DAILY_REST_HOURS)
+            for e, d in zip(*np.nonzero(bad)):
+                found.append(((REST, e, d), rest_violation(grid, table, e, d, codes[e, d], codes[e, d + 1], gaps[e, d])))
+
+        for d in range(len(grid.dates)):
+            found.extend(self._day_violations(d))
+
+        position = _run_position(working)
+        for e, d in zip(*np.nonzero((position > 0) & (position % (MAX_CONSECUTIVE_DAYS + 1) == 0))):
+            found.append(((CONSECUTIVE, e, d), consecutive_violation(grid, e, d)))
+        return [(tuple(int(x) for x in key), violation) for key, violation in found]
+
+    def current(self) -> List[Dict[str, Any]]:
+        """All current violations in validator order"""
+        return [self.violations[key] for key in sorted(self.violations)]
+
+    # ------------------------------------------------------------------
+    # Local checks
+    # ------------------------------------------------------------------
+    def _rest_pair(self, e: int, d: int) -> List[Tuple[Key, Dict[str, Any]]]:
+        today, tomorrow = int(self.codes[e, d]), int(self.codes[e, d + 1])
+        if self._working[today] and self._working[tomorrow]:
+            gap = self._gap[today][tomorrow]
+            if gap < MIN_DAILY_REST_HOURS:
+                return [((REST, e, d), rest_violation(self.grid, self.table, e, d, today, tomorrow, gap))]
+        return []
+
+    def _day_violations(self, d: int) -> List[Tuple[Key, Dict[str, Any]]]:
+        """Coverage, leader support and leader rules of day d"""
+        found = []
+        for slot in range(len(SLOTS)):
+            if self.cover[slot, d] == 0:
+                found.append(((COVERAGE, d, slot), coverage_violation(self.grid, d, slot)))
+
+        leader = self.grid.leader
+        if leader is not None:
+            code = int(self.codes[leader, d])
+            if self._working[code]:
+                if self.working_count[d] - 1 == 0:
+                    found.append(((SUPPORT, d, 0), support_violation(self.grid, d)))
+                if self.grid.weekend[d]:
+                    found.append(((LEADER, d, 0), leader_violation(self.grid, self.table, d, 0, code)))
+            if self._leader_bad[code]:
+                found.append(((LEADER, d, 1), leader_violation(self.grid, self.table, d, 1, code)))
+        return found
+
+    def _run_violations(self, e: int, first: int, last: int) -> List[Tuple[Key, Dict[str, Any]]]:
+        """Consecutive-day violations of employee e on days first..last"""
+        working = self._working
+        row = self.codes[e].tolist()
+        # Pozycja w serii liczona od początku serii, która obejmuje first
+        start = first
+        while start > 0 and working[row[start - 1]]:
+            start -= 1
+        found = []
+        position = 0
+        for d in range(start, last + 1):
+            position = position + 1 if working[row[d]] else 0
+            if d >= first and position and position % (MAX_CONSECUTIVE_DAYS + 1) == 0:
+                found.append(((CONSECUTIVE, e, d), consecutive_violation(self.grid, e, d)))
+        return found
+
+    # ------------------------------------------------------------------
+    # Edits
+    # ------------------------------------------------------------------
+    def apply(self, cells: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply cell deltas [{"employeeId", "date", "value"}] (empty value = clear).
+        Returns {"added": [...], "removed": [...], "ignored": n}; cells outside
+        the grid are ignored. A violation whose message changed is reported
+        as removed and added.
+        """
+        grid, codes = self.grid, self.codes
+        changed: Dict[int, List[int]] = {}
+        ignored = 0
+
+        for cell in cells:
+            e = grid.row.get(cell.get('employeeId'))
+            d = grid.col.get(cell.get('date'))
+            if e is None or d is None:
+                ignored += 1
+                continue
+            new = self.table.code(cell.get('value'))
+            if len(self.table.shifts) != self._lookup_size:
+                self._refresh_lookup()
+            old = int(codes[e, d])
+            if new == old:
+                continue
+            for slot in range(len(SLOTS)):
+                self.cover[slot, d] += self._slots[slot][new] - self._slots[slot][old]
+            self.working_count[d] += self._working[new] - self._working[old]
+            codes[e, d] = new
+            changed.setdefault(e, []).append(d)
+
+        # Klucze do przeliczenia i ich nowe wartości
+        keys: set = set()
+        fresh: Dict[Key, Dict[str, Any]] = {}
+        last_day = len(grid.dates) - 1
+        days = set()
+        for e, touched in changed.items():
+            for d in touched:
+                days.add(d)
+                for pair in (d - 1, d):
+                    if 0 <= pair < last_day:
+                        keys.add((REST, e, pair))
+                        fresh.update(self._rest_pair(e, pair))
+
+            # Serie: od najwcześniejszej zmiany do końca serii za najpóźniejszą
+            first = min(touched)
+            last = max(touched)
+            while last < last_day and self._working[int(codes[e, last + 1])]:
+                last += 1
+            keys.update((CONSECUTIVE, e, d) for d in range(first, last + 1))
+            fresh.update(self._run_violations(e, first, last))
+
+        for d in days:
+            keys.update((COVERAGE, d, slot) for slot in range(len(SLOTS)))
+            keys.update(((SUPPORT, d, 0), (LEADER, d, 0), (LEADER, d, 1)))
+            fresh.update(self._day_violations(d))
+
+        added, removed = [], []
+        for key in sorted(keys):
+            before = self.violations.get(key)
+            after = fresh.get(key)
+            if before == after:
+                continue
+            if before is not None:
+                removed.append(before)
+                del self.violations[key]
+            if after is not None:
+                added.append(after)
+                self.violations[key] = after
+
+        return {"added": added, "removed": removed, "ignored": ignored}
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Synthetic SolverInput generator for OR-Tools Schedule Solver
+Seeded, so the same config + seed always gives the same JSON (benchmarks
+compare like with like across commits).
+
+Usage:
+    python3 instance_generator.py --employees 20 --days 28 --seed 1 > instance.json
+    python3 instance_generator.py --preset quarter --seed 3 > instance.json
+"""
+import sys
+import json
+import random
+import argparse
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+# Zestawy zmian przydzielane pracownikom (WYCHOWAWCA)
+SHIFT_MIXES = {
+    "standard": ["8-16", "14-22", "20-8"],
+    "long": ["8-20", "20-8"],
+    "mixed": ["8-16", "14-22", "20-8", "8-20"],
+    "day_only": ["8-16", "14-22", "8-20"],
+}
+LEADER_SHIFTS = ["8-16"]
+
+DEMAND_PROFILES = ("flat", "weekend_light", "weekday_peak", "random")
+
+
+@dataclass
+class GeneratorConfig:
+    """Parameters of one synthetic instance"""
+    employees: int = 20
+    days: int = 28
+    start: str = "2026-02-02"          # poniedziałek
+    leaders: int = 1                   # LIDER (bez weekendów, 8-16)
+    shift_mix: Dict[str, float] = field(default_factory=lambda: {"mixed": 0.6, "standard": 0.3, "long": 0.1})
+    absence_density: float = 0.03      # szansa, że dzień pracownika rozpoczyna nieobecność
+    absence_max_days: int = 5          # długość bloku nieobecności: 1..absence_max_days
+    preference_density: float = 0.05   # szansa na miękką preferencję wolnego na dzień
+    demand_profile: str = "flat"
+    day_demand: int = 0                # 0 = dobierz do liczby pracowników
+    night_demand: int = 0
+    seed: int = 1
+
+    def validate(self):
+        if self.employees < 1 or self.days < 1:
+            raise ValueError("employees and days must be >= 1")
+        if not 0 <= self.leaders <= self.employees:
+            raise ValueError(f"leaders must be between 0 and employees ({self.employees})")
+        unknown = set(self.shift_mix) - set(SHIFT_MIXES)
+        if unknown:
+            raise ValueError(f"Unknown shift mix: {sorted(unknown)} (expected {sorted(SHIFT_MIXES)})")
+        if self.demand_profile not in DEMAND_PROFILES:
+            raise ValueError(f"demand_profile must be one of {DEMAND_PROFILES}, got {self.demand_profile!r}")
+        datetime.strptime(self.start, '%Y-%m-%d')
+
+
+# Rozmiary zbliżone do realnych grafików
+PRESETS = {
+    "small": GeneratorConfig(employees=6, days=7),
+    "month": GeneratorConfig(employees=15, days=28),
+    "large_month": GeneratorConfig(employees=30, days=31, leaders=2),
+    "quarter": GeneratorConfig(employees=20, days=91),
+}
+
+
+def _demand_for(config: GeneratorConfig, rng: random.Random, date: datetime) -> Dict[str, int]:
+    """Demand of one day according to config.demand_profile"""
+    staff = config.employees - config.leaders
+    day = config.day_demand or max(1, staff // 6)
+    night = config.night_demand or max(1, staff // 15)
+    weekend = date.weekday() >= 5
+
+    if config.demand_profile == "weekend_light" and weekend:
+        day = max(1, day - 1)
+    elif config.demand_profile == "weekday_peak" and not weekend:
+        day += 1
+    elif config.demand_profile == "random":
+        day = max(1, day + rng.choice((-1, 0, 0, 1)))
+    return {"day": day, "night": night}
+
+
+def generate_instance(config: GeneratorConfig) -> Dict[str, Any]:
+    """SolverInput JSON (same format as test_input.json / server.js)"""
+    config.validate()
+    rng = random.Random(config.seed)
+    start = datetime.strptime(config.start, '%Y-%m-%d')
+    dates = [start + timedelta(days=i) for i in range(config.days)]
+    iso = [date.strftime('%Y-%m-%d') for date in dates]
+
+    mixes = sorted(config.shift_mix)
+    weights = [config.shift_mix[name] for name in mixes]
+
+    employees = []
+    for i in range(config.employees):
+        if i < config.leaders:
+            employees.append({
+                "id": f"L{i + 1}",
+                "name": f"Lider {i + 1}",
+                "roles": ["LIDER"],
+                "allowedShifts": list(LEADER_SHIFTS),
+                "preferences": {},
+                "specialRules": {"isLeader": True}
+            })
+            continue
+        mix = rng.choices(mixes, weights)[0]
+        employees.append({
+            "id": f"E{i + 1}",
+            "name": f"Wychowawca {i + 1}",
+            "roles": ["WYCHOWAWCA"],
+            "allowedShifts": list(SHIFT_MIXES[mix]),
+            "preferences": {},
+            "specialRules": {}
+        })
+
+    constraints = []
+    for emp in employees:
+        # LIDER musi pracować w każdy dzień roboczy (twarda reguła) - bez losowych nieobecności
+        can_be_absent = "LIDER" not in emp["roles"]
+        offset = 0
+        while offset < config.days:
+            if can_be_absent and rng.random() < config.absence_density:
+                length = rng.randint(1, config.absence_max_days)
+                last = min(offset + length, config.days) - 1
+                constraints.append({
+                    "type": "ABSENCE",
+                    "employeeId": emp["id"],
+                    "dateRange": [iso[offset], iso[last]],
+                    "description": "Nieobecność (wygenerowana)",
+                    "isHard": True
+                })
+                offset = last + 2
+                continue
+            if rng.random() < config.preference_density:
+                constraints.append({
+                    "type": "PREFERENCE",
+                    "employeeId": emp["id"],
+                    "date": iso[offset],
+                    "description": "Prośba o wolne (wygenerowana)",
+                    "isHard": False
+                })
+            offset += 1
+
+    demand = {iso[i]: _demand_for(config, rng, date) for i, date in enumerate(dates)}
+
+    return {
+        "employees": employees,
+        "constraints": constraints,
+        "dateRange": {"start": iso[0], "end": iso[-1]},
+        "demand": demand,
+        "existingSchedule": {},
+        "generator": asdict(config)  # ignorowane przez parse_input, zostaje dla powtarzalności
+    }
+
+
+def config_from_args(args: argparse.Namespace) -> GeneratorConfig:
+    """Preset (if any) overridden by explicit command-line values"""
+    config = GeneratorConfig(**asdict(PRESETS[args.preset])) if args.preset else GeneratorConfig()
+    for name in ("employees", "days", "start", "leaders", "absence_density", "absence_max_days",
+                 "preference_density", "demand_profile", "day_demand", "night_demand", "seed"):
+        value = getattr(args, name)
+        if value is not None:
+            setattr(config, name, value)
+    if args.shift_mix:
+        config.shift_mix = json.loads(args.shift_mix)
+    return config
+
+
+def add_generator_arguments(parser: argparse.ArgumentParser):
+    """Generator options, shared with benchmark.py"""
+    parser.add_argument('--preset', choices=sorted(PRESETS))
+    parser.add_argument('--employees', type=int)
+    parser.add_argument('--days', type=int)
+    parser.add_argument('--start', help="First date, YYYY-MM-DD")
+    parser.add_argument('--leaders', type=int)
+    parser.add_argument('--shift-mix', dest='shift_mix',
+                        help='JSON weights, e.g. \'{"mixed": 0.5, "long": 0.5}\'')
+    parser.add_argument('--absence-density', dest='absence_density', type=float)
+    parser.add_argument('--absence-max-days', dest='absence_max_days', type=int)
+    parser.add_argument('--preference-density', dest='preference_density', type=float)
+    parser.add_argument('--demand-profile', dest='demand_profile', choices=DEMAND_PROFILES)
+    parser.add_argument('--day-demand', dest='day_demand', type=int)
+    parser.add_argument('--night-demand', dest='night_demand', type=int)
+    parser.add_argument('--seed', type=int)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic SolverInput JSON")
+    add_generator_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        instance = generate_instance(config_from_args(args))
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps(instance, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
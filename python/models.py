@@ -1,22 +1,62 @@
 """
 Data models for OR-Tools Schedule Solver
 """
+import re
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any
-from datetime import date, datetime
+from typing import List, Dict, Optional, Any, Tuple
+from datetime import date, datetime, timedelta
+
+MIN_DAILY_REST_HOURS = 11
+
+
+def rest_gap(shift1, shift2) -> int:
+    """Przerwa w godzinach między końcem shift1 a startem shift2 następnego dnia"""
+    if shift1.start_hour > shift1.end_hour:  # Nocka
+        return shift2.start_hour - shift1.end_hour
+    else:
+        return (24 - shift1.end_hour) + shift2.start_hour
+
 
-@dataclass
 class ShiftType:
-    """Typ zmiany (np. 8-16, 14-22, 20-8)"""
-    id: str              # "8-16"
-    start_hour: int      # 8
-    end_hour: int        # 16
-    hours: int           # 8 (or 12 for night shifts crossing midnight)
-    is_night: bool = False  # True if 20-8
-    
+    """
+    Typ zmiany (np. 8-16, 14-22, 20-8).
+    Niemutowalny i internowany w SHIFT_CATALOG - każdy id istnieje raz,
+    a index (int) adresuje macierze odpoczynku katalogu.
+    """
+    __slots__ = ('id', 'start_hour', 'end_hour', 'hours', 'is_night', 'index')
+
+    def __init__(self, id: str, start_hour: int, end_hour: int, hours: int, is_night: bool = False, index: int = -1):
+        object.__setattr__(self, 'id', id)                  # "8-16"
+        object.__setattr__(self, 'start_hour', start_hour)  # 8
+        object.__setattr__(self, 'end_hour', end_hour)      # 16
+        object.__setattr__(self, 'hours', hours)            # 8 (or 12 for night shifts crossing midnight)
+        object.__setattr__(self, 'is_night', is_night)      # True if 20-8
+        object.__setattr__(self, 'index', index)            # pozycja w SHIFT_CATALOG
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ShiftType is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, ShiftType) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"ShiftType({self.id!r}, index={self.index})"
+
+    def __reduce__(self):
+        # Po rozpakowaniu (np. w procesie portfolio) ten sam obiekt z katalogu tego procesu
+        return ShiftType.from_string, (self.id,)
+
     @staticmethod
     def from_string(shift_str: str) -> 'ShiftType':
-        """Parse shift string like '8-16' into ShiftType"""
+        """Parse shift string like '8-16' into the shared ShiftType from SHIFT_CATALOG"""
+        return SHIFT_CATALOG.get(shift_str)
+
+    @staticmethod
+    def parse(shift_str: str, index: int = -1) -> 'ShiftType':
+        """Parse shift string like '8-16' into a new ShiftType (use from_string instead)"""
         parts = shift_str.split('-')
         if len(parts) != 2:
             raise ValueError(f"Invalid shift format: {shift_str}")
@@ -37,9 +77,67 @@ class ShiftType:
             start_hour=start,
             end_hour=end,
             hours=hours,
-            is_night=is_night
+            is_night=is_night,
+            index=index
         )
 
+
+class ShiftCatalog:
+    """
+    Globalny katalog typów zmian: id -> ShiftType z indeksem int.
+    Trzyma też macierz przerw (rest_gaps) i zakazanych przejść (< 11h odpoczynku)
+    dla każdej pary typów - liczone raz przy rejestracji typu.
+    Katalog tylko rośnie; raz zarejestrowany typ nigdy się nie zmienia.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[str, ShiftType] = {}
+        self.types: List[ShiftType] = []
+        self.rest_gaps: List[List[int]] = []      # [i][j] = przerwa po zmianie i przed zmianą j
+        self.forbidden: List[List[bool]] = []     # [i][j] = przerwa < MIN_DAILY_REST_HOURS
+        self._forbidden_pairs: Dict[Tuple[int, ...], List[Tuple[ShiftType, ShiftType]]] = {}
+
+    def get(self, shift_str: str) -> ShiftType:
+        """Shared ShiftType for shift_str; registers it on first use (ValueError if invalid)"""
+        shift_type = self._by_id.get(shift_str)
+        if shift_type is None:
+            shift_type = ShiftType.parse(shift_str, index=len(self.types))
+            self._register(shift_type)
+        return shift_type
+
+    def _register(self, shift_type: ShiftType):
+        self._by_id[shift_type.id] = shift_type
+        self.types.append(shift_type)
+
+        # Nowy wiersz i nowa kolumna macierzy
+        row = [rest_gap(shift_type, other) for other in self.types]
+        for i, other in enumerate(self.types[:-1]):
+            gap = rest_gap(other, shift_type)
+            self.rest_gaps[i].append(gap)
+            self.forbidden[i].append(gap < MIN_DAILY_REST_HOURS)
+        self.rest_gaps.append(row)
+        self.forbidden.append([gap < MIN_DAILY_REST_HOURS for gap in row])
+        self._forbidden_pairs.clear()
+
+    def rest_gap(self, shift1: ShiftType, shift2: ShiftType) -> int:
+        return self.rest_gaps[shift1.index][shift2.index]
+
+    def is_forbidden(self, shift1: ShiftType, shift2: ShiftType) -> bool:
+        """True if shift2 the next day leaves less than 11h of rest after shift1"""
+        return self.forbidden[shift1.index][shift2.index]
+
+    def forbidden_pairs(self, allowed: List[ShiftType]) -> List[Tuple[ShiftType, ShiftType]]:
+        """(today, tomorrow) pairs from allowed that break the 11h rest (cached per shift set)"""
+        key = tuple(shift_type.index for shift_type in allowed)
+        pairs = self._forbidden_pairs.get(key)
+        if pairs is None:
+            pairs = [(s1, s2) for s1 in allowed for s2 in allowed if self.forbidden[s1.index][s2.index]]
+            self._forbidden_pairs[key] = pairs
+        return pairs
+
+
+SHIFT_CATALOG = ShiftCatalog()
+
 @dataclass
 class Employee:
     """Pracownik"""
@@ -80,6 +178,358 @@ class DemandSpec:
     day: int = 0     # Zmiany rozpoczynające się przed 20:00
     night: int = 0   # Zmiany rozpoczynające się od 20:00
 
+SEQUENCE_ENCODINGS = ("window", "automaton")
+CACHE_MODES = ("use", "bypass", "fresh")
+FAIRNESS_FORMULATIONS = ("quadratic", "linear")
+STREAM_MODES = ("off", "full", "diff")
+MAX_HISTORY_DAYS = 14
+# Tryb elastyczny: twarde reguły, które mogą dostać luz (slack), i domyślna kara za jednostkę luzu.
+# Kary muszą przebijać sumę kar miękkich, inaczej solver woli luz niż gorszy grafik
+ELASTIC_PENALTIES = {
+    "demand": 10000,               # brakująca osoba na zmianie dziennej/nocnej
+    "coverage": 10000,             # nieobsadzony punkt kontrolny 9:00 / 17:00 / 1:00
+    "min_one_night_shift": 10000,  # dzień bez nocki
+    "min_one_free_weekend": 5000,  # pracownik bez wolnego weekendu
+    "leader_weekdays": 5000,       # LIDER nie pracuje w dzień roboczy
+}
+# Portfolio (portfolio.py): nazwane warianty procesów, kolejne to "seed_<k>"
+PORTFOLIO_PRESETS = ("default", "lns", "core", "no_symmetry")
+
+@dataclass
+class SolverOptions:
+    """Ustawienia pojedynczego rozwiązania (sekcja "options" w JSON wejściowym)"""
+    # Kodowanie reguł sekwencyjnych (max 5 dni z rzędu, 35h odpoczynku tygodniowo):
+    # "window"    - okna przesuwne z sumami (domyślne)
+    # "automaton" - automat przejść per pracownik (AddAutomaton)
+    sequence_encoding: str = "window"
+    # Warm start: podpowiedzi (AddHint) z existing_schedule w zakresie generowania
+    warm_start: bool = False
+    # Poprzedni wynik solvera ({"schedule": {...}} albo samo schedule) - ma pierwszeństwo przed existing_schedule
+    previous_schedule: Optional[Dict[str, Any]] = None
+    # Kara za każdą komórkę (pracownik, dzień) różną od podpowiedzi; 0 = same podpowiedzi bez kary
+    stability_weight: int = 0
+    # Cache wyników (result_cache.py): "use" - odczyt i zapis, "bypass" - bez cache,
+    # "fresh" - zawsze licz od nowa, ale zapisz wynik
+    cache_mode: str = "use"
+    # Ile dni przed startem czytać z existing_schedule jako historię.
+    # 1 = tylko poprzedni dzień (11h odpoczynku); więcej = także dni z rzędu,
+    # odpoczynek tygodniowy, regeneracja po nocach i godziny tygodnia na styku zakresów
+    history_days: int = 1
+    # Rolling horizon (rolling_horizon.py): okna po rolling_window_days dni przesuwane
+    # o rolling_step_days; 0 = jeden model na cały zakres
+    rolling_window_days: int = 0
+    rolling_step_days: int = 7
+    # Limit czasu jednego rozwiązania w sekundach (None = zależnie od liczby zmiennych, maks. 1800 s)
+    max_time_seconds: Optional[float] = None
+    # Polityka zatrzymania (stopping.py); early_stop=False = tylko limit czasu i optimum
+    early_stop: bool = True
+    # Względna luka |cel - granica| / max(1, |cel|); None = domyślne 1%
+    gap_limit: Optional[float] = None
+    # Sekundy bez lepszego rozwiązania; None = zależnie od liczby zmiennych, 0 = wyłączone
+    no_improvement_seconds: Optional[float] = None
+    # Ile rozwiązań znaleźć przed wcześniejszym zatrzymaniem
+    min_solutions: int = 1
+    # Bezwzględny próg celu (dawne EARLY_STOP_SCORE_THRESHOLD); None = wyłączony
+    score_threshold: Optional[float] = None
+    # Zapis najlepszego dotąd rozwiązania (checkpoint.py) - nadaje się jako previousSchedule
+    checkpoint_path: Optional[str] = None
+    checkpoint_seconds: float = 30.0
+    # Strumień pośrednich grafików (streaming.py) jako zdarzenia "schedule":
+    # "off" (domyślne), "full" - cały grafik, "diff" - zmiany względem poprzednio wysłanego
+    stream_schedules: str = "off"
+    # Najwyżej jedno zdarzenie "schedule" na tyle sekund
+    stream_interval_seconds: float = 2.0
+    # Wątki CP-SAT (num_workers); None = domyślne OR-Tools (wszystkie rdzenie)
+    num_workers: Optional[int] = None
+    # Dodatkowe parametry CpSolver (nazwy pól SatParameters), np. {"random_seed": 3}
+    solver_parameters: Dict[str, Any] = field(default_factory=dict)
+    # Portfolio procesów (portfolio.py): nazwy wariantów; puste = jedno rozwiązanie
+    portfolio: List[str] = field(default_factory=list)
+    # Długość rundy portfolio - po każdej najlepszy grafik staje się podpowiedzią dla wszystkich
+    portfolio_round_seconds: float = 60.0
+    # Tryb dwufazowy: najpierw grafik spełniający same reguły twarde (limit first_phase_seconds),
+    # wysłany od razu jako zdarzenie "schedule", potem optymalizacja z podpowiedzią z fazy 1;
+    # przerwanie (SIGTERM) lub brak rozwiązania w fazie 2 = wynikiem jest grafik z fazy 1
+    two_phase: bool = False
+    first_phase_seconds: float = 10.0
+    # Profil budowy modelu per konstruktor (profiler.py) w stats["profile"]
+    profile: bool = False
+    # Tryb diagnostyczny (explain.py): przy INFEASIBLE wskazuje sprzeczne reguły i ograniczenia
+    explain: bool = False
+    # Tryb elastyczny (elastic.py): reguła -> kara za jednostkę luzu; puste = wszystkie reguły twarde
+    elastic: Dict[str, int] = field(default_factory=dict)
+    # Porządek leksykograficzny wierszy zamiennych pracowników (symmetry.py)
+    symmetry_breaking: bool = True
+    # Sprawiedliwość (godziny, weekendy):
+    # "quadratic" - Max/MinEquality i kwadraty przez AddMultiplicationEquality (domyślne)
+    # "linear"    - te same wartości celu jako nierówności liniowe z ciasnymi granicami (fairness.py)
+    fairness: str = "quadratic"
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> 'SolverOptions':
+        """Parse options JSON (camelCase keys) into SolverOptions"""
+        data = data or {}
+        options = SolverOptions(
+            sequence_encoding=data.get('sequenceEncoding', "window"),
+            warm_start=bool(data.get('warmStart', False)),
+            previous_schedule=data.get('previousSchedule'),
+            stability_weight=int(data.get('stabilityWeight', 0)),
+            cache_mode=data.get('cache', "use"),
+            history_days=int(data.get('historyDays', 1)),
+            rolling_window_days=int(data.get('rollingWindowDays', 0)),
+            rolling_step_days=int(data.get('rollingStepDays', 7)),
+            max_time_seconds=float(data['maxTimeSeconds']) if data.get('maxTimeSeconds') is not None else None,
+            early_stop=bool(data.get('earlyStop', True)),
+            gap_limit=float(data['gapLimit']) if data.get('gapLimit') is not None else None,
+            no_improvement_seconds=float(data['noImprovementSeconds']) if data.get('noImprovementSeconds') is not None else None,
+            min_solutions=int(data.get('minSolutions', 1)),
+            score_threshold=float(data['scoreThreshold']) if data.get('scoreThreshold') is not None else None,
+            checkpoint_path=data.get('checkpointPath'),
+            checkpoint_seconds=float(data.get('checkpointSeconds', 30.0)),
+            stream_schedules=data.get('streamSchedules', "off"),
+            stream_interval_seconds=float(data.get('streamIntervalSeconds', 2.0)),
+            num_workers=int(data['numWorkers']) if data.get('numWorkers') is not None else None,
+            solver_parameters=dict(data.get('solverParameters') or {}),
+            portfolio=SolverOptions._parse_portfolio(data.get('portfolio')),
+            portfolio_round_seconds=float(data.get('portfolioRoundSeconds', 60.0)),
+            two_phase=bool(data.get('twoPhase', False)),
+            first_phase_seconds=float(data.get('firstPhaseSeconds', 10.0)),
+            profile=bool(data.get('profile', False)),
+            explain=bool(data.get('explain', False)),
+            elastic=SolverOptions._parse_elastic(data.get('elastic')),
+            symmetry_breaking=bool(data.get('symmetryBreaking', True)),
+            fairness=data.get('fairness', "quadratic")
+        )
+        if options.sequence_encoding not in SEQUENCE_ENCODINGS:
+            raise ValueError(f"Invalid sequenceEncoding: {options.sequence_encoding}")
+        if options.fairness not in FAIRNESS_FORMULATIONS:
+            raise ValueError(f"Invalid fairness: {options.fairness} (expected {FAIRNESS_FORMULATIONS})")
+        if options.cache_mode not in CACHE_MODES:
+            raise ValueError(f"Invalid cache: {options.cache_mode}")
+        if not 1 <= options.history_days <= MAX_HISTORY_DAYS:
+            raise ValueError(f"Invalid historyDays: {options.history_days} (1-{MAX_HISTORY_DAYS})")
+        if options.rolling_window_days < 0:
+            raise ValueError(f"Invalid rollingWindowDays: {options.rolling_window_days}")
+        if options.rolling_window_days and not 1 <= options.rolling_step_days <= options.rolling_window_days:
+            raise ValueError(f"Invalid rollingStepDays: {options.rolling_step_days} (1-{options.rolling_window_days})")
+        if options.max_time_seconds is not None and options.max_time_seconds <= 0:
+            raise ValueError(f"Invalid maxTimeSeconds: {options.max_time_seconds}")
+        if options.gap_limit is not None and not 0 <= options.gap_limit < 1:
+            raise ValueError(f"Invalid gapLimit: {options.gap_limit} (0-1, e.g. 0.01 = 1%)")
+        if options.no_improvement_seconds is not None and options.no_improvement_seconds < 0:
+            raise ValueError(f"Invalid noImprovementSeconds: {options.no_improvement_seconds}")
+        if options.min_solutions < 1:
+            raise ValueError(f"Invalid minSolutions: {options.min_solutions}")
+        if options.checkpoint_seconds < 0:
+            raise ValueError(f"Invalid checkpointSeconds: {options.checkpoint_seconds}")
+        if options.stream_schedules not in STREAM_MODES:
+            raise ValueError(f"Invalid streamSchedules: {options.stream_schedules} (expected {STREAM_MODES})")
+        if options.stream_interval_seconds < 0:
+            raise ValueError(f"Invalid streamIntervalSeconds: {options.stream_interval_seconds}")
+        if options.num_workers is not None and options.num_workers < 1:
+            raise ValueError(f"Invalid numWorkers: {options.num_workers}")
+        if options.portfolio_round_seconds <= 0:
+            raise ValueError(f"Invalid portfolioRoundSeconds: {options.portfolio_round_seconds}")
+        if options.first_phase_seconds <= 0:
+            raise ValueError(f"Invalid firstPhaseSeconds: {options.first_phase_seconds}")
+        if options.stability_weight < 0:
+            raise ValueError(f"Invalid stabilityWeight: {options.stability_weight}")
+        if options.previous_schedule is not None and not isinstance(options.previous_schedule, dict):
+            raise ValueError("previousSchedule must be an object")
+        return options
+
+    @staticmethod
+    def _parse_portfolio(value: Any) -> List[str]:
+        """
+        "portfolio": N (first N presets, then seed_1, seed_2, ...), true (all
+        presets) or a list of names from PORTFOLIO_PRESETS / "seed_<k>"
+        """
+        if not value:
+            return []
+        if value is True:
+            return list(PORTFOLIO_PRESETS)
+        if isinstance(value, int):
+            return [*PORTFOLIO_PRESETS, *(f"seed_{k}" for k in range(1, value + 1))][:value]
+        if not isinstance(value, list):
+            raise ValueError("portfolio must be a number of processes, true or a list of worker names")
+        for name in value:
+            if name not in PORTFOLIO_PRESETS and not re.fullmatch(r"seed_\d+", str(name)):
+                raise ValueError(f"Invalid portfolio worker: {name} (expected {PORTFOLIO_PRESETS} or seed_<k>)")
+        return list(value)
+
+    @staticmethod
+    def _parse_elastic(value: Any) -> Dict[str, int]:
+        """
+        "elastic": true (all rules, default penalties), a list of rule names
+        or {"demand": 20000, "coverage": true, ...}
+        """
+        if not value:
+            return {}
+        if value is True:
+            return dict(ELASTIC_PENALTIES)
+        if isinstance(value, list):
+            value = dict.fromkeys(value, True)
+        if not isinstance(value, dict):
+            raise ValueError("elastic must be true, a list of rules or an object")
+        unknown = set(value) - set(ELASTIC_PENALTIES)
+        if unknown:
+            raise ValueError(f"Invalid elastic rules: {sorted(unknown)} (expected {sorted(ELASTIC_PENALTIES)})")
+        penalties = {}
+        for rule, penalty in value.items():
+            if penalty is False or penalty is None:
+                continue
+            penalties[rule] = ELASTIC_PENALTIES[rule] if penalty is True else int(penalty)
+            if penalties[rule] <= 0:
+                raise ValueError(f"Invalid elastic penalty for {rule}: {penalty}")
+        return penalties
+
+@dataclass
+class RepairRequest:
+    """
+    Naprawa gotowego grafiku po zmianie (sekcja "repair" w JSON wejściowym).
+    Poza sąsiedztwem zmienionych dni i kandydatów komórki są zamrożone.
+    """
+    schedule: Dict[str, Dict[str, str]]  # employee_id -> date -> shift_id (jak SolverOutput.schedule)
+    changes: List['Constraint'] = field(default_factory=list)  # np. nowe ABSENCE
+    radius_days: int = 2          # dni wokół zmienionych dni, które można przeplanować
+    max_candidates: int = 6       # ilu dodatkowych pracowników może przejąć zmiany
+    stability_weight: int = 10    # kara za każdą komórkę zmienioną w sąsiedztwie
+    max_time_seconds: float = 10.0
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any], changes: List['Constraint']) -> 'RepairRequest':
+        """Parse the repair JSON (camelCase keys); changes are already parsed constraints"""
+        repair = RepairRequest(
+            schedule=data.get('schedule', {}),
+            changes=changes,
+            radius_days=int(data.get('radiusDays', 2)),
+            max_candidates=int(data.get('maxCandidates', 6)),
+            stability_weight=int(data.get('stabilityWeight', 10)),
+            max_time_seconds=float(data.get('maxTimeSeconds', 10.0))
+        )
+        if not isinstance(repair.schedule, dict) or not all(isinstance(days, dict) for days in repair.schedule.values()):
+            raise ValueError("repair.schedule must be an object: employee id -> date -> shift id")
+        if repair.radius_days < 0:
+            raise ValueError(f"Invalid repair.radiusDays: {repair.radius_days}")
+        if repair.max_candidates < 0:
+            raise ValueError(f"Invalid repair.maxCandidates: {repair.max_candidates}")
+        if repair.stability_weight < 0:
+            raise ValueError(f"Invalid repair.stabilityWeight: {repair.stability_weight}")
+        if repair.max_time_seconds <= 0:
+            raise ValueError(f"Invalid repair.maxTimeSeconds: {repair.max_time_seconds}")
+        return repair
+
+class Calendar:
+    """
+    Indeks kalendarza dla zakresu dat - budowany raz na SolverInput.
+    Zastępuje powtarzane strptime/strftime w konstruktorach ograniczeń.
+
+    dates[i]    - data YYYY-MM-DD dla dnia o offsecie i
+    offset      - data -> offset (int)
+    weekday[i]  - 0 = poniedziałek ... 6 = niedziela
+    weeks       - listy dat pogrupowane po tygodniu ISO (w kolejności)
+    week_index  - data -> numer kubełka w weeks
+    weekends    - pary (sobota, niedziela), gdy oba dni są w zakresie
+    months      - (pierwszy_offset, ostatni_offset) dla każdego miesiąca w zakresie
+    """
+
+    def __init__(self, start_str: str, end_str: str):
+        start = datetime.strptime(start_str, '%Y-%m-%d').date()
+        end = datetime.strptime(end_str, '%Y-%m-%d').date()
+
+        self.start = start
+        self.end = end
+        self.prev_day = (start - timedelta(days=1)).strftime('%Y-%m-%d')
+
+        self.dates: List[str] = []
+        self.weekday: List[int] = []
+        self.offset: Dict[str, int] = {}
+        self.weeks: List[List[str]] = []
+        self.week_index: Dict[str, int] = {}
+        self.months: List[Tuple[int, int]] = []
+
+        week_keys: Dict[Tuple[int, int], int] = {}
+        current = start
+        i = 0
+        while current <= end:
+            date_str = current.isoformat()
+            self.dates.append(date_str)
+            self.weekday.append(current.weekday())
+            self.offset[date_str] = i
+
+            week_key = current.isocalendar()[:2]  # (year, week)
+            if week_key not in week_keys:
+                week_keys[week_key] = len(self.weeks)
+                self.weeks.append([])
+            self.weeks[week_keys[week_key]].append(date_str)
+            self.week_index[date_str] = week_keys[week_key]
+
+            if current.day == 1 or i == 0:
+                self.months.append((i, i))
+            else:
+                self.months[-1] = (self.months[-1][0], i)
+
+            current += timedelta(days=1)
+            i += 1
+
+        self.weekends: List[Tuple[str, str]] = [
+            (self.dates[i], self.dates[i + 1])
+            for i in range(len(self.dates) - 1)
+            if self.weekday[i] == 5
+        ]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def is_weekend(self, date_str: str) -> bool:
+        """Saturday or Sunday (dates outside the range -> False)"""
+        i = self.offset.get(date_str)
+        return i is not None and self.weekday[i] >= 5
+
+    def dates_between(self, start_str: str, end_str: str) -> List[str]:
+        """Dates of [start, end] that fall inside the range (ISO strings compare lexicographically)"""
+        lo = max(start_str, self.dates[0]) if self.dates else start_str
+        hi = min(end_str, self.dates[-1]) if self.dates else end_str
+        if lo > hi or lo not in self.offset:
+            return []
+        return self.dates[self.offset[lo]:self.offset[hi] + 1]
+
+def trailing_work_days(history: List[Optional[ShiftType]]) -> int:
+    """Liczba dni pracy z rzędu kończących historię (tuż przed startem)"""
+    count = 0
+    for shift_type in reversed(history):
+        if shift_type is None:
+            break
+        count += 1
+    return count
+
+def history_in_first_week(history: List[Optional[ShiftType]], calendar: Calendar) -> List[Optional[ShiftType]]:
+    """Dni historii należące do tego samego tygodnia ISO co pierwszy dzień zakresu"""
+    before = min(calendar.weekday[0], len(history)) if calendar.dates else 0
+    return history[len(history) - before:] if before else []
+
+def shift_id_from_cell(shift_info: Any) -> Optional[str]:
+    """
+    Identyfikator zmiany ("14-22") z komórki existing_schedule albo None,
+    gdy komórka nie jest zmianą roboczą (L4, urlopy, wolne).
+    """
+    # shift_info może być obiektem (Shift) lub stringiem, zależnie od formatu w JSON
+    if isinstance(shift_info, dict):
+        # Format: { type: "WORK", startHour: 14, endHour: 22 }
+        if shift_info.get('type') == 'WORK':
+            start = shift_info.get('startHour')
+            end = shift_info.get('endHour')
+            if start is not None and end is not None:
+                return f"{start}-{end}"
+        # Inne typy (L4, UW, W) nie są zmianami roboczymi
+        return None
+
+    if isinstance(shift_info, str):
+        # Prosty format "14-22"
+        return shift_info or None
+
+    return None
+
 @dataclass
 class SolverInput:
     """Input do solvera"""
@@ -90,6 +540,13 @@ class SolverInput:
     # Zakładamy strukturę existing_schedule zgodną z TypeScript: 
     # { employees: [ {id: '1', shifts: {'2026-01-01': {type: '8-16'}}} ] }
     existing_schedule: Dict[str, Any] = field(default_factory=dict)
+    options: SolverOptions = field(default_factory=SolverOptions)
+    repair: Optional[RepairRequest] = None
+    # Rolling horizon: cały zakres, którego częścią jest to okno (None = wejście to cały zakres)
+    rolling_range: Optional[tuple] = None
+    _calendar: Optional[Calendar] = field(default=None, init=False, repr=False, compare=False)
+    _recent_history: Optional[Dict[str, List[Optional[ShiftType]]]] = field(default=None, init=False, repr=False, compare=False)
+    _committed: Optional[Dict[str, Dict[str, Optional[ShiftType]]]] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         """Normalize demand to DemandSpec format for backward compatibility"""
@@ -101,6 +558,8 @@ class SolverInput:
                     day=value.get('day', 0),
                     night=value.get('night', 0)
                 )
+            elif isinstance(value, DemandSpec):
+                normalized_demand[date] = value
             elif isinstance(value, int):
                 # Old format: single number -> assign to day, night = 0
                 normalized_demand[date] = DemandSpec(day=value, night=0)
@@ -108,29 +567,44 @@ class SolverInput:
                 normalized_demand[date] = DemandSpec(day=0, night=0)
         self.demand = normalized_demand
     
+    @property
+    def calendar(self) -> Calendar:
+        """Calendar index for date_range, built once"""
+        if self._calendar is None:
+            self._calendar = Calendar(self.date_range[0], self.date_range[1])
+        return self._calendar
+
+    @property
+    def range_calendar(self) -> Calendar:
+        """Calendar of the whole range - rolling_range for a rolling-horizon window, else calendar"""
+        if self.rolling_range is None:
+            return self.calendar
+        return Calendar(self.rolling_range[0], self.rolling_range[1])
+
     def get_date_list(self) -> List[str]:
-        """Get list of dates in range as YYYY-MM-DD strings"""
-        from datetime import datetime, timedelta
-        start = datetime.strptime(self.date_range[0], '%Y-%m-%d')
-        end = datetime.strptime(self.date_range[1], '%Y-%m-%d')
-        
-        dates = []
-        current = start
-        while current <= end:
-            dates.append(current.strftime('%Y-%m-%d'))
-            current += timedelta(days=1)
-        return dates
+        """Get list of dates in range as YYYY-MM-DD strings (shared list - do not modify)"""
+        return self.calendar.dates
+
+    def get_absence_dates(self) -> Dict[str, set]:
+        """Hard ABSENCE days inside the range: {employee_id: {date, ...}}"""
+        absences: Dict[str, set] = {}
+        for constraint in self.constraints:
+            if constraint.type != "ABSENCE" or not constraint.employee_id:
+                continue
+            days = absences.setdefault(constraint.employee_id, set())
+            if constraint.date and constraint.date in self.calendar.offset:
+                days.add(constraint.date)
+            if constraint.date_range:
+                days.update(self.calendar.dates_between(*constraint.date_range))
+        return absences
 
     def get_history_shifts(self) -> Dict[str, ShiftType]:
         """
         Pobiera zmiany z dnia PRZED rozpoczęciem grafiku.
         Zwraca słownik: {employee_id: ShiftType object}
         """
-        from datetime import datetime, timedelta
-        
-        # Oblicz datę "wczorajszą" względem startu generowania
-        start_date = datetime.strptime(self.date_range[0], "%Y-%m-%d")
-        prev_day_str = (start_date - timedelta(days=1)).strftime("%Y-%m-%d")
+        # Data "wczorajsza" względem startu generowania
+        prev_day_str = self.calendar.prev_day
         
         history = {}
         
@@ -143,28 +617,7 @@ class SolverInput:
             
             # Jeśli pracownik miał zmianę tego dnia
             if prev_day_str in shifts:
-                shift_info = shifts[prev_day_str]
-                
-                # shift_info może być obiektem (Shift) lub stringiem, zależnie od formatu w JSON
-                shift_type_str = None
-                
-                if isinstance(shift_info, dict):
-                    # Format: { type: "WORK", startHour: 14, endHour: 22 } 
-                    # lub { type: "14-22" } jeśli type przechowuje godziny
-                    # Ale Twój system ma type='WORK' i osobne start/end
-                    
-                    if shift_info.get('type') == 'WORK':
-                        start = shift_info.get('startHour')
-                        end = shift_info.get('endHour')
-                        if start is not None and end is not None:
-                            shift_type_str = f"{start}-{end}"
-                    # Obsługa innych typów (L4, urlopy) jeśli są istotne dla historii
-                    elif shift_info.get('type') in ['L4', 'UW', 'W']:
-                        pass # Ignorujemy urlopy w historii zmian roboczych (chyba że wpływają na zmęczenie)
-                        
-                elif isinstance(shift_info, str):
-                    # Prosty format "14-22"
-                    shift_type_str = shift_info
+                shift_type_str = shift_id_from_cell(shifts[prev_day_str])
 
                 if shift_type_str:
                     try:
@@ -176,6 +629,107 @@ class SolverInput:
 
         return history
 
+    def get_recent_history(self) -> Dict[str, List[Optional[ShiftType]]]:
+        """
+        Zmiany z options.history_days dni przed startem (najstarszy pierwszy,
+        ostatni element = dzień przed startem; None = dzień wolny).
+        Tylko dla pracowników obecnych w existing_schedule i tylko gdy
+        history_days > 1 - przy 1 wystarcza get_history_shifts (11h odpoczynku).
+        """
+        if self._recent_history is not None:
+            return self._recent_history
+
+        history: Dict[str, List[Optional[ShiftType]]] = {}
+        days = self.options.history_days
+        if days > 1:
+            start = self.calendar.start
+            history_dates = [(start - timedelta(days=j)).isoformat() for j in range(days, 0, -1)]
+
+            for emp_data in self.existing_schedule.get('employees', []):
+                emp_id = emp_data.get('id')
+                shifts = emp_data.get('shifts') or {}
+                if emp_id is None:
+                    continue
+
+                row = []
+                for date_str in history_dates:
+                    shift_type = None
+                    shift_id = shift_id_from_cell(shifts.get(date_str))
+                    if shift_id:
+                        try:
+                            shift_type = ShiftType.from_string(shift_id)
+                        except ValueError:
+                            pass
+                    row.append(shift_type)
+                history[emp_id] = row
+
+        self._recent_history = history
+        return history
+
+    def get_committed_shifts(self) -> Dict[str, Dict[str, Optional[ShiftType]]]:
+        """
+        Rolling horizon: dni całego zakresu przed startem okna, już zatwierdzone
+        (existing_schedule). Zwraca {employee_id: {date: ShiftType lub None = wolne}};
+        pusty słownik, gdy wejście nie jest oknem. Reguły liczone na cały zakres
+        (wolny weekend, wyrównanie godzin i weekendów) doliczają te dni.
+        """
+        if self._committed is not None:
+            return self._committed
+
+        committed: Dict[str, Dict[str, Optional[ShiftType]]] = {}
+        if self.rolling_range is not None and self.rolling_range[0] < self.date_range[0]:
+            dates = Calendar(self.rolling_range[0], self.calendar.prev_day).dates
+            rows = {emp_data.get('id'): emp_data.get('shifts') or {}
+                    for emp_data in self.existing_schedule.get('employees', [])}
+            for emp in self.employees:
+                shifts = rows.get(emp.id, {})
+                row: Dict[str, Optional[ShiftType]] = {}
+                for date_str in dates:
+                    shift_type = None
+                    shift_id = shift_id_from_cell(shifts.get(date_str))
+                    if shift_id:
+                        try:
+                            shift_type = ShiftType.from_string(shift_id)
+                        except ValueError:
+                            pass
+                    row[date_str] = shift_type
+                committed[emp.id] = row
+
+        self._committed = committed
+        return committed
+
+    def get_committed_hours(self) -> Dict[str, int]:
+        """Rolling horizon: godziny każdego pracownika w zatwierdzonych dniach przed oknem"""
+        return {emp_id: sum(shift_type.hours for shift_type in days.values() if shift_type is not None)
+                for emp_id, days in self.get_committed_shifts().items()}
+
+    def get_committed_weekend_days(self) -> Dict[str, int]:
+        """Rolling horizon: przepracowane dni weekendowe w zatwierdzonych dniach przed oknem"""
+        range_calendar = self.range_calendar
+        return {emp_id: sum(1 for date_str, shift_type in days.items()
+                            if shift_type is not None and range_calendar.is_weekend(date_str))
+                for emp_id, days in self.get_committed_shifts().items()}
+
+    def get_existing_assignments(self) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        Zmiany z existing_schedule w zakresie generowania (szkic grafiku).
+        Zwraca słownik: {employee_id: {date: shift_id lub None = dzień wolny}}
+        Daty bez wpisu są pomijane (brak informacji).
+        """
+        cal = self.calendar
+        assignments = {}
+
+        for emp_data in self.existing_schedule.get('employees', []):
+            emp_id = emp_data.get('id')
+            cells = {}
+            for date_str, shift_info in (emp_data.get('shifts') or {}).items():
+                if date_str in cal.offset:
+                    cells[date_str] = shift_id_from_cell(shift_info)
+            if emp_id is not None and cells:
+                assignments[emp_id] = cells
+
+        return assignments
+
 @dataclass
 class SolverOutput:
     """Output z solvera"""
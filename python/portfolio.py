@@ -0,0 +1,265 @@
+"""
+Process portfolio for OR-Tools Schedule Solver
+With options.portfolio several differently parameterised solves of the same
+input run in parallel processes (multiprocessing, spawn), each building its
+own model with solve_schedule:
+
+    default       OR-Tools defaults
+    lns           use_lns_only - local search around the incumbent
+    core          optimize_with_core - core-based lower bounds
+    no_symmetry   no lexicographic rows (symmetry.py) and symmetry_level 0
+    seed_<k>      defaults with random_seed k (any further workers)
+
+The processes share, through SharedBounds, the best objective and the best
+lower bound found so far (every worker's bound holds for the whole problem).
+A worker stops when the shared gap reaches gapLimit or when another worker
+proves optimality. Hints cannot be added to a running
+CP-SAT search, so the search runs in rounds of portfolioRoundSeconds: every
+round starts all workers warm-started (options.previousSchedule) from the
+best schedule of the previous one. Rounds end at the deadline, at the gap,
+or when a round brings no improvement.
+"""
+import os
+import sys
+import math
+import time
+import queue
+import signal
+import threading
+import multiprocessing
+from dataclasses import replace
+from events import EVENTS
+from models import SolverInput, SolverOutput
+from stopping import DEFAULT_GAP_LIMIT, SHUTDOWN, STOP_SIGNALS, relative_gap
+from typing import Any, Dict, List, Optional, Tuple
+
+# Nazwa -> nadpisania SolverOptions (nazwy pól dataclass)
+PORTFOLIO_PRESETS: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "lns": {"solver_parameters": {"use_lns_only": True}},
+    "core": {"solver_parameters": {"optimize_with_core": True}},
+    "no_symmetry": {"symmetry_breaking": False, "solver_parameters": {"symmetry_level": 0}},
+}
+
+# Co ile sekund proces główny sprawdza kolejkę wyników (i sygnały)
+POLL_SECONDS = 0.5
+
+
+def portfolio_workers(spec: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """(name, option overrides) for every worker; "seed_<k>" = defaults with random_seed k"""
+    workers = []
+    for name in spec:
+        if name in PORTFOLIO_PRESETS:
+            workers.append((name, PORTFOLIO_PRESETS[name]))
+        else:
+            workers.append((name, {"solver_parameters": {"random_seed": int(name[len("seed_"):])}}))
+    return workers
+
+
+class SharedBounds:
+    """Best objective / best bound of all workers (shared memory) and a stop flag"""
+
+    def __init__(self, ctx, gap_limit: Optional[float]):
+        self.objective = ctx.Value('d', math.inf)
+        self.bound = ctx.Value('d', -math.inf)
+        self.stop = ctx.Event()
+        self.gap_limit = gap_limit
+
+    def publish(self, objective: float, bound: float):
+        with self.objective.get_lock():
+            self.objective.value = min(self.objective.value, objective)
+        with self.bound.get_lock():
+            self.bound.value = max(self.bound.value, bound)
+
+    def gap(self) -> Optional[float]:
+        if math.isinf(self.objective.value) or math.isinf(self.bound.value):
+            return None
+        return relative_gap(self.objective.value, self.bound.value)
+
+    def verdict(self) -> Optional[Tuple[str, str]]:
+        """(reason, message) when this worker should stop, else None"""
+        if self.stop.is_set():
+            return "portfolio_stop", "another worker finished the search"
+        # Granica każdego pracownika jest granicą całego problemu, więc luka jest wspólna
+        gap = self.gap()
+        if gap is not None and gap <= (self.gap_limit or 0.0):
+            self.stop.set()
+            return "portfolio_gap", f"shared gap {gap:.2%} <= {self.gap_limit or 0.0:.2%}"
+        return None
+
+
+# Ustawiane w procesie roboczym; solve_schedule przekazuje je do StoppingCallback
+SHARED: Optional[SharedBounds] = None
+
+
+def _run_worker(name: str, input_data: SolverInput, shared: SharedBounds, results):
+    """Entry point of one portfolio process"""
+    global SHARED
+    SHARED = shared
+    from scheduler_solver import solve_schedule  # import w procesie potomnym (spawn)
+    try:
+        result = solve_schedule(input_data)
+    except Exception as e:
+        result = SolverOutput(status="FAILED", error=f"{type(e).__name__}: {e}", stats={})
+    stats = result.stats or {}
+    # Optimum lub sprzeczność udowodnione przez jednego kończą pozostałych
+    if stats.get('status') == "INFEASIBLE" or (stats.get('status') == "OPTIMAL"
+                                                and stats.get('stop', {}).get('reason') == "optimal"):
+        shared.stop.set()
+    results.put((name, result))
+
+
+def _worker_stats(name: str, round_number: int, result: SolverOutput) -> Dict[str, Any]:
+    stats = result.stats or {}
+    stop = stats.get('stop', {})
+    return {
+        "worker": name,
+        "round": round_number,
+        "status": stats.get('status'),
+        "objective_value": stats.get('objective_value'),
+        "solve_time": stats.get('solve_time'),
+        "stop_reason": stop.get('reason'),
+        "gap": stop.get('gap'),
+        "error": result.error,
+    }
+
+
+def _better(result: SolverOutput, best: Optional[SolverOutput]) -> bool:
+    if result.status != "SUCCESS":
+        return False
+    if best is None:
+        return True
+    return result.stats.get('objective_value', math.inf) < best.stats.get('objective_value', math.inf)
+
+
+def solve_portfolio(input_data: SolverInput) -> SolverOutput:
+    """Run the portfolio in rounds; returns the best result with stats["portfolio"]"""
+    options = input_data.options
+    workers = portfolio_workers(options.portfolio)
+    cores = os.cpu_count() or 1
+    threads = options.num_workers or max(1, cores // len(workers))
+    print(f"Portfolio: {len(workers)} processes ({', '.join(name for name, _ in workers)}), "
+          f"{threads} search workers each, rounds of {options.portfolio_round_seconds:.0f}s", file=sys.stderr)
+
+    ctx = multiprocessing.get_context("spawn")
+    gap_limit = None
+    if options.early_stop:
+        gap_limit = options.gap_limit if options.gap_limit is not None else DEFAULT_GAP_LIMIT
+    shared = SharedBounds(ctx, gap_limit)
+    results = ctx.Queue()
+
+    def on_signal(signum, frame):
+        print(f"{signal.Signals(signum).name} received, stopping portfolio workers", file=sys.stderr)
+        SHUTDOWN.set()
+        shared.stop.set()
+
+    # Sygnały da się obsłużyć tylko w wątku głównym (nie w trybie --socket)
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        for signal_name in STOP_SIGNALS:
+            signum = getattr(signal, signal_name, None)
+            if signum is not None:
+                previous[signum] = signal.signal(signum, on_signal)
+
+    started = time.time()
+    deadline = options.max_time_seconds
+    best: Optional[SolverOutput] = None
+    best_worker = None
+    worker_stats: List[Dict[str, Any]] = []
+    rounds = 0
+    reason = None
+    try:
+        while reason is None:
+            rounds += 1
+            round_seconds = options.portfolio_round_seconds
+            if deadline is not None:
+                round_seconds = min(round_seconds, deadline - (time.time() - started))
+            hint = {"schedule": best.schedule} if best is not None else options.previous_schedule
+            print(f"--- Portfolio round {rounds}: {round_seconds:.0f}s ---", file=sys.stderr)
+
+            processes = []
+            for name, overrides in workers:
+                worker_options = replace(
+                    options,
+                    portfolio=[],
+                    max_time_seconds=round_seconds,
+                    num_workers=threads,
+                    previous_schedule=hint,
+                    **{key: value for key, value in overrides.items() if key != "solver_parameters"},
+                    solver_parameters={**options.solver_parameters, **overrides.get("solver_parameters", {})},
+                )
+                process = ctx.Process(target=_run_worker, name=f"portfolio-{name}",
+                                      args=(name, replace(input_data, options=worker_options), shared, results))
+                process.start()
+                processes.append(process)
+
+            round_best, round_best_worker = None, None
+            pending = len(processes)
+            while pending:
+                try:
+                    name, result = results.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes) and results.empty():
+                        print("Portfolio: a worker exited without a result", file=sys.stderr)
+                        break
+                    continue
+                pending -= 1
+                stats = _worker_stats(name, rounds, result)
+                worker_stats.append(stats)
+                EVENTS.emit("worker", **stats)
+                print(f"Portfolio worker {name}: {stats['status']} {stats['objective_value']} "
+                      f"({stats['stop_reason']})", file=sys.stderr)
+                if result.stats.get('status') == "INFEASIBLE":
+                    best, best_worker, reason = result, name, "infeasible"
+                if _better(result, round_best):
+                    round_best, round_best_worker = result, name
+            for process in processes:
+                process.join()
+
+            if reason is not None:
+                break
+            improved = round_best is not None and _better(round_best, best)
+            if improved:
+                best, best_worker = round_best, round_best_worker
+
+            if deadline is None and best is not None:
+                # Bez maxTimeSeconds: adaptacyjny limit z pierwszego rozwiązania (stopping.time_limit)
+                deadline = best.stats.get('stop', {}).get('max_time_seconds')
+            gap = shared.gap()
+            if SHUTDOWN.is_set():
+                reason = "interrupted"
+            elif best is not None and best.stats.get('stop', {}).get('reason') == "optimal":
+                reason = "optimal"
+            elif gap is not None and (gap == 0 or (gap_limit is not None and gap <= gap_limit)):
+                reason = "optimal" if gap == 0 else "gap"
+            elif deadline is not None and time.time() - started >= deadline - 1:
+                reason = "time_limit"
+            elif not improved:
+                reason = "no_improvement"
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+    summary = {
+        "workers": worker_stats,
+        "rounds": rounds,
+        "best_worker": best_worker,
+        "search_workers_per_process": threads,
+        "objective": None if math.isinf(shared.objective.value) else shared.objective.value,
+        "bound": None if math.isinf(shared.bound.value) else shared.bound.value,
+        "gap": shared.gap(),
+        "reason": reason,
+    }
+    print(f"Portfolio: {rounds} rounds, best {summary['objective']} from {best_worker}, "
+          f"bound {summary['bound']} ({reason})", file=sys.stderr)
+
+    if best is None:
+        return SolverOutput(
+            status="FAILED",
+            error="Portfolio: no worker found a schedule",
+            stats={"solve_time": time.time() - started, "status": "UNKNOWN", "portfolio": summary}
+        )
+    stats = dict(best.stats)
+    stats["solve_time"] = time.time() - started
+    stats["portfolio"] = summary
+    return replace(best, stats=stats)
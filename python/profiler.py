@@ -0,0 +1,156 @@
+"""
+Model-construction profiler for OR-Tools Schedule Solver
+Every constraint/objective builder runs through run_builder(). With
+options.profile the profiler records, per builder: wall time, peak Python
+memory and what it added to the model (variables, linear / reified /
+boolean / other constraints, objective terms). The rows go to
+SolverOutput.stats["profile"] and a table on stderr.
+
+Auxiliaries from the shared DerivedVars layer are counted for the builder
+that first asked for them.
+"""
+import sys
+import time
+import tracemalloc
+import contextlib
+from ortools.sat.python import cp_model
+from events import EVENTS
+from explain import GUARD
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from ortools.sat.python.cp_model_helper import FlatIntExpr
+except ImportError:  # starsze OR-Tools
+    FlatIntExpr = None
+
+COUNTERS = ("variables", "linear", "reified", "boolean", "other")
+
+
+def count_terms(expr: Any) -> Optional[int]:
+    """Number of variables in a penalty expression returned by a soft builder"""
+    if expr is None:
+        return 0
+    if isinstance(expr, int):
+        return 0
+    try:
+        if FlatIntExpr is not None:
+            return len(FlatIntExpr(expr).vars)
+        coeffs, _ = expr.GetIntegerVarValueMap()
+        return len(coeffs)
+    except (AttributeError, TypeError):
+        return None
+
+
+class BuildProfiler:
+    """Per-builder model size and build cost for one model"""
+
+    def __init__(self):
+        self.model: Optional[cp_model.CpModel] = None
+        self.rows: List[Dict[str, Any]] = []
+        self._seen_constraints = 0
+        self._counts = dict.fromkeys(COUNTERS, 0)
+
+    @property
+    def active(self) -> bool:
+        return self.model is not None
+
+    def start(self, model: cp_model.CpModel):
+        self.model = model
+        self.rows = []
+        self._seen_constraints = 0
+        self._counts = dict.fromkeys(COUNTERS, 0)
+        tracemalloc.start()
+
+    def stop(self) -> Dict[str, Any]:
+        """Finish the session, return the JSON report"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.model = None
+        totals = {key: sum(row[key] or 0 for row in self.rows) for key in
+                  ("seconds", "variables", "linear", "reified", "boolean", "other", "objective_terms")}
+        totals["seconds"] = round(totals["seconds"], 4)
+        totals["peak_kb"] = max((row["peak_kb"] for row in self.rows), default=0)
+        return {"groups": self.rows, "totals": totals}
+
+    def _snapshot(self) -> Dict[str, int]:
+        """Counters after classifying constraints added since the last call"""
+        proto = self.model.Proto()
+        constraints = proto.constraints
+        for i in range(self._seen_constraints, len(constraints)):
+            ct = constraints[i]
+            if len(ct.enforcement_literal):
+                self._counts["reified"] += 1
+            elif ct.has_linear():
+                self._counts["linear"] += 1
+            elif ct.has_bool_or() or ct.has_bool_and() or ct.has_at_most_one() or ct.has_exactly_one():
+                self._counts["boolean"] += 1
+            else:
+                self._counts["other"] += 1
+        self._seen_constraints = len(constraints)
+        self._counts["variables"] = len(proto.variables)
+        return dict(self._counts)
+
+    @contextlib.contextmanager
+    def measure(self, name: str, kind: str):
+        """Record one builder; yields the row so the caller can add objective_terms"""
+        row: Dict[str, Any] = {"name": name, "kind": kind, "objective_terms": 0}
+        if not self.active and not EVENTS.enabled:
+            yield row
+            return
+
+        before = self._snapshot() if self.active else None
+        if self.active:
+            tracemalloc.reset_peak()
+            base_memory = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        yield row
+        row["seconds"] = round(time.perf_counter() - started, 4)
+
+        if self.active:
+            after = self._snapshot()
+            row["peak_kb"] = max(0, tracemalloc.get_traced_memory()[1] - base_memory) // 1024
+            for key in COUNTERS:
+                row[key] = after[key] - before[key]
+            self.rows.append(row)
+
+        EVENTS.emit("group", kind=kind, name=name, seconds=row["seconds"])
+
+    def table(self, report: Dict[str, Any]) -> str:
+        """Plain-text table of a report (sorted by time)"""
+        header = f"{'builder':<24} {'kind':<5} {'ms':>8} {'peak kB':>8} {'vars':>7} {'linear':>7} {'reified':>7} {'bool':>7} {'other':>6} {'obj':>6}"
+        lines = [header, "-" * len(header)]
+        for row in sorted(report["groups"], key=lambda r: -r["seconds"]) + [dict(report["totals"], name="TOTAL", kind="")]:
+            obj = row["objective_terms"] if row["objective_terms"] is not None else "?"
+            lines.append(
+                f"{row['name']:<24} {row['kind']:<5} {row['seconds'] * 1000:>8.1f} {row['peak_kb']:>8} "
+                f"{row['variables']:>7} {row['linear']:>7} {row['reified']:>7} {row['boolean']:>7} {row['other']:>6} {obj:>6}"
+            )
+        return "\n".join(lines)
+
+
+# Jeden profiler na proces (rozwiązania i tak są sekwencyjne)
+PROFILER = BuildProfiler()
+
+
+def run_builder(name: str, kind: str, builder: Callable, *args):
+    """Call a constraint/objective builder under the profiler (and the explain guard); returns its result"""
+    with PROFILER.measure(name, kind) as row, GUARD.record(name, kind):
+        result = builder(*args)
+        if kind == "soft" and PROFILER.active:
+            row["objective_terms"] = count_terms(result)
+    return result
+
+
+@contextlib.contextmanager
+def profiling(model: cp_model.CpModel, enabled: bool):
+    """Profile every builder run inside the block; yields a dict filled with the report"""
+    report: Dict[str, Any] = {}
+    if not enabled:
+        yield report
+        return
+    PROFILER.start(model)
+    try:
+        yield report
+    finally:
+        report.update(PROFILER.stop())
+        print("Model construction profile:\n" + PROFILER.table(report), file=sys.stderr)
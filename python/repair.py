@@ -0,0 +1,168 @@
+"""
+Local-neighbourhood repair for OR-Tools Schedule Solver
+A finished schedule + a change (e.g. a new ABSENCE after a sick call):
+every cell outside a neighbourhood of the changed days and a few candidate
+employees is frozen to its current value, the neighbourhood is re-optimised
+under the full rule set (constraints.add_all_constraints). If the
+neighbourhood is too small to absorb the change it is widened once.
+"""
+import sys
+from dataclasses import replace
+from models import SolverInput, SolverOutput, ShiftType
+from events import EVENTS
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+RepairSolveFunction = Callable[[SolverInput, Dict[str, Dict[str, Optional[str]]]], SolverOutput]
+
+
+def affected_cells(input_data: SolverInput) -> Tuple[Set[str], Set[str]]:
+    """(employee ids, dates inside the range) touched by repair.changes"""
+    cal = input_data.calendar
+    employees: Set[str] = set()
+    dates: Set[str] = set()
+
+    for change in input_data.repair.changes:
+        change_dates = []
+        if change.date and change.date in cal.offset:
+            change_dates.append(change.date)
+        if change.date_range:
+            change_dates.extend(cal.dates_between(*change.date_range))
+        if change_dates:
+            dates.update(change_dates)
+            if change.employee_id:
+                employees.add(change.employee_id)
+
+    return employees, dates
+
+
+def neighbourhood_dates(input_data: SolverInput, dates: Set[str], radius_days: int) -> List[str]:
+    """Changed dates widened by radius_days on both sides (clipped to the range)"""
+    cal = input_data.calendar
+    offsets = set()
+    for date_str in dates:
+        center = cal.offset[date_str]
+        offsets.update(range(max(0, center - radius_days), min(len(cal.dates), center + radius_days + 1)))
+    return [cal.dates[i] for i in sorted(offsets)]
+
+
+def pick_candidates(
+    input_data: SolverInput,
+    schedule: Dict[str, Dict[str, str]],
+    affected_employees: Set[str],
+    dates: Set[str],
+    max_candidates: Optional[int]
+) -> Set[str]:
+    """
+    Employees whose cells in the neighbourhood become free: the affected ones
+    plus up to max_candidates others (None = everyone). Others are ranked by
+    how many changed dates they are free on, then by fewest scheduled hours.
+    """
+    absences = input_data.get_absence_dates()
+
+    ranked = []
+    for emp in input_data.employees:
+        if emp.id in affected_employees or not emp.allowed_shifts:
+            continue
+        days = schedule.get(emp.id, {})
+        free_days = sum(1 for d in dates if d not in days and d not in absences.get(emp.id, ()))
+        hours = sum(ShiftType.from_string(shift_id).hours for shift_id in days.values() if shift_id)
+        ranked.append((-free_days, hours, emp.id))
+
+    ranked.sort()
+    if max_candidates is not None:
+        ranked = ranked[:max_candidates]
+    return affected_employees | {emp_id for _, _, emp_id in ranked}
+
+
+def invalid_cells(input_data: SolverInput, schedule: Dict[str, Dict[str, str]]) -> List[str]:
+    """Cells of the range whose shift is not in the employee's allowedShifts ("emp date shift")"""
+    allowed = {emp.id: {shift_type.id for shift_type in emp.allowed_shifts} for emp in input_data.employees}
+    invalid = []
+    for emp_id, days in schedule.items():
+        if emp_id not in allowed:
+            continue
+        for date_str, shift_id in sorted(days.items()):
+            if shift_id and date_str in input_data.calendar.offset and shift_id not in allowed[emp_id]:
+                invalid.append(f"{emp_id} {date_str} {shift_id}")
+    return invalid
+
+
+def frozen_cells(
+    input_data: SolverInput,
+    schedule: Dict[str, Dict[str, str]],
+    candidates: Set[str],
+    free_dates: List[str]
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """Current value of every cell outside (candidates x free_dates)"""
+    free = set(free_dates)
+    frozen = {}
+    for emp in input_data.employees:
+        days = schedule.get(emp.id, {})
+        frozen[emp.id] = {
+            date_str: days.get(date_str) or None
+            for date_str in input_data.calendar.dates
+            if emp.id not in candidates or date_str not in free
+        }
+    return frozen
+
+
+def repair_schedule(input_data: SolverInput, solve: RepairSolveFunction) -> SolverOutput:
+    """
+    Apply repair.changes to repair.schedule by re-solving only the neighbourhood.
+    solve is solve_schedule (called with the frozen cells).
+    """
+    repair = input_data.repair
+    # Zamrożona komórka ze zmianą spoza allowedShifts nie da się przypiąć - odrzucamy zamiast zgadywać
+    invalid = invalid_cells(input_data, repair.schedule)
+    if invalid:
+        shown = ", ".join(invalid[:5]) + (f" (+{len(invalid) - 5} more)" if len(invalid) > 5 else "")
+        return SolverOutput(
+            status="FAILED",
+            error=f"Repair: schedule cells with shifts outside allowedShifts: {shown}"
+        )
+
+    affected_employees, changed_dates = affected_cells(input_data)
+    if not changed_dates:
+        return SolverOutput(
+            status="FAILED",
+            error="Repair: no change falls inside the date range"
+        )
+
+    # Zmiany stają się zwykłymi ograniczeniami; stary grafik = podpowiedzi + kara za odchylenia
+    repaired_input = replace(
+        input_data,
+        constraints=input_data.constraints + repair.changes,
+        options=replace(
+            input_data.options,
+            previous_schedule={"schedule": repair.schedule},
+            stability_weight=repair.stability_weight,
+            max_time_seconds=repair.max_time_seconds,
+            rolling_window_days=0
+        ),
+        repair=None
+    )
+
+    # Druga próba: szersze okno i wszyscy pracownicy
+    attempts = [(repair.radius_days, repair.max_candidates), (max(repair.radius_days * 2, 1), None)]
+    result = None
+    for attempt, (radius_days, max_candidates) in enumerate(attempts, 1):
+        free_dates = neighbourhood_dates(repaired_input, changed_dates, radius_days)
+        candidates = pick_candidates(repaired_input, repair.schedule, affected_employees, changed_dates, max_candidates)
+        frozen = frozen_cells(repaired_input, repair.schedule, candidates, free_dates)
+        print(f"Repair attempt {attempt}: {len(free_dates)} days x {len(candidates)} employees free", file=sys.stderr)
+        EVENTS.emit("repair_attempt", n=attempt, days=len(free_dates), employees=len(candidates))
+
+        result = solve(repaired_input, frozen)
+        result.stats["repair"] = {
+            "attempt": attempt,
+            "radius_days": radius_days,
+            "dates": [free_dates[0], free_dates[-1]],
+            "candidates": sorted(candidates),
+            "free_cells": len(free_dates) * len(candidates),
+        }
+        if result.status == "SUCCESS":
+            break
+
+    if result.status != "SUCCESS":
+        result.error = f"Repair failed, full solve needed: {result.error}"
+    return result
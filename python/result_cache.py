@@ -0,0 +1,331 @@
+"""
+Content-addressed result cache for OR-Tools Schedule Solver
+Identical requests (same normalised SolverInput + solver settings) return the
+stored SolverOutput instead of solving again. Entries live on local disk and
+are evicted by age and by total size (least recently used first).
+
+Konfiguracja (zmienne środowiskowe):
+    SOLVER_CACHE_DIR        - katalog cache (domyślnie python/.solver_cache)
+    SOLVER_CACHE_MAX_MB     - limit rozmiaru (domyślnie 200 MB)
+    SOLVER_CACHE_MAX_AGE_H  - maksymalny wiek wpisu w godzinach (domyślnie 168 = 7 dni)
+    SOLVER_CACHE_DISABLED=1 - wyłącza cache całkowicie
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import contextlib
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+from models import SolverInput
+
+try:
+    import fcntl  # blokady plików - tylko Unix
+except ImportError:  # Windows: bez blokad, dwa równoległe identyczne żądania policzą się dwa razy
+    fcntl = None
+
+# Zmiana formatu wyniku lub logiki solvera = nowa wersja = stare wpisy nie pasują
+CACHE_FORMAT_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.solver_cache')
+DEFAULT_MAX_MB = 200
+DEFAULT_MAX_AGE_H = 168
+
+STATS_FILE = 'stats.json'
+
+
+def canonical_input(input_data: SolverInput) -> Dict[str, Any]:
+    """
+    Order-independent view of everything that influences the solve.
+    Names and descriptions are dropped; existing_schedule is reduced to the
+    parts the solver actually reads (history before the start and warm start
+    hints).
+    """
+    employees = sorted(
+        (
+            {
+                "id": emp.id,
+                "roles": sorted(emp.roles),
+                "allowed_shifts": [shift_type.id for shift_type in emp.allowed_shifts],
+                "preferences": emp.preferences,
+                "special_rules": emp.special_rules,
+            }
+            for emp in input_data.employees
+        ),
+        key=lambda emp: str(emp["id"])
+    )
+
+    constraints = sorted(
+        (
+            {
+                "type": c.type,
+                "employee_id": c.employee_id,
+                "date": c.date,
+                "date_range": list(c.date_range) if c.date_range else None,
+                "value": c.value,
+                "is_hard": c.is_hard,
+            }
+            for c in input_data.constraints
+        ),
+        key=lambda c: json.dumps(c, sort_keys=True, default=str)
+    )
+
+    options = asdict(input_data.options)
+    options.pop('cache_mode', None)
+    options.pop('profile', None)
+    options.pop('checkpoint_path', None)
+    options.pop('checkpoint_seconds', None)
+    options.pop('stream_schedules', None)
+    options.pop('stream_interval_seconds', None)
+
+    history = {emp_id: shift_type.id for emp_id, shift_type in input_data.get_history_shifts().items()}
+    # historyDays > 1: reguły odpoczynku czytają też wcześniejsze dni (None = wolne)
+    recent_history = {emp_id: [shift_type.id if shift_type is not None else None for shift_type in days]
+                      for emp_id, days in input_data.get_recent_history().items()}
+    existing = input_data.get_existing_assignments() if input_data.options.warm_start else {}
+
+    return {
+        "employees": employees,
+        "constraints": constraints,
+        "date_range": list(input_data.date_range),
+        "demand": {date_str: asdict(spec) for date_str, spec in input_data.demand.items()},
+        "history": history,
+        "recent_history": recent_history,
+        "existing": existing,
+        "options": options,
+        "repair": asdict(input_data.repair) if input_data.repair is not None else None,
+    }
+
+
+class ResultCache:
+    """
+    One JSON file per key in a flat directory. mtime is the LRU clock:
+    every hit touches the entry, eviction removes the oldest first.
+    Hit/miss counters are shared between processes via stats.json.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None, max_age_seconds: float = None):
+        self.directory = directory or os.environ.get('SOLVER_CACHE_DIR') or DEFAULT_CACHE_DIR
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('SOLVER_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+        if max_age_seconds is None:
+            max_age_seconds = float(os.environ.get('SOLVER_CACHE_MAX_AGE_H', DEFAULT_MAX_AGE_H)) * 3600
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(self.directory, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+    @staticmethod
+    def key_for(input_data: SolverInput, settings: Dict[str, Any]) -> str:
+        """sha256 of the canonical input and solver settings"""
+        payload = {
+            "version": CACHE_FORMAT_VERSION,
+            "input": canonical_input(input_data),
+            "settings": settings,
+        }
+        blob = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    # ------------------------------------------------------------------
+    # Locking
+    # ------------------------------------------------------------------
+    @contextlib.contextmanager
+    def _flock(self, name: str):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, name), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def lock(self, key: str):
+        """
+        Exclusive lock per key. Held for the whole lookup + solve + store, so a
+        second identical request waits for the first and then gets a hit.
+        """
+        return self._flock(f'{key}.lock')
+
+    # ------------------------------------------------------------------
+    # Entries
+    # ------------------------------------------------------------------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored output for key, or None (miss). Expired entries count as a miss"""
+        path = self._path(key)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age > self.max_age_seconds:
+                self._remove(path)
+                self._record(misses=1, evictions=1)
+                return None
+            with open(path, 'r', encoding='utf-8') as handle:
+                output = json.load(handle)
+        except (OSError, ValueError):
+            self._record(misses=1)
+            return None
+
+        os.utime(path)  # LRU: ostatnie użycie
+        self._record(hits=1)
+        return output
+
+    def put(self, key: str, output: Dict[str, Any]):
+        """Store output atomically, then enforce age and size limits"""
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(output, handle)
+        os.replace(tmp_path, path)
+        self._record(stores=1)
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used ones until under max_bytes"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json') or name == STATS_FILE:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        removed = 0
+        total = 0
+        kept = []
+        for mtime, size, path in entries:
+            if now - mtime > self.max_age_seconds:
+                removed += self._remove(path)
+            else:
+                kept.append((mtime, size, path))
+                total += size
+
+        kept.sort()  # najstarsze użycie najpierw
+        for mtime, size, path in kept:
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total -= size
+
+        if removed:
+            self._record(evictions=removed)
+        return removed
+
+    def _remove(self, path: str) -> int:
+        try:
+            os.remove(path)
+        except OSError:
+            return 0
+        lock_path = path[:-len('.json')] + '.lock'
+        with contextlib.suppress(OSError):
+            os.remove(lock_path)
+        return 1
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+    def _record(self, **deltas: int):
+        """Add deltas to the shared counters (best effort - cache must never fail a solve)"""
+        path = os.path.join(self.directory, STATS_FILE)
+        try:
+            with self._flock('stats.lock'):
+                counters = self._read_counters(path)
+                for name, delta in deltas.items():
+                    counters[name] = counters.get(name, 0) + delta
+                with open(path, 'w', encoding='utf-8') as handle:
+                    json.dump(counters, handle)
+        except OSError as e:
+            print(f"Warning: cache stats not updated: {e}", file=sys.stderr)
+
+    def record_refresh(self):
+        """Count a forced fresh solve (options.cache = "fresh")"""
+        self._record(refreshes=1)
+
+    @staticmethod
+    def _read_counters(path: str) -> Dict[str, int]:
+        try:
+            with open(path, 'r', encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def stats(self) -> Dict[str, Any]:
+        """Shared hit/miss counters plus current entry count and size"""
+        counters = self._read_counters(os.path.join(self.directory, STATS_FILE))
+        entries = 0
+        size = 0
+        for name in os.listdir(self.directory):
+            if name.endswith('.json') and name != STATS_FILE:
+                entries += 1
+                with contextlib.suppress(OSError):
+                    size += os.path.getsize(os.path.join(self.directory, name))
+
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        return {
+            "directory": self.directory,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "stores": counters.get('stores', 0),
+            "refreshes": counters.get('refreshes', 0),
+            "evictions": counters.get('evictions', 0),
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": self.max_age_seconds,
+        }
+
+
+# Powody zakończenia, po których powtórzone żądanie może dostać lepszy grafik
+RETRY_STOP_REASONS = ('time_limit', 'interrupted')
+
+
+def stop_reasons(stats: Dict[str, Any]) -> List[str]:
+    """Why the solve ended (stopping.stop_report), per portfolio and per rolling window"""
+    # Portfolio: powód całego portfolio, nie ostatniej rundy najlepszego procesu
+    reasons = [stats.get('portfolio', stats.get('stop', {})).get('reason')]
+    reasons.extend(window.get('stop_reason') for window in stats.get('rolling', {}).get('windows', []))
+    return [reason for reason in reasons if reason is not None]
+
+
+def is_cacheable(output: Dict[str, Any]) -> bool:
+    """
+    Only definitive answers are stored: a schedule the stopping policy accepted
+    (optimal, gap, no improvement, score threshold) or a proven INFEASIBLE.
+    A schedule cut off by the deadline or a signal is not - the next identical
+    request gets another chance to improve it.
+    """
+    stats = output.get('stats', {})
+    if any(reason in RETRY_STOP_REASONS for reason in stop_reasons(stats)):
+        return False
+    if output.get('status') == 'SUCCESS':
+        return True
+    return stats.get('status') == 'INFEASIBLE'
+
+
+_DEFAULT_CACHE: Optional[ResultCache] = None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide cache instance, None when disabled or the directory is unusable"""
+    global _DEFAULT_CACHE
+    if os.environ.get('SOLVER_CACHE_DISABLED') == '1':
+        return None
+    if _DEFAULT_CACHE is None:
+        try:
+            _DEFAULT_CACHE = ResultCache()
+        except OSError as e:
+            print(f"Warning: result cache disabled: {e}", file=sys.stderr)
+            return None
+    return _DEFAULT_CACHE
@@ -4,9 +4,10 @@ Phase 2: Replaces hardcoded Maria rules with flexible role system
 """
 
 from typing import Dict, List
-from datetime import datetime  # 🔧 Fix: Added missing import
 from ortools.sat.python import cp_model
 from models import SolverInput, Employee
+from derived_vars import DerivedVars, day_shift
+from elastic import require_at_least
 
 
 def add_role_based_shift_restrictions(
@@ -30,8 +31,7 @@ def add_role_based_shift_restrictions(
         # LIDER role restrictions (replaces Maria hardcoded rules)
         if 'LIDER' in emp.roles:
             for date_str in shifts[emp.id]:
-                date_obj = datetime.strptime(date_str, '%Y-%m-%d')  # 🔧 Fix: use datetime directly
-                is_weekend = date_obj.weekday() >= 5
+                is_weekend = input_data.calendar.is_weekend(date_str)
                 
                 for shift_type in emp.allowed_shifts:
                     shift_var = shifts[emp.id][date_str].get(shift_type.id)
@@ -107,7 +107,8 @@ def add_role_coverage_requirements(
     model: cp_model.CpModel,
     shifts: Dict,
     input_data: SolverInput,
-    role_requirements: Dict[str, Dict[str, int]]
+    role_requirements: Dict[str, Dict[str, int]],
+    derived: DerivedVars = None
 ):
     """
     Enforce role-based coverage requirements.
@@ -121,6 +122,8 @@ def add_role_coverage_requirements(
         }
     }
     """
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
     
     for date_str, requirements in role_requirements.items():
         for req_key, min_count in requirements.items():
@@ -150,23 +153,9 @@ def add_role_coverage_requirements(
                 if role not in emp.roles:
                     continue
                 
-                if emp.id not in shifts or date_str not in shifts[emp.id]:
-                    continue
-                
-                # Collect matching shift variables
-                matching_shifts = []
-                for shift_type in emp.allowed_shifts:
-                    if time_filter and not time_filter(shift_type):
-                        continue
-                    
-                    shift_var = shifts[emp.id][date_str].get(shift_type.id)
-                    if shift_var is not None:
-                        matching_shifts.append(shift_var)
-                
-                if matching_shifts:
-                    is_working = model.NewBoolVar(f'{emp.id}_{date_str}_{req_key}')
-                    model.Add(sum(matching_shifts) >= 1).OnlyEnforceIf(is_working)
-                    model.Add(sum(matching_shifts) == 0).OnlyEnforceIf(is_working.Not())
+                # Matching shifts -> shared indicator
+                is_working = derived.is_working(emp.id, date_str, time_filter, tag=req_key)
+                if is_working is not None:
                     working_with_role.append(is_working)
             
             # Enforce minimum count
@@ -174,10 +163,16 @@ def add_role_coverage_requirements(
                 model.Add(sum(working_with_role) >= min_count)
 
 
+def support_shift(shift_type) -> bool:
+    """Shifts that cover afternoon (e.g., 8-20, 14-20, 10-20)"""
+    return shift_type.start_hour < 20 and shift_type.end_hour >= 14
+
+
 def add_leader_support_constraint(
     model: cp_model.CpModel,
     shifts: Dict,
-    input_data: SolverInput
+    input_data: SolverInput,
+    derived: DerivedVars = None
 ):
     """
     Ensure LIDER has WYCHOWAWCA support when working.
@@ -185,8 +180,9 @@ def add_leader_support_constraint(
     Rule: When LIDER works a day shift (< 20:00), at least one WYCHOWAWCA 
     must be present on an overlapping or extended shift.
     """
-    
-    for date_str in input_data.get_date_list():
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+    for date_str in input_data.calendar.dates:
         # Find if any LIDER is working on day shift
         lider_working_day = []
         
@@ -194,20 +190,9 @@ def add_leader_support_constraint(
             if 'LIDER' not in emp.roles:
                 continue
             
-            if emp.id not in shifts or date_str not in shifts[emp.id]:
-                continue
-            
-            day_shifts = []
-            for shift_type in emp.allowed_shifts:
-                if shift_type.start_hour < 20:  # Day shift
-                    shift_var = shifts[emp.id][date_str].get(shift_type.id)
-                    if shift_var is not None:
-                        day_shifts.append(shift_var)
-            
-            if day_shifts:
-                lider_working = model.NewBoolVar(f'lider_{emp.id}_{date_str}_working')
-                model.Add(sum(day_shifts) >= 1).OnlyEnforceIf(lider_working)
-                model.Add(sum(day_shifts) == 0).OnlyEnforceIf(lider_working.Not())
+            # Day shift (< 20:00) indicator, shared with demand constraints
+            lider_working = derived.is_working(emp.id, date_str, day_shift, tag='day')
+            if lider_working is not None:
                 lider_working_day.append(lider_working)
         
         # If LIDER is working, ensure WYCHOWAWCA support
@@ -222,37 +207,22 @@ def add_leader_support_constraint(
                 if 'WYCHOWAWCA' not in emp.roles:
                     continue
                 
-                if emp.id not in shifts or date_str not in shifts[emp.id]:
-                    continue
-                
                 # Support shifts: longer day shifts that extend into afternoon/evening
-                support_shifts = []
-                for shift_type in emp.allowed_shifts:
-                    # Shifts that cover afternoon (e.g., 8-20, 14-20, 10-20)
-                    if shift_type.start_hour < 20 and shift_type.end_hour >= 14:
-                        shift_var = shifts[emp.id][date_str].get(shift_type.id)
-                        if shift_var is not None:
-                            support_shifts.append(shift_var)
-                
-                if support_shifts:
-                    is_supporting = model.NewBoolVar(f'wych_{emp.id}_{date_str}_support')
-                    model.Add(sum(support_shifts) >= 1).OnlyEnforceIf(is_supporting)
-                    model.Add(sum(support_shifts) == 0).OnlyEnforceIf(is_supporting.Not())
+                is_supporting = derived.is_working(emp.id, date_str, support_shift, tag='support')
+                if is_supporting is not None:
                     wychowawca_support.append(is_supporting)
             
             # If LIDER works, at least 1 WYCHOWAWCA must provide support
             if wychowawca_support:
                 model.Add(sum(wychowawca_support) >= 1).OnlyEnforceIf(any_lider)
 
-def add_leader_must_work_weekdays(model, shifts, input_data):
+def add_leader_must_work_weekdays(model, shifts, input_data, slack=None):
     """
     WYMUSZA: LIDER musi pracować każdy dzień roboczy
+    (w trybie elastycznym z luzem, patrz elastic.py)
     """
-    for date_str in input_data.get_date_list():
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-        is_weekend = date_obj.weekday() >= 5
-        
-        if is_weekend:
+    for date_str in input_data.calendar.dates:
+        if input_data.calendar.is_weekend(date_str):
             continue  # Weekendy pomijamy
         
         # Dla każdego LIDERA
@@ -273,4 +243,4 @@ def add_leader_must_work_weekdays(model, shifts, input_data):
             
             # WYMAGA: min 1 zmiana dzienna w dni robocze
             if day_shifts:
-                model.Add(sum(day_shifts) >= 1)
+                require_at_least(model, slack, "leader_weekdays", day_shifts, 1, date=date_str, employee=emp.id)
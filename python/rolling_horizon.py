@@ -0,0 +1,148 @@
+"""
+Rolling-horizon decomposition for OR-Tools Schedule Solver
+Long ranges (a quarter, a year) are split into overlapping windows, e.g. 14
+days solved, first 7 committed, next window starts 7 days later. Committed
+days are passed to the next window as multi-day history (existing_schedule +
+options.history_days), so 11h rest, consecutive days, weekly rest, weekly
+hours and night recovery hold across window borders.
+
+Rules over the whole range read the committed days too (SolverInput.rolling_range):
+hour balancing and weekend fairness add what every employee already worked
+before the window, and the free weekend counts committed weekends and is
+required only in the window that holds the last weekend of the range - not
+once per window.
+"""
+import sys
+from dataclasses import replace
+from models import SolverInput, SolverOutput
+from events import EVENTS
+from typing import Callable, Dict, List
+
+# Ile dni historii potrzebują reguły na styku okien:
+# dni z rzędu (5) i tydzień ISO przecięty startem okna (do 6 dni)
+WINDOW_HISTORY_DAYS = 7
+
+SolveFunction = Callable[[SolverInput], SolverOutput]
+
+
+def window_ranges(dates: List[str], window_days: int, step_days: int) -> List[tuple]:
+    """(first_offset, last_offset, committed_days) for every window"""
+    windows = []
+    start = 0
+    while start < len(dates):
+        end = min(start + window_days, len(dates)) - 1
+        if end == len(dates) - 1:
+            windows.append((start, end, end - start + 1))  # ostatnie okno - zatwierdzamy wszystko
+            break
+        windows.append((start, end, step_days))
+        start += step_days
+    return windows
+
+
+def _with_committed(existing_schedule: Dict, schedule: Dict[str, Dict[str, str]], dates: List[str]) -> Dict:
+    """existing_schedule with the committed dates replaced by the stitched result"""
+    employees = {}
+    for emp_data in existing_schedule.get('employees', []):
+        emp_id = emp_data.get('id')
+        employees[emp_id] = {**emp_data, 'shifts': dict(emp_data.get('shifts') or {})}
+
+    for emp_id, days in schedule.items():
+        emp_entry = employees.setdefault(emp_id, {'id': emp_id, 'shifts': {}})
+        for date_str in dates:
+            shift_id = days.get(date_str)
+            if shift_id:
+                emp_entry['shifts'][date_str] = shift_id
+            else:
+                emp_entry['shifts'].pop(date_str, None)  # brak wpisu = dzień wolny
+
+    return {**existing_schedule, 'employees': list(employees.values())}
+
+
+def solve_rolling(input_data: SolverInput, solve_window: SolveFunction) -> SolverOutput:
+    """
+    Solve the range window by window and stitch the committed parts.
+    Each window is an ordinary SolverInput handled by solve_window
+    (solve_schedule), so all builders work unchanged.
+    """
+    options = input_data.options
+    dates = input_data.calendar.dates
+    windows = window_ranges(dates, options.rolling_window_days, options.rolling_step_days)
+    print(f"Rolling horizon: {len(windows)} windows of {options.rolling_window_days} days, "
+          f"step {options.rolling_step_days}", file=sys.stderr)
+
+    window_options = replace(
+        options,
+        history_days=max(options.history_days, WINDOW_HISTORY_DAYS),
+        rolling_window_days=0
+    )
+
+    schedule: Dict[str, Dict[str, str]] = {emp.id: {} for emp in input_data.employees}
+    existing_schedule = input_data.existing_schedule
+    window_stats = []
+    total_time = 0.0
+    all_optimal = True
+
+    for number, (first, last, committed) in enumerate(windows, 1):
+        window_dates = dates[first:last + 1]
+        in_window = set(window_dates)
+        print(f"--- Window {number}/{len(windows)}: {window_dates[0]} to {window_dates[-1]} ---", file=sys.stderr)
+        EVENTS.emit("window", n=number, total=len(windows), start=window_dates[0], end=window_dates[-1])
+
+        window_input = replace(
+            input_data,
+            date_range=(window_dates[0], window_dates[-1]),
+            demand={date_str: spec for date_str, spec in input_data.demand.items() if date_str in in_window},
+            existing_schedule=existing_schedule,
+            options=window_options,
+            rolling_range=input_data.date_range
+        )
+        result = solve_window(window_input)
+
+        stats = result.stats or {}
+        total_time += stats.get('solve_time', 0.0)
+        window_stats.append({
+            "range": [window_dates[0], window_dates[-1]],
+            "committed": committed,
+            "status": stats.get('status'),
+            "objective_value": stats.get('objective_value'),
+            "solve_time": stats.get('solve_time'),
+            "stop_reason": stats.get('portfolio', stats.get('stop', {})).get('reason'),
+        })
+
+        if result.status != "SUCCESS":
+            return SolverOutput(
+                status="FAILED",
+                error=f"Window {window_dates[0]} to {window_dates[-1]}: {result.error}",
+                stats={
+                    "solve_time": total_time,
+                    "status": stats.get('status'),
+                    "rolling": {"windows": window_stats}
+                }
+            )
+
+        all_optimal = all_optimal and stats.get('status') == "OPTIMAL"
+
+        # Zatwierdź początek okna, reszta zostanie policzona ponownie w następnym
+        committed_dates = window_dates[:committed]
+        for emp_id, days in result.schedule.items():
+            for date_str in committed_dates:
+                if date_str in days:
+                    schedule.setdefault(emp_id, {})[date_str] = days[date_str]
+        existing_schedule = _with_committed(existing_schedule, result.schedule, committed_dates)
+
+    return SolverOutput(
+        status="SUCCESS",
+        schedule=schedule,
+        stats={
+            "solve_time": total_time,
+            # Każde okno optymalne nie oznacza optimum dla całego zakresu
+            "status": "FEASIBLE",
+            "all_windows_optimal": all_optimal,
+            "rolling": {
+                "window_days": options.rolling_window_days,
+                "step_days": options.rolling_step_days,
+                "windows": window_stats
+            }
+        },
+        violations=["Rolling horizon: windows solved separately, global optimum not guaranteed"]
+    )
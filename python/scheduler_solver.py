@@ -2,30 +2,41 @@
 """
 OR-Tools Schedule Solver
 Main solver for generating optimal work schedules
+
+Usage:
+    python3 scheduler_solver.py < input.json          # one solve, JSON on stdout
+    python3 scheduler_solver.py --worker              # NDJSON requests on stdin
+    python3 scheduler_solver.py --socket /tmp/s.sock  # NDJSON requests on a Unix socket
 """
 import sys
 import json
+import time
+import argparse
+import contextlib
+import traceback
 from ortools.sat.python import cp_model
-from models import SolverInput, SolverOutput, Employee, ShiftType, Constraint
+from ortools import __version__ as ortools_version
+from models import SolverInput, SolverOutput, SolverOptions, RepairRequest, Employee, ShiftType, Constraint
 from constraints import add_all_constraints
+from availability import Availability, build_availability
+from screening import screen_input, screening_error
+from result_cache import get_result_cache, is_cacheable
+from rolling_horizon import solve_rolling
+from repair import repair_schedule
+from events import EVENTS
+from profiler import profiling, run_builder
+from explain import ConstraintGuard, guarding, find_conflict
+from elastic import ElasticSlack, slack_messages
+from symmetry import find_interchangeable, add_symmetry_breaking
+from stopping import StopPolicy, StoppingCallback, SHUTDOWN, watching, deferring_signals, solve_interruptible, stop_report, time_limit
+from checkpoint import Checkpointer
+from streaming import ScheduleStream
+import portfolio
+from stopping import defaults as stop_defaults
+from warm_start import hint_source, collect_hints, apply_hints, hint_survival, schedule_hints
 from datetime import datetime, timedelta
 from typing import Dict, List
 
-# ============================================================================
-# 🎯 EARLY STOP CONFIGURATION - Dostosuj te wartości!
-# ============================================================================
-EARLY_STOP_ENABLED = True          # True = włączone, False = wyłączone
-EARLY_STOP_SCORE_THRESHOLD = 800   # Zatrzymaj gdy score < 600
-EARLY_STOP_MIN_SOLUTIONS = 10       # Znajdź minimum 5 rozwiązań przed early stop
-EARLY_STOP_NO_IMPROVEMENT_SEC = 600  # Zatrzymaj jeśli brak poprawy przez 5 minut
-
-# Proponowane wartości dla różnych okresów:
-# 7-14 dni:  THRESHOLD = 500,  MIN_SOLUTIONS = 3
-# 14-21 dni: THRESHOLD = 700,  MIN_SOLUTIONS = 4  
-# 21-28 dni: THRESHOLD = 800,  MIN_SOLUTIONS = 5
-# 28+ dni:   THRESHOLD = 1000, MIN_SOLUTIONS = 6
-# ============================================================================
-
 def parse_input(input_json: dict) -> SolverInput:
     """Parse JSON input into SolverInput object"""
     # Parse employees
@@ -51,18 +62,7 @@ def parse_input(input_json: dict) -> SolverInput:
         employees.append(employee)
     
     # Parse constraints
-    constraints = []
-    for const_data in input_json.get('constraints', []):
-        constraint = Constraint(
-            type=const_data['type'],
-            employee_id=const_data.get('employeeId'),
-            date=const_data.get('date'),
-            date_range=tuple(const_data['dateRange']) if const_data.get('dateRange') else None,
-            value=const_data.get('value'),
-            description=const_data.get('description', ''),
-            is_hard=const_data.get('isHard', True)
-        )
-        constraints.append(constraint)
+    constraints = [parse_constraint(const_data) for const_data in input_json.get('constraints', [])]
     
     # Parse date range
     date_range = (
@@ -76,26 +76,59 @@ def parse_input(input_json: dict) -> SolverInput:
     # Parse existing schedule
     existing_schedule = input_json.get('existingSchedule', {})
     
+    # Parse solver options (optional)
+    options = SolverOptions.from_dict(input_json.get('options', {}))
+    
+    # Parse repair request (optional)
+    repair = None
+    repair_data = input_json.get('repair')
+    if repair_data:
+        repair = RepairRequest.from_dict(
+            repair_data,
+            [parse_constraint(const_data) for const_data in repair_data.get('changes', [])]
+        )
+    
     return SolverInput(
         employees=employees,
         constraints=constraints,
         date_range=date_range,
         demand=demand,
-        existing_schedule=existing_schedule
+        existing_schedule=existing_schedule,
+        options=options,
+        repair=repair
+    )
+
+def parse_constraint(const_data: dict) -> Constraint:
+    """Parse one constraint JSON object"""
+    return Constraint(
+        type=const_data['type'],
+        employee_id=const_data.get('employeeId'),
+        date=const_data.get('date'),
+        date_range=tuple(const_data['dateRange']) if const_data.get('dateRange') else None,
+        value=const_data.get('value'),
+        description=const_data.get('description', ''),
+        is_hard=const_data.get('isHard', True)
     )
 
-def create_shift_variables(model: cp_model.CpModel, input_data: SolverInput) -> Dict:
+def create_shift_variables(model: cp_model.CpModel, input_data: SolverInput, availability: Availability = None) -> Dict:
     """
     Create decision variables for the model
     shifts[employee_id][date][shift_type_id] = BoolVar
+    With availability, pinned cells get the shared constants 0/1 instead of a BoolVar.
     """
     shifts = {}
+    zero = model.NewConstant(0)
+    one = model.NewConstant(1)
     
     for emp in input_data.employees:
         shifts[emp.id] = {}
-        for date_str in input_data.get_date_list():
+        for offset, date_str in enumerate(input_data.calendar.dates):
             shifts[emp.id][date_str] = {}
-            for shift_type in emp.allowed_shifts:
+            for position, shift_type in enumerate(emp.allowed_shifts):
+                if availability is not None and not availability.is_free(emp.id, offset, position):
+                    pinned = availability.is_fixed(emp.id, offset, position)
+                    shifts[emp.id][date_str][shift_type.id] = one if pinned else zero
+                    continue
                 var_name = f"{emp.id}_{date_str}_{shift_type.id}"
                 shifts[emp.id][date_str][shift_type.id] = model.NewBoolVar(var_name)
     
@@ -118,20 +151,18 @@ def extract_schedule(solver: cp_model.CpSolver, shifts: Dict, employees: List[Em
     
     return schedule
 
-def solve_schedule(input_data: SolverInput) -> SolverOutput:
+def solve_schedule(input_data: SolverInput, frozen: Dict[str, Dict[str, str]] = None) -> SolverOutput:
     """
     Main solver function
+    frozen: cells pinned to a given value (repair mode), see build_availability
     """
     print(f"Solving schedule for {len(input_data.employees)} employees", file=sys.stderr)
     print(f"Date range: {input_data.date_range[0]} to {input_data.date_range[1]}", file=sys.stderr)
+    print(f"Sequence encoding: {input_data.options.sequence_encoding}", file=sys.stderr)
     
     # Create model
     model = cp_model.CpModel()
     
-    # Create variables
-    print("Creating variables...", file=sys.stderr)
-    shifts = create_shift_variables(model, input_data)
-    
     # --- ZMIANA: POBIERANIE HISTORII ---
     # Próbujemy pobrać historię zmian z poprzedniego dnia
     try:
@@ -141,105 +172,206 @@ def solve_schedule(input_data: SolverInput) -> SolverOutput:
         print(f"Warning: Failed to load history shifts: {e}", file=sys.stderr)
         history_shifts = {}
     # -----------------------------------
-
-    # Add constraints
-    print("Adding constraints...", file=sys.stderr)
-    add_all_constraints(model, shifts, input_data, history_shifts)
-    # ------------------------------------
     
-    # ========================================================================
-    # 🎯 EARLY STOP CALLBACK
-    # ========================================================================
-    class SolutionCallback(cp_model.CpSolverSolutionCallback):
-        """Callback to monitor solutions and stop early if conditions are met"""
-        def __init__(self):
-            cp_model.CpSolverSolutionCallback.__init__(self)
-            self.solution_count = 0
-            self.best_score = float('inf')
-            self.last_improvement_time = 0
-            self.start_time = None
-            
-        def on_solution_callback(self):
-            if self.start_time is None:
-                self.start_time = self.WallTime()
-                
-            self.solution_count += 1
-            current_score = self.ObjectiveValue()
-            current_time = self.WallTime()
-            
-            # Log progress
-            print(f"Solution #{self.solution_count}: score={current_score}, time={current_time:.1f}s", file=sys.stderr)
-            
-            if not EARLY_STOP_ENABLED:
-                self.best_score = current_score
-                return
-            
-            # Check if score improved
-            if current_score < self.best_score:
-                self.best_score = current_score
-                self.last_improvement_time = current_time
-            
-            # EARLY STOP CONDITION 1: Score threshold reached
-            if current_score < EARLY_STOP_SCORE_THRESHOLD and self.solution_count >= EARLY_STOP_MIN_SOLUTIONS:
-                print(f"🎯 Early stop! Score {current_score} < {EARLY_STOP_SCORE_THRESHOLD} (after {self.solution_count} solutions)", file=sys.stderr)
-                self.StopSearch()
-                return
-            
-            # EARLY STOP CONDITION 2: No improvement for X seconds
-            time_since_improvement = current_time - self.last_improvement_time
-            if time_since_improvement > EARLY_STOP_NO_IMPROVEMENT_SEC and self.solution_count >= EARLY_STOP_MIN_SOLUTIONS:
-                print(f"⏱️ Early stop! No improvement for {time_since_improvement:.0f}s (best: {self.best_score})", file=sys.stderr)
-                self.StopSearch()
-                return
-    
-    # ========================================================================
+    # Pre-pass: komórki przypięte (absencje, role, historia, FIXED) nie dostają zmiennych.
+    # W trybie explain reguły muszą zostać ograniczeniami, które da się wyłączyć
+    explain = input_data.options.explain
+    availability = build_availability(input_data, history_shifts, frozen, prune=not explain)
+    pruning_stats = availability.stats()
+    print(f"Variable pruning: {pruning_stats}", file=sys.stderr)
+    EVENTS.emit("build", phase="availability", **pruning_stats)
+
+    # Szybki test wykonalności - oczywiste sprzeczności bez budowania modelu
+    screening_start = time.time()
+    # (explain pomija screening - bitmapa nie ma przypięć, a diagnoza i tak wskaże konflikt)
+    issues = [] if explain else screen_input(input_data, availability, history_shifts, input_data.options.elastic)
+    screening_seconds = time.time() - screening_start
+    EVENTS.emit("build", phase="screening", issues=len(issues), seconds=round(screening_seconds, 4))
+    if issues:
+        error = screening_error(issues)
+        print(f"✗ {error}", file=sys.stderr)
+        return SolverOutput(
+            status="FAILED",
+            error=error,
+            stats={
+                "solve_time": 0.0,
+                "status": "INFEASIBLE",
+                "screening": {"seconds": screening_seconds, "issues": issues}
+            },
+            violations=[issue["message"] for issue in issues]
+        )
     
+    with profiling(model, input_data.options.profile) as profile_report, guarding(model, explain) as guard:
+        # Create variables
+        print("Creating variables...", file=sys.stderr)
+        shifts = run_builder("shift_variables", "setup", create_shift_variables, model, input_data, availability)
+
+        # Add constraints
+        print("Adding constraints...", file=sys.stderr)
+        slack = ElasticSlack(model, input_data) if input_data.options.elastic else None
+        derived = add_all_constraints(model, shifts, input_data, history_shifts, slack)
+
+        # Zamienni pracownicy: jeden porządek wierszy zamiast wszystkich permutacji
+        symmetry_stats = None
+        if input_data.options.symmetry_breaking:
+            groups = find_interchangeable(input_data, availability)
+            symmetry_stats = run_builder("symmetry_breaking", "hard", add_symmetry_breaking, model, shifts, input_data, groups)
+        if explain:
+            assumptions = guard.guard(shifts, input_data, derived)
+    print(f"Derived variables: {derived.stats()}", file=sys.stderr)
+    if EVENTS.enabled:
+        proto = model.Proto()
+        EVENTS.emit("build", phase="model", variables=len(proto.variables), constraints=len(proto.constraints))
+
+    if explain:
+        return explain_schedule(model, shifts, input_data, guard, assumptions)
+
+    # Warm start: szkic grafiku jako podpowiedzi dla solvera
+    hints = collect_hints(input_data)
+    hinted_vars = apply_hints(model, shifts, hints) if hints else 0
+    if hints:
+        print(f"Warm start ({hint_source(input_data)}): {hinted_vars} hinted variables, "
+              f"stability weight {input_data.options.stability_weight}", file=sys.stderr)
+    # ------------------------------------
+
+    checkpointer = Checkpointer(input_data, shifts) if input_data.options.checkpoint_path else None
+
+    # Dwie fazy: najpierw szybki grafik spełniający reguły twarde, potem optymalizacja od niego
+    first_phase, first_schedule = None, None
+    if input_data.options.two_phase:
+        # Od fazy 1 do przekazania podpowiedzi sygnał tylko ustawia SHUTDOWN - grafik fazy 1 nie przepada
+        with deferring_signals():
+            first_phase, first_schedule = solve_first_phase(model, shifts, input_data, slack)
+            if first_phase["status"] == "INFEASIBLE":
+                print("✗ No solution found (INFEASIBLE, first phase)", file=sys.stderr)
+                return SolverOutput(
+                    status="FAILED",
+                    error="No feasible solution exists. Constraints are too restrictive.",
+                    stats={
+                        "solve_time": first_phase["seconds"],
+                        "status": "INFEASIBLE",
+                        "two_phase": first_phase
+                    }
+                )
+            if first_schedule is not None:
+                model.ClearHints()
+                first_phase["hinted_vars"] = apply_hints(model, shifts, schedule_hints(first_schedule, input_data))
+                first_phase["published"] = publish_first_phase(first_schedule, first_phase, checkpointer)
+            if SHUTDOWN.is_set():
+                stop_stats = {"reason": "interrupted", "gap": None, "solutions": 1 if first_schedule is not None else 0}
+                EVENTS.emit("final", status=first_phase["status"], objective=first_phase.get("objective_value"),
+                            solve_time=first_phase["seconds"], stop_reason="interrupted")
+                return first_phase_result(first_phase, first_schedule, stop_stats)
+
     # Solve
     print("Solving...", file=sys.stderr)
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 1800.0  # 30 minutes timeout
+    policy = StopPolicy.resolve(input_data.options, len(model.Proto().variables))
+    if first_phase is not None:
+        policy.max_time_seconds = max(1.0, policy.max_time_seconds - first_phase["seconds"])
+    policy.apply(solver)
+    configure_solver(solver, input_data.options)
     solver.parameters.log_search_progress = False
-    
-    # Use callback if early stop enabled
-    if EARLY_STOP_ENABLED:
-        callback = SolutionCallback()
-        print(f"Early stop: ENABLED (threshold={EARLY_STOP_SCORE_THRESHOLD}, min_solutions={EARLY_STOP_MIN_SOLUTIONS})", file=sys.stderr)
-        status = solver.Solve(model, callback)
-    else:
-        print("Early stop: DISABLED", file=sys.stderr)
-        status = solver.Solve(model)
+    if hinted_vars and first_schedule is None:
+        # Po drobnej zmianie podpowiedź bywa niespójna - solver najpierw próbuje ją naprawić
+        solver.parameters.repair_hint = True
+
+    EVENTS.emit("solve", max_time_seconds=solver.parameters.max_time_in_seconds, hinted_vars=hinted_vars)
+    print(f"Stop policy: {policy.describe()}", file=sys.stderr)
+    # Pośrednie grafiki tylko gdy ktoś czyta zdarzenia; w trybie dwufazowym zawsze (jako zmiany)
+    stream_mode = input_data.options.stream_schedules
+    if stream_mode == "off" and first_schedule is not None:
+        stream_mode = "diff"
+    stream = ScheduleStream(input_data, shifts, stream_mode) if stream_mode != "off" and EVENTS.enabled else None
+    if stream and first_schedule is not None:
+        stream.sent = first_schedule  # pierwsza poprawa trafi jako zmiany względem fazy 1 (n=0)
+    callback = StoppingCallback(policy, [listener for listener in (checkpointer, stream) if listener],
+                                shared=portfolio.SHARED)
+    with watching(solver, callback):
+        status = solve_interruptible(solver, model, callback)
+    stop_stats = stop_report(status, solver, callback)
+    if checkpointer:
+        checkpointer.finish(solver, callback, status in (cp_model.OPTIMAL, cp_model.FEASIBLE))
+        stop_stats["checkpoint"] = checkpointer.report()
+    if stream:
+        stop_stats["stream"] = stream.report()
+    print(f"Stopped: {stop_stats['reason']} (gap: {stop_stats['gap']})", file=sys.stderr)
+    if status == cp_model.OPTIMAL and stop_stats["reason"] != "optimal":
+        # relative_gap_limit kończy ze statusem OPTIMAL - raportujemy optimum tylko udowodnione
+        status = cp_model.FEASIBLE
 
+    if EVENTS.enabled:
+        found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        EVENTS.emit("final", status=solver.StatusName(status),
+                    objective=solver.ObjectiveValue() if found else None,
+                    bound=solver.BestObjectiveBound() if found else None,
+                    solve_time=round(solver.WallTime(), 3), stop_reason=stop_stats["reason"], gap=stop_stats["gap"])
     
     # Extract solution
     if status == cp_model.OPTIMAL:
         print("✓ Optimal solution found!", file=sys.stderr)
         schedule = extract_schedule(solver, shifts, input_data.employees)
+        stats = {
+            "solve_time": solver.WallTime(),
+            "status": "OPTIMAL",
+            "objective_value": solver.ObjectiveValue() if solver.ObjectiveValue() else 0,
+            "num_conflicts": solver.NumConflicts(),
+            "num_branches": solver.NumBranches(),
+            "derived_vars": derived.stats(),
+            "pruning": pruning_stats,
+            "stop": stop_stats
+        }
+        if profile_report:
+            stats["profile"] = profile_report
+        if symmetry_stats and symmetry_stats["groups"]:
+            stats["symmetry"] = symmetry_stats
+        if hints:
+            stats["warm_start"] = {"source": hint_source(input_data), "hinted_vars": hinted_vars, **hint_survival(schedule, hints)}
+        if first_phase is not None:
+            stats["two_phase"] = first_phase
+        violations = []
+        if slack is not None:
+            stats["elastic"] = slack.report(solver)
+            violations = slack_messages(stats["elastic"])
         return SolverOutput(
             status="SUCCESS",
             schedule=schedule,
-            stats={
-                "solve_time": solver.WallTime(),
-                "status": "OPTIMAL",
-                "objective_value": solver.ObjectiveValue() if solver.ObjectiveValue() else 0,
-                "num_conflicts": solver.NumConflicts(),
-                "num_branches": solver.NumBranches()
-            }
+            stats=stats,
+            violations=violations
         )
     elif status == cp_model.FEASIBLE:
         print("✓ Feasible solution found (not optimal)", file=sys.stderr)
         schedule = extract_schedule(solver, shifts, input_data.employees)
+        stats = {
+            "solve_time": solver.WallTime(),
+            "status": "FEASIBLE",
+            "objective_value": solver.ObjectiveValue() if solver.ObjectiveValue() else 0,
+            "num_conflicts": solver.NumConflicts(),
+            "num_branches": solver.NumBranches(),
+            "derived_vars": derived.stats(),
+            "pruning": pruning_stats,
+            "stop": stop_stats
+        }
+        if profile_report:
+            stats["profile"] = profile_report
+        if symmetry_stats and symmetry_stats["groups"]:
+            stats["symmetry"] = symmetry_stats
+        if hints:
+            stats["warm_start"] = {"source": hint_source(input_data), "hinted_vars": hinted_vars, **hint_survival(schedule, hints)}
+        if first_phase is not None:
+            stats["two_phase"] = first_phase
+        violations = ["Solution is feasible but not optimal"]
+        if slack is not None:
+            stats["elastic"] = slack.report(solver)
+            violations += slack_messages(stats["elastic"])
         return SolverOutput(
             status="SUCCESS",
             schedule=schedule,
-            stats={
-                "solve_time": solver.WallTime(),
-                "status": "FEASIBLE",
-                "objective_value": solver.ObjectiveValue() if solver.ObjectiveValue() else 0,
-                "num_conflicts": solver.NumConflicts(),
-                "num_branches": solver.NumBranches()
-            },
-            violations=["Solution is feasible but not optimal"]
+            stats=stats,
+            violations=violations
         )
+    elif first_schedule is not None and status == cp_model.UNKNOWN:
+        return first_phase_result(first_phase, first_schedule, stop_stats)
     elif status == cp_model.INFEASIBLE:
         print("✗ No solution found (INFEASIBLE)", file=sys.stderr)
         return SolverOutput(
@@ -247,7 +379,8 @@ def solve_schedule(input_data: SolverInput) -> SolverOutput:
             error="No feasible solution exists. Constraints are too restrictive.",
             stats={
                 "solve_time": solver.WallTime(),
-                "status": "INFEASIBLE"
+                "status": "INFEASIBLE",
+                "stop": stop_stats
             }
         )
     else:
@@ -257,50 +390,382 @@ def solve_schedule(input_data: SolverInput) -> SolverOutput:
             error=f"Solver failed: {solver.StatusName(status)}",
             stats={
                 "solve_time": solver.WallTime(),
-                "status": solver.StatusName(status)
+                "status": solver.StatusName(status),
+                "stop": stop_stats
+            }
+        )
+
+def solve_first_phase(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput,
+                      slack: ElasticSlack = None):
+    """
+    Two-phase mode, phase 1: the model without the soft objective (elastic mode
+    keeps only the slack penalty) under options.first_phase_seconds. The first
+    schedule found is published right away as a "schedule" event (n=0).
+    Returns (report for stats["two_phase"], schedule or None).
+    """
+    options = input_data.options
+    hard_model = model.Clone()
+    hard_model.ClearObjective()
+    penalty = slack.penalty() if slack is not None else None
+    if penalty is not None:
+        hard_model.Minimize(penalty)
+
+    solver = cp_model.CpSolver()
+    policy = StopPolicy(options.first_phase_seconds, None, None, 1, None, len(hard_model.Proto().variables))
+    policy.apply(solver)
+    configure_solver(solver, options)
+    started = time.time()
+    with EVENTS.bind(phase="feasible"):
+        # SIGTERM/SIGINT także w fazie 1 - kończy szukanie zamiast zabijać proces
+        callback = StoppingCallback(policy)
+        status = solve_interruptible(solver, hard_model, callback)
+    report = {"status": solver.StatusName(status), "seconds": round(time.time() - started, 3)}
+    if callback.stop_reason is not None:
+        report["stop_reason"] = callback.stop_reason
+    print(f"First phase (hard rules only): {report['status']} in {report['seconds']:.1f}s", file=sys.stderr)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return report, None
+
+    schedule = extract_schedule(solver, shifts, input_data.employees)
+    # Wartość właściwej funkcji celu dla grafiku fazy 1 (gdyby na nim się skończyło)
+    report["objective_value"] = objective_at(model, solver)
+    EVENTS.emit("schedule", phase="feasible", mode="full", n=0, wall_time=report["seconds"], schedule=schedule)
+    return report, schedule
+
+def publish_first_phase(schedule: Dict, first_phase: Dict, checkpointer: Checkpointer = None) -> List[str]:
+    """
+    Where the phase 1 schedule went: the "schedule" event (--events) and the
+    checkpoint file. Without either, the caller sees it only as the fallback result.
+    """
+    published = []
+    if EVENTS.enabled:
+        published.append("events")
+    if checkpointer is not None:
+        checkpointer.publish_first_phase(schedule, first_phase)
+        published.append("checkpoint")
+    if not published:
+        print("Warning: twoPhase without --events or checkpointPath - the first phase schedule "
+              "is returned only if the second phase finds nothing", file=sys.stderr)
+    return published
+
+def first_phase_result(first_phase: Dict, schedule: Dict, stop_stats: Dict) -> SolverOutput:
+    """
+    The second phase produced nothing (interrupted or out of time before its
+    first solution): fall back to the hard-rules schedule of phase 1, if any
+    """
+    if schedule is None:
+        print("✗ Stopped before the first phase found a schedule", file=sys.stderr)
+        return SolverOutput(
+            status="FAILED",
+            error=f"Solver stopped ({stop_stats['reason']}) before a schedule was found",
+            stats={
+                "solve_time": first_phase["seconds"],
+                "status": first_phase["status"],
+                "stop": stop_stats,
+                "two_phase": first_phase
             }
         )
+    print("✓ Returning the first phase schedule (hard rules only)", file=sys.stderr)
+    return SolverOutput(
+        status="SUCCESS",
+        schedule=schedule,
+        stats={
+            "solve_time": first_phase["seconds"],
+            "status": "FEASIBLE",
+            "objective_value": first_phase["objective_value"],
+            "stop": stop_stats,
+            "two_phase": first_phase
+        },
+        violations=["Solution is feasible but not optimal",
+                    "First phase schedule only: soft preferences were not optimised"]
+    )
+
+def objective_at(model: cp_model.CpModel, solver: cp_model.CpSolver) -> float:
+    """Objective of model evaluated at the solver's last solution (solved on a clone of model)"""
+    objective = model.Proto().objective
+    values = solver.ResponseProto().solution
+    total = sum(coeff * (values[var] if var >= 0 else -values[-var - 1])
+                for var, coeff in zip(objective.vars, objective.coeffs))
+    return (total + objective.offset) * (objective.scaling_factor or 1)
+
+def configure_solver(solver: cp_model.CpSolver, options: SolverOptions):
+    """options.num_workers and options.solver_parameters (SatParameters field names)"""
+    if options.num_workers:
+        solver.parameters.num_workers = options.num_workers
+    for name, value in options.solver_parameters.items():
+        if name.startswith('_') or not hasattr(solver.parameters, name):
+            raise ValueError(f"Invalid solverParameters: unknown parameter {name}")
+        setattr(solver.parameters, name, value)
+
+def explain_schedule(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput,
+                     guard: ConstraintGuard, assumptions: List[int]) -> SolverOutput:
+    """
+    Explain mode: feasibility only, every guarded rule/constraint is an assumption.
+    INFEASIBLE -> the conflicting rules, employees and dates (stats.explain.conflict).
+    """
+    model.ClearObjective()
+    max_time = time_limit(input_data.options, len(model.Proto().variables))
+    print(f"Explain mode: {len(assumptions)} assumptions, {guard.unguarded} unguarded constraints", file=sys.stderr)
+    EVENTS.emit("solve", max_time_seconds=max_time, assumptions=len(assumptions))
+
+    started = time.time()
+    status, solver, core, minimal = find_conflict(model, assumptions, max_time)
+    stats = {
+        "solve_time": time.time() - started,
+        "status": solver.StatusName(status),
+        "explain": {"assumptions": len(assumptions), "unguarded": guard.unguarded}
+    }
+    EVENTS.emit("final", status=solver.StatusName(status), wall_time=round(stats["solve_time"], 3), conflict=len(core))
+
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        print("✓ Explain: constraints are satisfiable", file=sys.stderr)
+        return SolverOutput(
+            status="SUCCESS",
+            schedule=extract_schedule(solver, shifts, input_data.employees),
+            stats=stats,
+            violations=["Explain mode: feasible schedule, not optimised"]
+        )
+    if status == cp_model.INFEASIBLE:
+        conflict = guard.describe(core, input_data)
+        stats["explain"].update(conflict=conflict, minimal=minimal)
+        if conflict:
+            error = "No feasible solution exists. Conflicting rules: " + "; ".join(item["message"] for item in conflict)
+        else:
+            error = "No feasible solution exists. The conflict is in cells frozen by repair or rules that cannot be switched off."
+        print(f"✗ {error}", file=sys.stderr)
+        return SolverOutput(
+            status="FAILED",
+            error=error,
+            stats=stats,
+            violations=[item["message"] for item in conflict]
+        )
+    print(f"✗ Explain: solver stopped with status {solver.StatusName(status)}", file=sys.stderr)
+    return SolverOutput(
+        status="FAILED",
+        error=f"Solver failed: {solver.StatusName(status)}",
+        stats=stats
+    )
+
+def solve_input(input_data: SolverInput) -> SolverOutput:
+    """One model for the whole range, rolling-horizon windows (options.rollingWindowDays), a local repair or a process portfolio"""
+    if input_data.repair is not None:
+        return repair_schedule(input_data, solve_schedule)
+    # Portfolio: każde rozwiązanie (lub okno) liczone równolegle przez kilka procesów
+    solve = portfolio.solve_portfolio if input_data.options.portfolio else solve_schedule
+    if input_data.options.rolling_window_days:
+        return solve_rolling(input_data, solve)
+    return solve(input_data)
+
+def output_to_dict(result: SolverOutput) -> dict:
+    """Convert SolverOutput to a JSON-serializable dict"""
+    return {
+        "status": result.status,
+        "schedule": result.schedule,
+        "stats": result.stats,
+        "violations": result.violations,
+        "error": result.error
+    }
+
+def error_to_dict(error: Exception) -> dict:
+    """Build the FAILED payload returned when a request crashes"""
+    return {
+        "status": "FAILED",
+        "error": str(error),
+        "schedule": {},
+        "stats": {},
+        "violations": []
+    }
+
+def solver_settings() -> dict:
+    """Solver configuration that changes the result (part of the cache key)"""
+    return {
+        "stop_policy": stop_defaults(),
+        "ortools": ortools_version,
+    }
+
+def solve_request(input_json: dict, cache_mode: str = None) -> dict:
+    """
+    Parse a single JSON request, solve it and return the output dict.
+    cache_mode overrides options.cache ("use" / "bypass" / "fresh").
+    """
+    print("Parsing input...", file=sys.stderr)
+    input_data = parse_input(input_json)
+    EVENTS.emit("parse", employees=len(input_data.employees), days=len(input_data.calendar),
+                constraints=len(input_data.constraints))
+    mode = cache_mode or input_data.options.cache_mode
+    if input_data.options.profile and mode == "use":
+        mode = "bypass"  # profil opisuje budowę modelu, której przy trafieniu w cache nie ma
+
+    cache = get_result_cache() if mode != "bypass" else None
+    if cache is None:
+        return output_to_dict(solve_input(input_data))
+
+    key = cache.key_for(input_data, solver_settings())
+    # Blokada per klucz: drugie identyczne żądanie czeka na pierwsze i dostaje wynik z cache
+    with cache.lock(key):
+        if mode == "fresh":
+            cache.record_refresh()
+        else:
+            cached = cache.get(key)
+            if cached is not None:
+                print(f"Cache hit: {key[:12]}", file=sys.stderr)
+                EVENTS.emit("cache", hit=True, key=key)
+                cached.setdefault('stats', {})['cache'] = {"hit": True, "key": key}
+                return cached
+
+        output = output_to_dict(solve_input(input_data))
+        if is_cacheable(output):
+            cache.put(key, output)
+
+    output['stats']['cache'] = {"hit": False, "key": key, "mode": mode}
+    return output
+
+# ============================================================================
+# 🔁 WORKER MODE - jeden proces Pythona obsługuje wiele żądań
+# ============================================================================
+# Protokół: jedna linia JSON = jedno żądanie, jedna linia JSON = jedna odpowiedź.
+#   -> {"id": "abc", "input": { ...SolverInput JSON... }}
+#   <- {"id": "abc", "status": "SUCCESS", "schedule": {...}, ...}
+# Zamiast "input" można podać pola SolverInput bezpośrednio w obiekcie żądania.
+# ============================================================================
+
+def handle_worker_line(line: str, cache_mode: str = None) -> dict:
+    """Solve one NDJSON request line and return the response tagged with its id"""
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get('id', request.get('requestId'))
+        payload = request.get('input', request)
+
+        # Logi z konstruktorów modelu nie mogą trafić do kanału odpowiedzi
+        with contextlib.redirect_stdout(sys.stderr), EVENTS.bind(id=request_id):
+            output = solve_request(payload, cache_mode)
+    except Exception as e:
+        print(f"ERROR: {str(e)}", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        output = error_to_dict(e)
+
+    return {"id": request_id, **output}
+
+def run_worker(stream_in, stream_out, cache_mode: str = None):
+    """Read NDJSON requests from stream_in until EOF, write one response line each"""
+    print("Worker ready (stdin)", file=sys.stderr)
+    for line in stream_in:
+        if not line.strip():
+            continue
+        response = handle_worker_line(line, cache_mode)
+        stream_out.write(json.dumps(response) + "\n")
+        stream_out.flush()
+        if SHUTDOWN.is_set():
+            print("Worker stopping (signal received)", file=sys.stderr)
+            break
+
+def serve_unix_socket(socket_path: str, cache_mode: str = None):
+    """Serve NDJSON requests on a Unix socket; solves are run one at a time"""
+    import os
+    import socketserver
+    import threading
+
+    solve_lock = threading.Lock()
 
-def main():
+    class WorkerHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode('utf-8')
+                if not line.strip():
+                    continue
+                with solve_lock:
+                    response = handle_worker_line(line, cache_mode)
+                self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+                self.wfile.flush()
+
+    class WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    with WorkerServer(socket_path, WorkerHandler) as server:
+        print(f"Worker ready (socket: {socket_path})", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+def main(argv=None):
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="OR-Tools Schedule Solver")
+    parser.add_argument('--worker', action='store_true',
+                        help="Long-lived mode: NDJSON requests on stdin, one response line per request")
+    parser.add_argument('--socket', metavar='PATH',
+                        help="Long-lived mode: NDJSON requests on a Unix socket")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Do not read or write the result cache")
+    parser.add_argument('--fresh', action='store_true',
+                        help="Always solve, then refresh the cached result")
+    parser.add_argument('--cache-stats', action='store_true',
+                        help="Print result cache statistics as JSON and exit")
+    parser.add_argument('--events', metavar='FD', type=int, nargs='?', const=3,
+                        help="Write NDJSON progress events to file descriptor FD (default 3)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile model construction per builder (table on stderr, stats.profile)")
+    parser.add_argument('--explain', action='store_true',
+                        help="On INFEASIBLE, report the conflicting rules and constraints (stats.explain)")
+    parser.add_argument('--checkpoint', metavar='PATH',
+                        help="Write the best schedule so far to PATH while solving (options.checkpointPath)")
+    parser.add_argument('--resume', metavar='PATH',
+                        help="Warm start from a checkpoint or previous output file (options.previousSchedule)")
+    args = parser.parse_args(argv)
+
+    if args.events is not None:
+        try:
+            EVENTS.open(args.events)
+        except OSError as e:
+            print(f"Warning: events disabled, descriptor {args.events} not open: {e}", file=sys.stderr)
+
+    if args.cache_stats:
+        cache = get_result_cache()
+        print(json.dumps(cache.stats() if cache else {"enabled": False}, indent=2))
+        return
+
+    cache_mode = "bypass" if args.no_cache else "fresh" if args.fresh else None
+
+    if args.socket:
+        with contextlib.redirect_stdout(sys.stderr):
+            serve_unix_socket(args.socket, cache_mode)
+        return
+
+    if args.worker:
+        run_worker(sys.stdin, sys.stdout, cache_mode)
+        return
+
     try:
         # Read JSON from stdin
         print("Reading input from stdin...", file=sys.stderr)
         input_json = json.load(sys.stdin)
+        if args.profile:
+            input_json.setdefault('options', {})['profile'] = True
+        if args.explain:
+            input_json.setdefault('options', {})['explain'] = True
+        if args.checkpoint:
+            input_json.setdefault('options', {})['checkpointPath'] = args.checkpoint
+        if args.resume:
+            with open(args.resume, encoding='utf-8') as f:
+                input_json.setdefault('options', {})['previousSchedule'] = json.load(f)
         
-        # Parse input
-        print("Parsing input...", file=sys.stderr)
-        input_data = parse_input(input_json)
-        
-        # Solve
-        result = solve_schedule(input_data)
-        
-        # Convert to dict for JSON serialization
-        output = {
-            "status": result.status,
-            "schedule": result.schedule,
-            "stats": result.stats,
-            "violations": result.violations,
-            "error": result.error
-        }
+        # Parse input + Solve (stdout = wyłącznie wynik JSON)
+        with contextlib.redirect_stdout(sys.stderr):
+            output = solve_request(input_json, cache_mode)
         
         # Output JSON to stdout
         print(json.dumps(output, indent=2))
         
     except Exception as e:
         print(f"ERROR: {str(e)}", file=sys.stderr)
-        import traceback
         traceback.print_exc(file=sys.stderr)
         
         # Output error as JSON
-        error_output = {
-            "status": "FAILED",
-            "error": str(e),
-            "schedule": {},
-            "stats": {},
-            "violations": []
-        }
-        print(json.dumps(error_output, indent=2))
+        print(json.dumps(error_to_dict(e), indent=2))
         sys.exit(1)
 
 if __name__ == "__main__":
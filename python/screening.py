@@ -0,0 +1,148 @@
+"""
+Pre-solve feasibility screening for OR-Tools Schedule Solver
+Cheap per-day checks on the availability bitmap, run before any constraint
+is built. Each check is a necessary condition of a hard builder (demand,
+min one night shift, coverage points, LIDER weekdays and support, one shift
+per day with FIXED cells), so a reported issue means CP-SAT would answer
+INFEASIBLE - only later and slower. A check is skipped exactly when its
+builder would skip the constraint (nobody has a matching shift at all).
+Rules relaxed by elastic mode are not checked.
+"""
+from availability import Availability
+from constraints import COVERAGE_POINTS
+from derived_vars import day_shift, night_start_shift
+from role_constraints import support_shift
+from models import SolverInput, ShiftType, SHIFT_CATALOG
+from typing import Any, Callable, Collection, Dict, List, Set
+
+MAX_DATES_IN_ERROR = 5
+
+
+def _issue(rule: str, date_str: str, message: str, **details: Any) -> Dict[str, Any]:
+    return {"rule": rule, "date": date_str, "message": message, **details}
+
+
+def screen_input(input_data: SolverInput, availability: Availability, history_shifts: Dict[str, ShiftType],
+                 relaxed: Collection[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Issues that make the model infeasible, one per (rule, date); empty = nothing obvious.
+    relaxed: builders with elastic slack (options.elastic) - their checks are skipped
+    """
+    cal = input_data.calendar
+    employees = input_data.employees
+    issues: List[Dict[str, Any]] = []
+    absences = input_data.get_absence_dates()
+    leaders = [emp for emp in employees if 'LIDER' in emp.roles]
+    helpers = [emp for emp in employees if 'WYCHOWAWCA' in emp.roles]
+
+    def anyone_allowed(group, shift_filter: Callable[[ShiftType], bool]) -> bool:
+        """Builder creates the constraint at all (someone has a matching shift)"""
+        return any(shift_filter(st) for emp in group for st in emp.allowed_shifts)
+
+    def blocked(emp, offset: int, shift_type: ShiftType) -> bool:
+        """Cell forced to 0 by absences, LIDER rules or the first-day 11h history check"""
+        if cal.dates[offset] in absences.get(emp.id, ()):
+            return True
+        if 'LIDER' in emp.roles and (cal.weekday[offset] >= 5 or shift_type.start_hour < 8 or shift_type.end_hour > 20):
+            return True
+        shift_before = history_shifts.get(emp.id)
+        return offset == 0 and shift_before is not None and SHIFT_CATALOG.is_forbidden(shift_before, shift_type)
+
+    has_day = {"day": anyone_allowed(employees, day_shift), "night": anyone_allowed(employees, night_start_shift)}
+    has_night_shift = anyone_allowed(employees, lambda st: st.is_night)
+    has_coverage = {label: anyone_allowed(employees, covers) for label, covers in COVERAGE_POINTS}
+    has_support = anyone_allowed(helpers, support_shift)
+
+    for offset, date_str in enumerate(cal.dates):
+        # Zmiany możliwe (wolne lub wymuszone) i wymuszone dla każdego pracownika
+        possible: Dict[str, List[ShiftType]] = {}
+        forced: Dict[str, List[ShiftType]] = {}
+        for emp in employees:
+            mask = availability.free[emp.id][offset]
+            fixed = availability.fixed.get((emp.id, offset), set())
+            possible[emp.id] = [st for j, st in enumerate(emp.allowed_shifts) if mask >> j & 1 or j in fixed]
+            forced[emp.id] = [emp.allowed_shifts[j] for j in sorted(fixed)]
+
+            # FIXED: najwyżej jedna zmiana dziennie i nie w dzień zablokowany
+            if len(forced[emp.id]) > 1:
+                issues.append(_issue("fixed_shifts", date_str,
+                                     f"{emp.name}: {len(forced[emp.id])} fixed shifts on {date_str} (max one per day)",
+                                     employee=emp.id))
+            for shift_type in forced[emp.id]:
+                if blocked(emp, offset, shift_type):
+                    issues.append(_issue("fixed_shifts", date_str,
+                                         f"{emp.name}: fixed shift {shift_type.id} on {date_str} conflicts with an absence or role rule",
+                                         employee=emp.id))
+
+        def can(emp, shift_filter: Callable[[ShiftType], bool]) -> bool:
+            return any(shift_filter(st) for st in possible[emp.id])
+
+        # Zapotrzebowanie: dzień, noc i razem (jedna zmiana na osobę)
+        demand = input_data.demand.get(date_str)
+        if demand is not None and "demand" not in relaxed:
+            pools: Dict[str, Set[str]] = {
+                "day": {emp.id for emp in employees if can(emp, day_shift)},
+                "night": {emp.id for emp in employees if can(emp, night_start_shift)},
+            }
+            required = {"day": demand.day, "night": demand.night}
+            for kind in ("day", "night"):
+                if required[kind] > 0 and has_day[kind] and len(pools[kind]) < required[kind]:
+                    issues.append(_issue(f"demand_{kind}", date_str,
+                                         f"{kind.capitalize()} demand {required[kind]} on {date_str}, "
+                                         f"but only {len(pools[kind])} employees can work a {kind} shift",
+                                         required=required[kind], available=len(pools[kind])))
+            total = required["day"] + required["night"]
+            either = pools["day"] | pools["night"]
+            if (required["day"] > 0 and required["night"] > 0 and has_day["day"] and has_day["night"]
+                    and len(pools["day"]) >= required["day"] and len(pools["night"]) >= required["night"]
+                    and len(either) < total):
+                issues.append(_issue("demand_total", date_str,
+                                     f"Demand {required['day']} day + {required['night']} night on {date_str}, "
+                                     f"but only {len(either)} employees are available",
+                                     required=total, available=len(either)))
+
+        # Min. jedna nocka dziennie
+        if has_night_shift and "min_one_night_shift" not in relaxed and not any(can(emp, lambda st: st.is_night) for emp in employees):
+            issues.append(_issue("min_one_night_shift", date_str,
+                                 f"Nobody can work a night shift on {date_str}", required=1, available=0))
+
+        # Punkty kontrolne pokrycia 24/7
+        for label, covers in COVERAGE_POINTS:
+            if has_coverage[label] and "coverage" not in relaxed and not any(can(emp, covers) for emp in employees):
+                issues.append(_issue("coverage", date_str,
+                                     f"Nobody can cover {label} on {date_str}", point=label, required=1, available=0))
+
+        # LIDER: praca w każdy dzień roboczy + wsparcie WYCHOWAWCY, gdy pracuje
+        leader_forced = False
+        for emp in leaders:
+            if not any(day_shift(st) for st in emp.allowed_shifts):
+                continue
+            if cal.weekday[offset] < 5 and "leader_weekdays" not in relaxed:
+                leader_forced = True
+                if not can(emp, day_shift):
+                    issues.append(_issue("leader_weekday", date_str,
+                                         f"LIDER {emp.name} must work on weekday {date_str} but cannot (absence or rules)",
+                                         employee=emp.id))
+            if any(day_shift(st) for st in forced[emp.id]):
+                leader_forced = True
+        if leader_forced and has_support and not any(can(emp, support_shift) for emp in helpers):
+            issues.append(_issue("leader_support", date_str,
+                                 f"LIDER works on {date_str}, but no WYCHOWAWCA can take a supporting shift",
+                                 required=1, available=0))
+
+    return issues
+
+
+def screening_error(issues: List[Dict[str, Any]]) -> str:
+    """Short error message: offending dates grouped by rule"""
+    by_rule: Dict[str, List[str]] = {}
+    for issue in issues:
+        dates = by_rule.setdefault(issue["rule"], [])
+        if issue["date"] not in dates:
+            dates.append(issue["date"])
+    parts = []
+    for rule, dates in by_rule.items():
+        shown = ", ".join(dates[:MAX_DATES_IN_ERROR])
+        more = f" (+{len(dates) - MAX_DATES_IN_ERROR} more)" if len(dates) > MAX_DATES_IN_ERROR else ""
+        parts.append(f"{rule}: {shown}{more}")
+    return "Input is infeasible (found before solving): " + "; ".join(parts)
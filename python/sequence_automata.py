@@ -0,0 +1,125 @@
+"""
+Sequence rules encoded as CP-SAT automata (sequence_encoding = "automaton")
+Replaces sliding-window sums of:
+- max 5 consecutive work days  (add_max_consecutive_days)
+- 35h weekly rest / 1 day off   (add_35h_weekly_rest)
+with one AddAutomaton per employee over a day-state alphabet.
+"""
+from ortools.sat.python import cp_model
+from models import SolverInput, trailing_work_days, history_in_first_week
+from derived_vars import DerivedVars
+from typing import Dict, List, Tuple
+from functools import lru_cache
+
+# Alfabet stanu dnia
+OFF = 0
+DAY = 1
+NIGHT = 2
+ABSENCE = 3
+
+# Etykieta dnia = stan + WEEK_START, gdy dzień jest poniedziałkiem (zamyka poprzedni tydzień ISO)
+WEEK_START = 4
+
+MAX_CONSECUTIVE_DAYS = 5
+
+
+def _state_id(consecutive: int, rested: int) -> int:
+    return consecutive * 2 + rested
+
+
+@lru_cache(maxsize=None)
+def build_transitions() -> Tuple[Tuple[int, int, int], ...]:
+    """
+    Transition table shared by every employee.
+
+    Automaton state = (consecutive work days, day off seen in the current
+    ISO week). A Monday label closes the previous week, which must contain
+    a day off. ABSENCE behaves like OFF for both rules.
+    """
+    transitions = []
+    for consecutive in range(MAX_CONSECUTIVE_DAYS + 1):
+        for rested in (0, 1):
+            for day_state in (OFF, DAY, NIGHT, ABSENCE):
+                working = day_state in (DAY, NIGHT)
+                for week_start in (0, 1):
+                    if week_start and not rested:
+                        continue  # poprzedni tydzień bez dnia wolnego
+
+                    next_consecutive = consecutive + 1 if working else 0
+                    if next_consecutive > MAX_CONSECUTIVE_DAYS:
+                        continue
+
+                    next_rested = (0 if week_start else rested) | (0 if working else 1)
+                    transitions.append((
+                        _state_id(consecutive, rested),
+                        day_state + WEEK_START * week_start,
+                        _state_id(next_consecutive, next_rested)
+                    ))
+    return tuple(transitions)
+
+
+def final_states() -> List[int]:
+    """Every state whose current (last) week already has a day off"""
+    return [_state_id(consecutive, 1) for consecutive in range(MAX_CONSECUTIVE_DAYS + 1)]
+
+
+def add_sequence_automata(
+    model: cp_model.CpModel,
+    shifts: Dict,
+    input_data: SolverInput,
+    derived: DerivedVars = None
+):
+    """Add one automaton per employee covering max consecutive days and weekly rest"""
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+
+    cal = input_data.calendar
+    if not cal.dates:
+        return
+
+    transitions = list(build_transitions())
+    finals = final_states()
+    absences = input_data.get_absence_dates()
+    recent_history = input_data.get_recent_history()
+    is_night = lambda st: st.is_night
+    is_not_night = lambda st: not st.is_night
+
+    for emp in input_data.employees:
+        if emp.id not in shifts or not emp.allowed_shifts:
+            continue
+
+        emp_absences = absences.get(emp.id, set())
+        labels = []
+
+        for i, date_str in enumerate(cal.dates):
+            week_start = WEEK_START if cal.weekday[i] == 0 else 0
+
+            if date_str in emp_absences:
+                # Dzień nieobecności: zmiany są wyzerowane przez add_absence_constraints
+                labels.append(model.NewConstant(ABSENCE + week_start))
+                continue
+
+            day_pairs = derived.day_vars(emp.id, date_str, is_not_night)
+            night_pairs = derived.day_vars(emp.id, date_str, is_night)
+
+            states = [OFF]
+            if day_pairs:
+                states.append(DAY)
+            if night_pairs:
+                states.append(NIGHT)
+
+            label = model.NewIntVarFromDomain(
+                cp_model.Domain.FromValues([state + week_start for state in states]),
+                f'{emp.id}_{date_str}_day_state'
+            )
+            terms = [var * DAY for _, var in day_pairs] + [var * NIGHT for _, var in night_pairs]
+            model.Add(label == sum(terms) + week_start)
+            labels.append(label)
+
+        # Poniedziałek na starcie nie zamyka żadnego tygodnia z zakresu.
+        # Historia wielodniowa: dni pracy tuż przed startem i dzień wolny we wcześniejszej części tygodnia
+        history = recent_history.get(emp.id, [])
+        consecutive = min(trailing_work_days(history), MAX_CONSECUTIVE_DAYS)
+        rested = cal.weekday[0] == 0 or None in history_in_first_week(history, cal)
+        initial = _state_id(consecutive, 1 if rested else 0)
+        model.AddAutomaton(labels, initial, finals, transitions)
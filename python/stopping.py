@@ -0,0 +1,329 @@
+"""
+Stopping policy for OR-Tools Schedule Solver
+When a solve ends is part of the request (options) and scales with the size
+of the model, instead of hand-tuned constants per horizon length:
+
+    gapLimit              relative gap |objective - bound| / max(1, |objective|)
+                          (CP-SAT's definition; also set as relative_gap_limit)
+    maxTimeSeconds        deadline; default grows with the number of variables
+    noImprovementSeconds  no better incumbent for that long; default grows with variables
+    minSolutions          incumbents required before any early stop
+    scoreThreshold        absolute objective (the old rule), off by default
+    earlyStop             false = only the deadline and proven optimality
+
+SIGTERM / SIGINT during the search stop it like any other rule: the best
+incumbent is returned as a normal result and SHUTDOWN tells the worker loop
+to exit after answering.
+
+Why the solve ended goes to stats["stop"]["reason"]: optimal, gap,
+no_improvement, score_threshold, interrupted, time_limit, infeasible,
+portfolio_gap / portfolio_stop (portfolio.py), else the status name.
+"""
+import sys
+import time
+import signal
+import threading
+import contextlib
+from dataclasses import dataclass, asdict
+from ortools.sat.python import cp_model
+from events import EVENTS
+from checkpoint import incumbent_schedule
+from models import SolverOptions
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+DEFAULT_GAP_LIMIT = 0.01
+
+# Domyślny limit czasu: podstawa + czas na zmienną, nie więcej niż MAX_TIME_IN_SECONDS
+MAX_TIME_IN_SECONDS = 1800.0
+BASE_TIME_SECONDS = 60.0
+TIME_PER_VARIABLE = 0.1
+
+# Domyślne okno bez poprawy: podstawa + czas na zmienną, w granicach [min, max]
+BASE_NO_IMPROVEMENT_SECONDS = 10.0
+NO_IMPROVEMENT_PER_VARIABLE = 0.02
+MAX_NO_IMPROVEMENT_SECONDS = 600.0
+
+# Co ile sekund wątek nadzorczy sprawdza okno bez poprawy
+WATCHDOG_INTERVAL_SECONDS = 1.0
+
+STOP_SIGNALS = ("SIGTERM", "SIGINT")
+
+# Ustawiane przez SIGTERM/SIGINT: kolejne rozwiązania (np. okna rolling horizon)
+# kończą na pierwszym rozwiązaniu, tryb --worker kończy pracę po odpowiedzi
+SHUTDOWN = threading.Event()
+
+
+def time_limit(options: SolverOptions, variables: int) -> float:
+    """options.max_time_seconds or the default scaled by model size"""
+    if options.max_time_seconds:
+        return options.max_time_seconds
+    return round(min(MAX_TIME_IN_SECONDS, BASE_TIME_SECONDS + TIME_PER_VARIABLE * variables), 1)
+
+
+def relative_gap(objective: float, bound: float) -> float:
+    return abs(objective - bound) / max(1.0, abs(objective))
+
+
+@dataclass
+class StopPolicy:
+    """Resolved stopping rules of one solve (None = rule off)"""
+    max_time_seconds: float
+    gap_limit: Optional[float]
+    no_improvement_seconds: Optional[float]
+    min_solutions: int
+    score_threshold: Optional[float]
+    variables: int
+
+    @staticmethod
+    def resolve(options: SolverOptions, variables: int) -> 'StopPolicy':
+        if not options.early_stop:
+            return StopPolicy(time_limit(options, variables), None, None, 1, None, variables)
+        no_improvement = options.no_improvement_seconds
+        if no_improvement is None:
+            no_improvement = round(min(MAX_NO_IMPROVEMENT_SECONDS,
+                                       BASE_NO_IMPROVEMENT_SECONDS + NO_IMPROVEMENT_PER_VARIABLE * variables), 1)
+        return StopPolicy(
+            max_time_seconds=time_limit(options, variables),
+            gap_limit=options.gap_limit if options.gap_limit is not None else DEFAULT_GAP_LIMIT,
+            no_improvement_seconds=no_improvement or None,
+            min_solutions=options.min_solutions,
+            score_threshold=options.score_threshold,
+            variables=variables,
+        )
+
+    def apply(self, solver: cp_model.CpSolver):
+        solver.parameters.max_time_in_seconds = self.max_time_seconds
+        if self.gap_limit:
+            # CP-SAT kończy sam, także gdy granica poprawi się już po ostatnim rozwiązaniu
+            solver.parameters.relative_gap_limit = self.gap_limit
+
+    def describe(self) -> str:
+        rules = [f"deadline {self.max_time_seconds:.0f}s"]
+        if self.gap_limit:
+            rules.append(f"gap {self.gap_limit:.2%}")
+        if self.no_improvement_seconds:
+            rules.append(f"no improvement {self.no_improvement_seconds:.0f}s")
+        if self.score_threshold is not None:
+            rules.append(f"score < {self.score_threshold}")
+        return f"{', '.join(rules)} (min {self.min_solutions} solutions, {self.variables} variables)"
+
+
+def defaults() -> Dict[str, Any]:
+    """Constants behind the adaptive defaults (part of the cache key)"""
+    return {
+        "gap_limit": DEFAULT_GAP_LIMIT,
+        "time": [BASE_TIME_SECONDS, TIME_PER_VARIABLE, MAX_TIME_IN_SECONDS],
+        "no_improvement": [BASE_NO_IMPROVEMENT_SECONDS, NO_IMPROVEMENT_PER_VARIABLE, MAX_NO_IMPROVEMENT_SECONDS],
+    }
+
+
+class StoppingCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Logs every incumbent, passes it to the listeners (e.g. Checkpointer)
+    and stops the search by the policy
+    """
+
+    def __init__(self, policy: StopPolicy, listeners: Sequence[Callable[['StoppingCallback'], None]] = (),
+                 shared=None):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.policy = policy
+        self.listeners = list(listeners)
+        self.shared = shared  # portfolio.SharedBounds w procesie portfolio, inaczej None
+        self.solution_count = 0
+        self.best_score = float('inf')
+        self.last_improvement = time.monotonic()
+        self.improved = False
+        self.stop_reason: Optional[str] = None
+        self._incumbent: Tuple[int, Optional[Dict]] = (0, None)
+        self._lock = threading.Lock()
+        # Callback i wątek nadzorczy działają w wątkach solvera - bez kontekstu zdarzeń (id żądania)
+        self.context = EVENTS.context()
+
+    def on_solution_callback(self):
+        with EVENTS.bind(**self.context):
+            self._on_solution()
+
+    def _on_solution(self):
+        self.solution_count += 1
+        current_score = self.ObjectiveValue()
+        bound = self.BestObjectiveBound()
+        current_time = self.WallTime()
+
+        print(f"Solution #{self.solution_count}: score={current_score}, time={current_time:.1f}s", file=sys.stderr)
+        EVENTS.emit("incumbent", n=self.solution_count, objective=current_score,
+                    bound=bound, wall_time=round(current_time, 3))
+
+        self.improved = current_score < self.best_score
+        if self.improved:
+            self.best_score = current_score
+            self.last_improvement = time.monotonic()
+        for listener in self.listeners:
+            listener(self)
+        if self.shared is not None:
+            self.shared.publish(current_score, bound)
+
+        if SHUTDOWN.is_set():
+            self.stop("interrupted", "shutdown requested")
+            return
+        if self.check_shared(self):
+            return
+        if self.solution_count < self.policy.min_solutions:
+            return
+
+        gap = relative_gap(current_score, bound)
+        if self.policy.gap_limit and gap <= self.policy.gap_limit:
+            self.stop("gap", f"gap {gap:.2%} <= {self.policy.gap_limit:.2%}", gap=round(gap, 6))
+        elif self.policy.score_threshold is not None and current_score < self.policy.score_threshold:
+            self.stop("score_threshold", f"score {current_score} < {self.policy.score_threshold}")
+        else:
+            self.check_idle(self)
+
+    def incumbent(self, shifts: Dict) -> Dict[str, Dict[str, str]]:
+        """Schedule of the current solution, extracted once and shared by the listeners"""
+        if self._incumbent[0] != self.solution_count:
+            self._incumbent = (self.solution_count, incumbent_schedule(self, shifts))
+        return self._incumbent[1]
+
+    def check_shared(self, solver) -> bool:
+        """Portfolio: shared gap reached or another process finished the search"""
+        if self.shared is None:
+            return False
+        verdict = self.shared.verdict()
+        return verdict is not None and self.stop(*verdict, solver=solver)
+
+    def check_idle(self, solver) -> bool:
+        """No-improvement window; called from the callback and from the watchdog thread"""
+        window = self.policy.no_improvement_seconds
+        if not window or self.solution_count < max(self.policy.min_solutions, 1):
+            return False
+        idle = time.monotonic() - self.last_improvement
+        if idle <= window:
+            return False
+        return self.stop("no_improvement", f"no improvement for {idle:.0f}s (best: {self.best_score})", solver=solver)
+
+    def stop(self, reason: str, message: str, solver=None, **details) -> bool:
+        with self._lock:
+            if self.stop_reason is not None:
+                return False
+            self.stop_reason = reason
+        print(f"🎯 Early stop! {message}", file=sys.stderr)
+        EVENTS.emit("early_stop", reason=reason, objective=self.best_score, **details)
+        (solver or self).StopSearch()
+        return True
+
+
+@contextlib.contextmanager
+def watching(solver: cp_model.CpSolver, callback: StoppingCallback):
+    """
+    Watchdog for the no-improvement window (and the portfolio's shared stop):
+    the callback runs only on new incumbents, so without it a stalled search
+    would wait for the deadline.
+    """
+    if not callback.policy.no_improvement_seconds and callback.shared is None:
+        yield
+        return
+    done = threading.Event()
+
+    def watch():
+        with EVENTS.bind(**callback.context):
+            while not done.wait(WATCHDOG_INTERVAL_SECONDS):
+                if callback.check_shared(solver) or callback.check_idle(solver):
+                    return
+
+    thread = threading.Thread(target=watch, name="stop-watchdog", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+@contextlib.contextmanager
+def deferring_signals():
+    """
+    SIGTERM/SIGINT only set SHUTDOWN (between solves, where there is no search
+    to stop); the caller checks SHUTDOWN afterwards. No-op outside the main thread.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def on_signal(signum, frame):
+        SHUTDOWN.set()
+        print(f"{signal.Signals(signum).name} received, stopping after the current step", file=sys.stderr)
+
+    previous = {}
+    for name in STOP_SIGNALS:
+        signum = getattr(signal, name, None)
+        if signum is not None:
+            previous[signum] = signal.signal(signum, on_signal)
+    try:
+        yield
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+
+def solve_interruptible(solver: cp_model.CpSolver, model: cp_model.CpModel, callback: StoppingCallback) -> int:
+    """
+    solver.Solve with SIGTERM/SIGINT turned into StopSearch. Python runs signal
+    handlers only in the main thread between bytecodes, so the search runs in
+    a helper thread while the main thread waits. Outside the main thread
+    (socket server handlers) signals cannot be caught and Solve runs directly.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return solver.Solve(model, callback)
+
+    def on_signal(signum, frame):
+        SHUTDOWN.set()
+        name = signal.Signals(signum).name
+        if not callback.stop("interrupted", f"{name} received", solver=solver):
+            print(f"{name} received, search is already stopping", file=sys.stderr)
+
+    result: Dict[str, Any] = {}
+
+    def run():
+        try:
+            result["status"] = solver.Solve(model, callback)
+        except BaseException as e:  # przekazane do wątku głównego
+            result["error"] = e
+
+    previous = {}
+    for name in STOP_SIGNALS:
+        signum = getattr(signal, name, None)
+        if signum is not None:
+            previous[signum] = signal.signal(signum, on_signal)
+    thread = threading.Thread(target=run, name="cp-sat")
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(0.2)
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+    if "error" in result:
+        raise result["error"]
+    return result["status"]
+
+
+def stop_report(status: int, solver: cp_model.CpSolver, callback: StoppingCallback) -> Dict[str, Any]:
+    """stats["stop"]: why the solve ended, final gap and the policy used"""
+    policy = callback.policy
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    gap = relative_gap(solver.ObjectiveValue(), solver.BestObjectiveBound()) if found else None
+    if callback.stop_reason is not None:
+        reason = callback.stop_reason
+    elif status == cp_model.INFEASIBLE:
+        reason = "infeasible"
+    elif status == cp_model.OPTIMAL:
+        # relative_gap_limit też kończy ze statusem OPTIMAL
+        reason = "optimal" if not gap else "gap"
+    elif solver.WallTime() >= policy.max_time_seconds * 0.99:
+        reason = "time_limit"
+    else:
+        reason = solver.StatusName(status).lower()
+    report = {"reason": reason, "gap": round(gap, 6) if gap is not None else None,
+              "solutions": callback.solution_count}
+    report.update(asdict(policy))
+    return report
@@ -0,0 +1,72 @@
+"""
+Intermediate schedules for OR-Tools Schedule Solver
+With options.streamSchedules ("full" or "diff") an improving incumbent is
+sent to the event stream as a "schedule" event, at most one per
+options.streamIntervalSeconds. Improvements inside the interval are skipped
+without extracting their schedule; the best one arrives with the result.
+
+    {"event": "schedule", "n": 4, "objective": 812.0, "bound": 310.0, "wall_time": 2.4,
+     "mode": "full", "schedule": {"emp1": {"2026-02-02": "7-15", ...}, ...}}
+    {"event": "schedule", "n": 9, ..., "mode": "diff", "base": 4,
+     "changes": {"emp1": {"2026-02-03": null, "2026-02-04": "7-19"}}}
+
+A diff is against the previously sent schedule (its "n" is "base"), null =
+day off. The first schedule of every solve is full - except in two-phase
+mode, where the first-phase schedule (n=0) was already sent. Callers without
+the event stream get it from checkpointPath (stats.phase = "feasible") or as
+the result when the second phase finds nothing.
+"""
+import time
+from ortools.sat.python import cp_model
+from events import EVENTS
+from models import SolverInput
+from typing import Any, Dict, Optional
+
+Schedule = Dict[str, Dict[str, str]]
+
+
+def schedule_diff(before: Schedule, after: Schedule) -> Dict[str, Dict[str, Optional[str]]]:
+    """Changed cells per employee; None = the day became free"""
+    changes: Dict[str, Dict[str, Optional[str]]] = {}
+    for emp_id in before.keys() | after.keys():
+        old, new = before.get(emp_id, {}), after.get(emp_id, {})
+        cells = {date_str: new.get(date_str) for date_str in old.keys() | new.keys()
+                 if old.get(date_str) != new.get(date_str)}
+        if cells:
+            changes[emp_id] = cells
+    return changes
+
+
+class ScheduleStream:
+    """Incumbent listener for StoppingCallback; emits "schedule" events, rate-limited"""
+
+    def __init__(self, input_data: SolverInput, shifts: Dict, mode: Optional[str] = None):
+        self.mode = mode or input_data.options.stream_schedules
+        self.interval = input_data.options.stream_interval_seconds
+        self.shifts = shifts
+        self.sent: Optional[Schedule] = None
+        self.sent_n = 0
+        self.last_emit = 0.0
+        self.emitted = 0
+
+    def __call__(self, callback: cp_model.CpSolverSolutionCallback):
+        if not callback.improved or time.monotonic() - self.last_emit < self.interval:
+            return
+        schedule = callback.incumbent(self.shifts)
+        meta = {
+            "n": callback.solution_count,
+            "objective": callback.ObjectiveValue(),
+            "bound": callback.BestObjectiveBound(),
+            "wall_time": round(callback.WallTime(), 3),
+        }
+        if self.mode == "diff" and self.sent is not None:
+            EVENTS.emit("schedule", mode="diff", base=self.sent_n,
+                        changes=schedule_diff(self.sent, schedule), **meta)
+        else:
+            EVENTS.emit("schedule", mode="full", schedule=schedule, **meta)
+        self.sent, self.sent_n = schedule, meta["n"]
+        self.last_emit = time.monotonic()
+        self.emitted += 1
+
+    def report(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "interval_seconds": self.interval, "emitted": self.emitted}
@@ -0,0 +1,97 @@
+"""
+Symmetry breaking for OR-Tools Schedule Solver
+Employees with the same signature - roles, allowed shifts (in order),
+preferences, special rules, their own constraints, history, committed days
+of a rolling-horizon range, warm start hints and availability row - are
+interchangeable: swapping their rows in
+any schedule gives a schedule with the same objective. CP-SAT would
+otherwise explore every permutation of such rows (mostly when proving
+optimality of hour balancing and weekend fairness).
+
+Within each group the rows are ordered lexicographically
+(first employee >= second >= ...), over the (date, shift) cells in
+calendar order.
+"""
+import json
+import sys
+from ortools.sat.python import cp_model
+from availability import Availability
+from models import SolverInput
+from warm_start import collect_hints
+from typing import Any, Dict, List
+
+
+def employee_signature(input_data: SolverInput, availability: Availability, emp, hints: Dict[str, Any]) -> str:
+    """Everything the model reads about one employee, except the id and name"""
+    history = input_data.get_history_shifts().get(emp.id)
+    recent = input_data.get_recent_history().get(emp.id)
+    # Okno rolling horizon: wyrównanie godzin i weekendów oraz wolny weekend liczą też zatwierdzone dni
+    committed = input_data.get_committed_shifts().get(emp.id)
+    constraints = sorted(
+        json.dumps([c.type, c.date, list(c.date_range) if c.date_range else None, c.value, c.is_hard], default=str)
+        for c in input_data.constraints if c.employee_id == emp.id
+    )
+    fixed = sorted((offset, sorted(positions)) for (emp_id, offset), positions in availability.fixed.items() if emp_id == emp.id)
+    return json.dumps({
+        "roles": sorted(emp.roles),
+        "allowed_shifts": [shift_type.id for shift_type in emp.allowed_shifts],
+        "preferences": emp.preferences,
+        "special_rules": emp.special_rules,
+        "constraints": constraints,
+        "history": history.id if history else None,
+        "recent": [shift_type.id if shift_type else None for shift_type in recent] if recent else None,
+        "committed": {date_str: shift_type.id if shift_type else None
+                      for date_str, shift_type in committed.items()} if committed else None,
+        "hints": hints.get(emp.id),
+        "free": availability.free.get(emp.id),
+        "fixed": fixed,
+    }, sort_keys=True, default=str)
+
+
+def find_interchangeable(input_data: SolverInput, availability: Availability) -> List[List[str]]:
+    """Groups (2+ employees, input order) of interchangeable employees"""
+    hints = collect_hints(input_data)
+    groups: Dict[str, List[str]] = {}
+    for emp in input_data.employees:
+        groups.setdefault(employee_signature(input_data, availability, emp, hints), []).append(emp.id)
+    return [ids for ids in groups.values() if len(ids) > 1]
+
+
+def add_lex_greater_equal(model: cp_model.CpModel, first: List, second: List, name: str):
+    """first >= second lexicographically (0/1 literals of equal length)"""
+    # prefix_equal[i] = 1 wymusza first[i] >= second[i]; zostaje 1, dopóki prefiksy są równe
+    prefix_equal = model.NewConstant(1)
+    for i, (a, b) in enumerate(zip(first, second)):
+        model.Add(a >= b).OnlyEnforceIf(prefix_equal)
+        if i == len(first) - 1:
+            break
+        still_equal = model.NewBoolVar(f"{name}_eq_{i}")
+        # Przy równym prefiksie i a == b następna pozycja też musi być porównana
+        model.Add(still_equal >= 1 - a + b).OnlyEnforceIf(prefix_equal)
+        prefix_equal = still_equal
+
+
+def add_symmetry_breaking(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, groups: List[List[str]]) -> Dict[str, Any]:
+    """Lexicographic order of the rows of every group; returns the report for stats"""
+    allowed = {emp.id: [shift_type.id for shift_type in emp.allowed_shifts] for emp in input_data.employees}
+    pairs = 0
+    for group in groups:
+        shift_ids = allowed[group[0]]
+        rows = []
+        for emp_id in group:
+            rows.append([shifts[emp_id][date_str][shift_id]
+                         for date_str in input_data.calendar.dates for shift_id in shift_ids])
+
+        # Komórki przypięte (ta sama stała w całej grupie) nie różnicują wierszy
+        cells = [i for i, var in enumerate(rows[0]) if not all(row[i] is var for row in rows)]
+        if not cells:
+            continue
+        for k in range(len(group) - 1):
+            add_lex_greater_equal(model, [rows[k][i] for i in cells], [rows[k + 1][i] for i in cells],
+                                  f"sym_{group[k]}_{group[k + 1]}")
+            pairs += 1
+
+    report = {"groups": groups, "ordered_pairs": pairs}
+    if groups:
+        print(f"Symmetry breaking: {len(groups)} groups of interchangeable employees, {pairs} ordered pairs", file=sys.stderr)
+    return report
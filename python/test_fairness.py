@@ -0,0 +1,54 @@
+"""
+The linear fairness formulation (fairness.py) must give the same objective
+values as the quadratic one: the same optimum, and the same value for any
+fixed schedule. Generated instances are seeded.
+Run: python -m unittest test_fairness (from python/)
+"""
+import sys
+import contextlib
+import unittest
+from instance_generator import GeneratorConfig, generate_instance
+from scheduler_solver import parse_input, solve_schedule
+
+
+def solve(data, fairness: str, frozen=None):
+    data = dict(data, options={**data.get("options", {}), "fairness": fairness, "earlyStop": False, "maxTimeSeconds": 60})
+    input_data = parse_input(data)
+    with contextlib.redirect_stdout(sys.stderr):
+        return solve_schedule(input_data, frozen)
+
+
+def pinned(data, schedule):
+    """Every cell of the range frozen to schedule (None = day off)"""
+    dates = parse_input(data).calendar.dates
+    return {emp["id"]: {date_str: schedule.get(emp["id"], {}).get(date_str) for date_str in dates}
+            for emp in data["employees"]}
+
+
+class FairnessFormulationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.instances = [generate_instance(GeneratorConfig(employees=6, days=7, seed=seed)) for seed in (1, 2, 3)]
+
+    def test_same_optimum(self):
+        for seed, data in enumerate(self.instances, 1):
+            quadratic = solve(data, "quadratic")
+            linear = solve(data, "linear")
+            with self.subTest(seed=seed):
+                self.assertEqual(quadratic.stats["status"], "OPTIMAL")
+                self.assertEqual(linear.stats["status"], "OPTIMAL")
+                self.assertAlmostEqual(quadratic.stats["objective_value"], linear.stats["objective_value"], places=6)
+
+    def test_same_value_for_a_fixed_schedule(self):
+        for seed, data in enumerate(self.instances, 1):
+            # Grafik z jednej formuły przypięty w drugiej: wartość celu ta sama
+            for source, target in (("quadratic", "linear"), ("linear", "quadratic")):
+                found = solve(data, source)
+                again = solve(data, target, pinned(data, found.schedule))
+                with self.subTest(seed=seed, source=source):
+                    self.assertEqual(again.status, "SUCCESS")
+                    self.assertAlmostEqual(again.stats["objective_value"], found.stats["objective_value"], places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
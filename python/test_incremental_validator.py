@@ -0,0 +1,55 @@
+"""
+IncrementalValidator after random edits must agree with a full validation
+of the edited schedule, and its deltas with the difference of the two.
+Run: python -m unittest test_incremental_validator (from python/)
+"""
+import json
+import random
+import unittest
+from collections import Counter
+from typing import Any, Dict, List
+from incremental_validator import IncrementalValidator
+from validator import validate_schedule
+from test_validator import VALUES, random_schedule
+
+
+def apply_cells(data: Dict[str, Any], cells: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validator input with the cells replaced (empty value = cleared)"""
+    edits = {(cell["employeeId"], cell["date"]): cell["value"] for cell in cells}
+    kept = [c for c in data["constraints"] if c["type"] != "SHIFT" or (c["employeeId"], c["date"]) not in edits]
+    return dict(data, constraints=kept + [
+        {"type": "SHIFT", "employeeId": emp_id, "date": date, "value": value, "isHard": True}
+        for (emp_id, date), value in edits.items() if value])
+
+
+def as_counter(violations: List[Dict[str, Any]]) -> Counter:
+    return Counter(json.dumps(v, sort_keys=True) for v in violations)
+
+
+class IncrementalValidatorTest(unittest.TestCase):
+
+    def test_random_edits_match_full_validation(self):
+        rng = random.Random(15)
+        for n in range(80):
+            data = random_schedule(rng)
+            state = IncrementalValidator(data)
+            self.assertEqual(state.current(), validate_schedule(data))
+            dates = sorted({c["date"] for c in data["constraints"]})
+
+            for step in range(25):
+                cells = [{"employeeId": rng.choice(data["employees"])["id"], "date": rng.choice(dates),
+                          "value": rng.choice(VALUES)} for _ in range(rng.choice((1, 1, 1, 2, 4)))]
+                before = validate_schedule(data)
+                delta = state.apply(cells)
+                data = apply_cells(data, cells)
+                after = validate_schedule(data)
+
+                with self.subTest(schedule=n, step=step):
+                    self.assertEqual(state.current(), after)
+                    # added/removed = różnica pełnych walidacji przed i po edycji
+                    self.assertEqual(as_counter(before) - as_counter(delta["removed"]) + as_counter(delta["added"]),
+                                     as_counter(after))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,5 +29,11 @@ echo "Running solver with test input..."
 echo "=================================="
 cat test_input.json | python3 scheduler_solver.py
 
+# Unit tests (test_*.py, seeded - same result every run)
+echo ""
+echo "Running unit tests..."
+echo "====================="
+SOLVER_CACHE_DISABLED=1 python3 -m unittest discover -p "test_*.py" || exit 1
+
 echo ""
 echo "Test complete!"
@@ -0,0 +1,221 @@
+"""
+The vectorised validator (validator_engine) must give the same violations,
+in the same order, as the per-rule loops it replaced (kept below as
+reference_validate). Random schedules are seeded.
+Run: python -m unittest test_validator (from python/)
+"""
+import random
+import unittest
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from validator import validate_schedule, validate_batch, validate_candidates
+
+VALUES = ["8-16", "14-22", "20-8", "8-20", "20-6", "6-14", "7-19", "19-7", "10-18",
+          "K 4", "K", "W", "NN", "L4", "UW", "x-y", "", "8-"]
+NAMES = ["Anna Nowak", "Jan Kowalski", "Ewa Wiśniewska", "Piotr Zieliński", "Maria Pankowska",
+         "Tomasz Lewandowski", "Zofia Wójcik", "Adam Kamiński"]
+
+
+def random_schedule(rng: random.Random, date_range: bool = True) -> Dict[str, Any]:
+    """Validator input with dirty values, soft/other constraints and cells outside the range"""
+    start = datetime(2026, 2, 1) + timedelta(days=rng.randrange(7))
+    days = rng.randint(3, 16)
+    employees = [{"id": f"e{i}", "name": rng.choice(NAMES)} for i in range(rng.randint(2, 7))]
+    constraints = []
+    for emp in employees:
+        for offset in range(-1, days + 1):
+            if rng.random() < 0.7:
+                constraints.append({
+                    "type": "SHIFT" if rng.random() < 0.95 else "ABSENCE",
+                    "employeeId": emp["id"] if rng.random() < 0.97 else "ghost",
+                    "date": (start + timedelta(days=offset)).strftime('%Y-%m-%d'),
+                    "value": rng.choice(VALUES),
+                    "isHard": rng.random() < 0.95,
+                })
+    data = {"employees": employees, "constraints": constraints}
+    if date_range:
+        data["dateRange"] = {"start": start.strftime('%Y-%m-%d'),
+                             "end": (start + timedelta(days=days - 1)).strftime('%Y-%m-%d')}
+    return data
+
+
+# --- Reference: validator.py before vectorisation -------------------------
+class _ReferenceShift:
+    def __init__(self, id: str):
+        self.id = id
+        self.start_hour = 0
+        self.end_hour = 0
+        self.hours = 0
+        self.is_night = False
+        self.is_working = False
+        s = id.upper()
+        if s in ['W', 'NN', 'WYCH'] or s in ['L4', 'UW', 'UZ', 'UŻ', 'UM', 'USW', 'UB', 'OP']:
+            return
+        if s.startswith('K'):
+            self.is_working = True
+            parts = s.split()
+            if len(parts) > 1 and parts[1].isdigit():
+                self.hours = int(parts[1])
+            return
+        if '-' in s:
+            try:
+                start, end = map(int, s.split('-'))
+            except ValueError:
+                return
+            self.start_hour, self.end_hour, self.is_working = start, end, True
+            if start > end:
+                self.hours = (24 - start) + end
+                self.is_night = True
+            else:
+                self.hours = end - start
+                if start >= 19:
+                    self.is_night = True
+
+
+def reference_validate(input_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    violations = []
+    employees: Dict[str, Dict[str, Any]] = {}
+    for emp_d in input_data.get('employees', []):
+        employees[emp_d['id']] = {"id": emp_d['id'], "name": emp_d['name'], "shifts": {}}
+    for c in input_data.get('constraints', []):
+        if c.get('type') == 'SHIFT' and c.get('isHard'):
+            emp_id, date, val = c.get('employeeId'), c.get('date'), c.get('value')
+            if emp_id in employees and date and val:
+                employees[emp_id]["shifts"][date] = _ReferenceShift(val)
+
+    date_range = input_data.get('dateRange', {})
+    if not date_range or not date_range.get('start'):
+        all_dates = set()
+        for emp in employees.values():
+            all_dates.update(emp["shifts"].keys())
+        if not all_dates:
+            return []
+        sorted_dates = sorted(all_dates)
+    else:
+        curr = datetime.strptime(date_range['start'], '%Y-%m-%d')
+        end = datetime.strptime(date_range['end'], '%Y-%m-%d')
+        sorted_dates = []
+        while curr <= end:
+            sorted_dates.append(curr.strftime('%Y-%m-%d'))
+            curr += timedelta(days=1)
+
+    # 1. 11h Daily Rest
+    for emp in employees.values():
+        for i in range(len(sorted_dates) - 1):
+            today, tomorrow = sorted_dates[i], sorted_dates[i + 1]
+            s1, s2 = emp["shifts"].get(today), emp["shifts"].get(tomorrow)
+            if s1 and s2 and s1.is_working and s2.is_working:
+                if s1.start_hour > s1.end_hour:
+                    gap = s2.start_hour - s1.end_hour
+                else:
+                    gap = (24 - s1.end_hour) + s2.start_hour
+                if gap < 11:
+                    violations.append({
+                        "rule": "11h Rest",
+                        "employee": emp["name"],
+                        "date": tomorrow,
+                        "message": f"Brak 11h odpoczynku! Koniec {today} o {s1.end_hour}:00, start {tomorrow} o {s2.start_hour}:00 (Przerwa: {gap}h)."
+                    })
+
+    # 2. Coverage (24h)
+    for date in sorted_dates:
+        morning = afternoon = night = 0
+        for emp in employees.values():
+            shift = emp["shifts"].get(date)
+            if shift and shift.is_working:
+                start, end = shift.start_hour, shift.end_hour
+                if 6 <= start < 14:
+                    morning += 1
+                if (12 <= start < 20) or (start < 14 and end > 16):
+                    afternoon += 1
+                if shift.is_night or start >= 19:
+                    night += 1
+        if morning == 0:
+            violations.append({"rule": "Coverage", "date": date, "message": f"Brak obsady RANO (6:00-14:00) w dniu {date}."})
+        if afternoon == 0:
+            violations.append({"rule": "Coverage", "date": date, "message": f"Brak obsady POPOŁUDNIE (14:00-20:00) w dniu {date}."})
+        if night == 0:
+            violations.append({"rule": "Coverage", "date": date, "message": f"Brak obsady NOC (20:00-8:00) w dniu {date}."})
+
+    # 3. Leader Support
+    leader = next((e for e in employees.values() if "Maria" in e["name"] or "Pankowska" in e["name"]), None)
+    if leader:
+        for date in sorted_dates:
+            leader_shift = leader["shifts"].get(date)
+            if leader_shift and leader_shift.is_working:
+                support = sum(1 for emp in employees.values() if emp["id"] != leader["id"]
+                              and emp["shifts"].get(date) and emp["shifts"][date].is_working)
+                if support == 0:
+                    violations.append({"rule": "Leader Support", "date": date,
+                                       "message": f"Lider (Maria) pracuje sama w dniu {date}! Wymagana pomoc."})
+
+    # 4. Max 5 consecutive days
+    for emp in employees.values():
+        consecutive = 0
+        start_run = None
+        for date in sorted_dates:
+            shift = emp["shifts"].get(date)
+            if shift and shift.is_working:
+                if consecutive == 0:
+                    start_run = date
+                consecutive += 1
+            else:
+                consecutive = 0
+            if consecutive > 5:
+                violations.append({"rule": "Max Consecutive Days", "employee": emp["name"], "date": date,
+                                   "message": f"Przekroczono 5 dni pracy z rzędu (od {start_run})."})
+                consecutive = 0
+
+    # 5. Leader Rules
+    if leader:
+        for date in sorted_dates:
+            shift = leader["shifts"].get(date)
+            if not shift or not shift.is_working:
+                continue
+            if datetime.strptime(date, '%Y-%m-%d').weekday() >= 5:
+                violations.append({"rule": "Leader Rules", "employee": leader["name"], "date": date,
+                                   "message": "Lider nie może pracować w weekendy."})
+            if shift.start_hour < 8 or shift.end_hour > 20 or shift.is_night:
+                violations.append({"rule": "Leader Rules", "employee": leader["name"], "date": date,
+                                   "message": f"Lider może pracować tylko 8:00-20:00. Zmiana {shift.id} jest niedozwolona."})
+
+    return violations
+
+
+class ValidatorEquivalenceTest(unittest.TestCase):
+
+    def test_matches_reference_on_random_schedules(self):
+        rng = random.Random(14)
+        for n in range(300):
+            data = random_schedule(rng, date_range=rng.random() < 0.8)
+            with self.subTest(schedule=n):
+                self.assertEqual(validate_schedule(data), reference_validate(data))
+
+    def test_batch_matches_single_validation(self):
+        rng = random.Random(15)
+        inputs = [random_schedule(rng) for _ in range(40)]
+        self.assertEqual(validate_batch(inputs), [reference_validate(data) for data in inputs])
+
+    def test_candidates_match_edited_schedules(self):
+        rng = random.Random(16)
+        for n in range(30):
+            data = random_schedule(rng)
+            dates = sorted({c["date"] for c in data["constraints"]})
+            candidates = [[{"employeeId": rng.choice(data["employees"])["id"], "date": rng.choice(dates),
+                            "value": rng.choice(VALUES)} for _ in range(rng.randint(1, 3))] for _ in range(5)]
+            expected = []
+            for edit in candidates:
+                # Edycja = komórka zastąpiona (pusta wartość = wyczyszczona)
+                cells = {(cell["employeeId"], cell["date"]): cell["value"] for cell in edit}
+                kept = [c for c in data["constraints"]
+                        if c["type"] != "SHIFT" or (c["employeeId"], c["date"]) not in cells]
+                edited = dict(data, constraints=kept + [
+                    {"type": "SHIFT", "employeeId": emp_id, "date": date, "value": value, "isHard": True}
+                    for (emp_id, date), value in cells.items() if value])
+                expected.append(reference_validate(edited))
+            with self.subTest(schedule=n):
+                self.assertEqual(validate_candidates(data, candidates), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,338 @@
+"""
+Vectorised engine behind validator.py
+A schedule is an employees x days matrix of int shift codes; every distinct
+cell value ("8-16", "L4", "K 4", ...) is parsed once into a ShiftTable with
+lookup arrays (start, end, hours, night, working, coverage slots, rest gap
+between any two codes). The rules are array operations over a stack of such
+matrices, so many schedules or many candidate edits are checked in one call.
+"""
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+from models import SHIFT_CATALOG, MIN_DAILY_REST_HOURS, rest_gap
+
+MAX_CONSECUTIVE_DAYS = 5
+NO_SHIFT = 0  # kod pustej komórki
+
+
+# --- Cell values ---
+class ShiftType:
+    def __init__(self, id: str):
+        self.id = id
+        self.start_hour = 0
+        self.end_hour = 0
+        self.hours = 0
+        self.is_night = False
+        self.is_working = False
+        self.catalog = None  # models.ShiftType z SHIFT_CATALOG dla zmian "X-Y"
+
+        self._parse()
+
+    def _parse(self):
+        # Basic parsing logic similar to ShiftType.from_string in models.py
+        s = self.id.upper()
+        if s in ['W', 'NN', 'WYCH']:
+            self.is_working = False
+            return
+
+        if s in ['L4', 'UW', 'UZ', 'UŻ', 'UM', 'USW', 'UB', 'OP']:
+            self.is_working = False # Treated as absence for working rules, but might block other shifts
+            return
+
+        if s.startswith('K'):
+            self.is_working = False # Contact hours usually don't count as "working shift" for rest rules?
+            # Actually depends on interpretation. Let's assume K is work for now if it has hours?
+            # In constraints.py K is often treated separately. Let's assume K is NOT work for 11h rest unless specified.
+            # But wait, K 4h is work. Let's treat it as work.
+            self.is_working = True
+            try:
+                parts = s.split()
+                if len(parts) > 1:
+                    self.hours = int(parts[1])
+            except (ValueError, IndexError):
+                pass
+            return
+
+        # Parse "8-16", "20-8"
+        if '-' in s:
+            try:
+                start, end = map(int, s.split('-'))
+                self.catalog = SHIFT_CATALOG.get(f"{start}-{end}")
+                self.start_hour = start
+                self.end_hour = end
+                self.is_working = True
+
+                if start > end:
+                    self.hours = (24 - start) + end
+                    self.is_night = True
+                else:
+                    self.hours = end - start
+                    # Check if it covers night hours (e.g. 22:00-6:00)
+                    # Simple heuristic: if it starts >= 19 or ends <= 7 (next day)
+                    if start >= 19: self.is_night = True
+            except (ValueError, IndexError):
+                pass
+
+_SHIFT_CACHE: Dict[str, ShiftType] = {}
+
+def get_shift(value: str) -> ShiftType:
+    """Parsed ShiftType for a cell value - every distinct value is parsed once"""
+    shift = _SHIFT_CACHE.get(value)
+    if shift is None:
+        shift = ShiftType(value)
+        _SHIFT_CACHE[value] = shift
+    return shift
+
+
+class ShiftTable:
+    """
+    Cell value -> int code (0 = empty cell) and per-code lookup arrays.
+    Arrays are rebuilt lazily when a new value gets a code.
+    """
+
+    def __init__(self):
+        self.shifts: List[Optional[ShiftType]] = [None]
+        self._codes: Dict[str, int] = {}
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+
+    def code(self, value: Optional[str]) -> int:
+        if not value:
+            return NO_SHIFT
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.shifts)
+            self._codes[value] = code
+            self.shifts.append(get_shift(value))
+            self._arrays = None
+        return code
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        if self._arrays is None:
+            self._arrays = self._build()
+        return self._arrays
+
+    def _build(self) -> Dict[str, np.ndarray]:
+        shifts = self.shifts
+        working = np.array([s is not None and s.is_working for s in shifts])
+        start = np.array([s.start_hour if s else 0 for s in shifts])
+        end = np.array([s.end_hour if s else 0 for s in shifts])
+        hours = np.array([s.hours if s else 0 for s in shifts])
+        night = np.array([bool(s and s.is_night) for s in shifts])
+
+        # Przerwa między kodami; tylko pary pracujące mają znaczenie
+        gaps = np.full((len(shifts), len(shifts)), 24 * 7, dtype=np.int16)
+        working_codes = np.flatnonzero(working)
+        for i in working_codes:
+            for j in working_codes:
+                s1, s2 = shifts[i], shifts[j]
+                # Zmiany "X-Y" -> gotowa macierz katalogu; pozostałe (np. K) -> wzór
+                if s1.catalog is not None and s2.catalog is not None:
+                    gaps[i, j] = SHIFT_CATALOG.rest_gap(s1.catalog, s2.catalog)
+                else:
+                    gaps[i, j] = rest_gap(s1, s2)
+
+        return {
+            "working": working,
+            "start": start,
+            "end": end,
+            "hours": hours,
+            "night": night,
+            "rest_gap": gaps,
+            # Sloty pokrycia: RANO (6-14), POPOŁUDNIE (14-20), NOC (20-8)
+            "morning": working & (start >= 6) & (start < 14),
+            "afternoon": working & (((start >= 12) & (start < 20)) | ((start < 14) & (end > 16))),
+            "night_cover": working & (night | (start >= 19)),
+            # Lider: tylko 8:00-20:00
+            "leader_hours_bad": working & ((start < 8) | (end > 20) | night),
+        }
+
+
+@dataclass
+class ScheduleGrid:
+    """Rows/columns of the matrix: employees (first-seen order) x dates"""
+    employee_ids: List[str]
+    names: List[str]
+    dates: List[str]
+    codes: np.ndarray             # (employees, days) int
+    leader: Optional[int] = None  # wiersz lidera (Maria Pankowska)
+
+    def __post_init__(self):
+        self.row = {emp_id: i for i, emp_id in enumerate(self.employee_ids)}
+        self.col = {date: j for j, date in enumerate(self.dates)}
+        # 1970-01-01 to czwartek: (dni od epoki + 3) % 7 = dzień tygodnia, 0 = poniedziałek
+        epoch_days = np.array(self.dates, dtype='datetime64[D]').astype(np.int64)
+        self.weekend = (epoch_days + 3) % 7 >= 5
+
+    def with_edits(self, table: ShiftTable, edits: Sequence[Sequence[Dict[str, Any]]]) -> np.ndarray:
+        """
+        (len(edits), employees, days) stack: the grid with each candidate edit applied.
+        An edit is a list of {"employeeId", "date", "value"} cells (empty value = clear).
+        Cells outside the grid are ignored, like SHIFT constraints outside the range.
+        """
+        stack = np.repeat(self.codes[np.newaxis], len(edits), axis=0)
+        for b, edit in enumerate(edits):
+            for cell in edit:
+                i = self.row.get(cell.get('employeeId'))
+                j = self.col.get(cell.get('date'))
+                if i is not None and j is not None:
+                    stack[b, i, j] = table.code(cell.get('value'))
+        return stack
+
+
+def encode_schedule(input_data: Dict[str, Any], table: ShiftTable) -> ScheduleGrid:
+    """Validator input (employees + SHIFT constraints + dateRange) as a ScheduleGrid"""
+    names: Dict[str, str] = {}
+    for emp_d in input_data.get('employees', []):
+        names[emp_d['id']] = emp_d['name']
+
+    # We assume 'constraints' contains the current schedule as SHIFT constraints
+    cells: Dict[tuple, int] = {}
+    code = table.code
+    for c in input_data.get('constraints', []):
+        if c.get('type') == 'SHIFT' and c.get('isHard'):
+            emp_id = c.get('employeeId')
+            date = c.get('date')
+            val = c.get('value')
+            if emp_id in names and date and val:
+                cells[(emp_id, date)] = code(val)
+
+    date_range = input_data.get('dateRange', {})
+    if not date_range or not date_range.get('start'):
+        # Infer from shifts if not provided
+        dates = sorted({date for _, date in cells})
+    else:
+        start = np.datetime64(date_range['start'])
+        end = np.datetime64(date_range['end'])
+        dates = [str(d) for d in np.arange(start, end + 1)]
+
+    employee_ids = list(names)
+    leader = next((i for i, emp_id in enumerate(employee_ids)
+                   if "Maria" in names[emp_id] or "Pankowska" in names[emp_id]), None)
+    grid = ScheduleGrid(
+        employee_ids=employee_ids,
+        names=[names[emp_id] for emp_id in employee_ids],
+        dates=dates,
+        codes=np.zeros((len(employee_ids), len(dates)), dtype=np.int32),
+        leader=leader
+    )
+    for (emp_id, date), code in cells.items():
+        j = grid.col.get(date)
+        if j is not None:
+            grid.codes[grid.row[emp_id], j] = code
+    return grid
+
+
+def _run_position(working: np.ndarray) -> np.ndarray:
+    """1-based position of each working day in its run of consecutive working days (0 = off)"""
+    days = working.shape[-1]
+    index = np.arange(1, days + 1)
+    last_off = np.maximum.accumulate(np.where(working, 0, index), axis=-1)
+    return np.where(working, index - last_off, 0)
+
+
+# --- Violations (wspólne dla evaluate i IncrementalValidator) ---
+SLOT_LABELS = ("RANO (6:00-14:00)", "POPOŁUDNIE (14:00-20:00)", "NOC (20:00-8:00)")
+
+def rest_violation(grid: ScheduleGrid, table: ShiftTable, e: int, d: int, today: int, tomorrow: int, gap: int) -> Dict[str, Any]:
+    """11h rest broken between day d and d + 1 (today/tomorrow are shift codes)"""
+    dates = grid.dates
+    s1, s2 = table.shifts[today], table.shifts[tomorrow]
+    return {
+        "rule": "11h Rest",
+        "employee": grid.names[e],
+        "date": dates[d + 1],
+        "message": f"Brak 11h odpoczynku! Koniec {dates[d]} o {s1.end_hour}:00, start {dates[d + 1]} o {s2.start_hour}:00 (Przerwa: {int(gap)}h)."
+    }
+
+def coverage_violation(grid: ScheduleGrid, d: int, slot: int) -> Dict[str, Any]:
+    return {
+        "rule": "Coverage",
+        "date": grid.dates[d],
+        "message": f"Brak obsady {SLOT_LABELS[slot]} w dniu {grid.dates[d]}."
+    }
+
+def support_violation(grid: ScheduleGrid, d: int) -> Dict[str, Any]:
+    return {
+        "rule": "Leader Support",
+        "date": grid.dates[d],
+        "message": f"Lider (Maria) pracuje sama w dniu {grid.dates[d]}! Wymagana pomoc."
+    }
+
+def consecutive_violation(grid: ScheduleGrid, e: int, d: int) -> Dict[str, Any]:
+    """6th working day in a row at day d (the run of six started at d - 5)"""
+    return {
+        "rule": "Max Consecutive Days",
+        "employee": grid.names[e],
+        "date": grid.dates[d],
+        "message": f"Przekroczono 5 dni pracy z rzędu (od {grid.dates[d - MAX_CONSECUTIVE_DAYS]})."
+    }
+
+def leader_violation(grid: ScheduleGrid, table: ShiftTable, d: int, kind: int, code: int) -> Dict[str, Any]:
+    """kind 0 = weekend, 1 = hours outside 8:00-20:00"""
+    if kind == 0:
+        message = "Lider nie może pracować w weekendy."
+    else:
+        message = f"Lider może pracować tylko 8:00-20:00. Zmiana {table.shifts[code].id} jest niedozwolona."
+    return {
+        "rule": "Leader Rules",
+        "employee": grid.names[grid.leader],
+        "date": grid.dates[d],
+        "message": message
+    }
+
+
+def evaluate(grid: ScheduleGrid, stack: np.ndarray, table: ShiftTable) -> List[List[Dict[str, Any]]]:
+    """
+    Violations of every (employees x days) matrix in stack (shape (B, E, D)),
+    one list per matrix, in the same order as the original per-cell validator.
+    """
+    lut = table.arrays()
+    batch = stack.shape[0]
+    results: List[List[Dict[str, Any]]] = [[] for _ in range(batch)]
+    if batch == 0 or not grid.dates:
+        return results
+
+    working = lut["working"][stack]  # (B, E, D)
+
+    # 1. 11h Daily Rest
+    if stack.shape[2] > 1:
+        today, tomorrow = stack[:, :, :-1], stack[:, :, 1:]
+        gaps = lut["rest_gap"][today, tomorrow]
+        bad = working[:, :, :-1] & working[:, :, 1:] & (gaps < MIN_DAILY_REST_HOURS)
+        for b, e, d in zip(*np.nonzero(bad)):
+            results[b].append(rest_violation(grid, table, e, d, today[b, e, d], tomorrow[b, e, d], gaps[b, e, d]))
+
+    # 2. Coverage (24h): (B, D, slot)
+    missing = np.stack([
+        lut["morning"][stack].sum(axis=1) == 0,
+        lut["afternoon"][stack].sum(axis=1) == 0,
+        lut["night_cover"][stack].sum(axis=1) == 0,
+    ], axis=-1)
+    for b, d, slot in zip(*np.nonzero(missing)):
+        results[b].append(coverage_violation(grid, d, slot))
+
+    # 3. Leader Support (Maria Pankowska)
+    leader = grid.leader
+    if leader is not None:
+        leader_working = working[:, leader, :]
+        others = working.sum(axis=1) - leader_working
+        for b, d in zip(*np.nonzero(leader_working & (others == 0))):
+            results[b].append(support_violation(grid, d))
+
+    # 4. Max 5 consecutive days (co 6. dzień serii - licznik zerowany po zgłoszeniu)
+    position = _run_position(working)
+    too_long = (position > 0) & (position % (MAX_CONSECUTIVE_DAYS + 1) == 0)
+    for b, e, d in zip(*np.nonzero(too_long)):
+        results[b].append(consecutive_violation(grid, e, d))
+
+    # 5. Maria Rules (No Weekends, 8-20 only): (B, D, rule)
+    if leader is not None:
+        leader_codes = stack[:, leader, :]
+        broken = np.stack([
+            working[:, leader, :] & grid.weekend,
+            lut["leader_hours_bad"][leader_codes],
+        ], axis=-1)
+        for b, d, kind in zip(*np.nonzero(broken)):
+            results[b].append(leader_violation(grid, table, d, kind, leader_codes[b, d]))
+
+    return results
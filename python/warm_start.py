@@ -0,0 +1,143 @@
+"""
+Warm start for OR-Tools Schedule Solver
+Feeds a draft schedule (existing_schedule or a previous solver output) into
+the model as AddHint values, optionally with a soft stability term that
+penalises every (employee, date) cell changed against the draft.
+"""
+from ortools.sat.python import cp_model
+from models import SolverInput, ShiftType
+from derived_vars import DerivedVars
+from typing import Dict, Optional
+
+# {employee_id: {date: shift_id lub None = dzień wolny}}
+Hints = Dict[str, Dict[str, Optional[str]]]
+
+
+def hint_source(input_data: SolverInput) -> Optional[str]:
+    """"previous", "existing" or None when warm start is off"""
+    options = input_data.options
+    if options.previous_schedule is not None:
+        return "previous"
+    if options.warm_start:
+        return "existing"
+    return None
+
+
+def _normalize(shift_id: Optional[str]) -> Optional[str]:
+    """Shift id in catalog form, None for anything that is not a work shift"""
+    if not shift_id:
+        return None
+    try:
+        return ShiftType.from_string(shift_id).id
+    except ValueError:
+        return None
+
+
+def collect_hints(input_data: SolverInput) -> Hints:
+    """
+    Hinted value of every known (employee, date) cell.
+
+    A previous solver output lists only worked days, so for employees it
+    contains every other date in range is hinted as a day off. The existing
+    schedule hints only the dates it has entries for.
+    """
+    source = hint_source(input_data)
+    if source is None:
+        return {}
+
+    cal = input_data.calendar
+    employee_ids = {emp.id for emp in input_data.employees}
+    hints: Hints = {}
+
+    if source == "previous":
+        schedule = input_data.options.previous_schedule
+        if isinstance(schedule.get('schedule'), dict):
+            schedule = schedule['schedule']  # cały SolverOutput
+
+        for emp_id, days in schedule.items():
+            if emp_id not in employee_ids or not isinstance(days, dict):
+                continue
+            hints[emp_id] = {date_str: _normalize(days.get(date_str)) for date_str in cal.dates}
+    else:
+        for emp_id, days in input_data.get_existing_assignments().items():
+            if emp_id not in employee_ids:
+                continue
+            hints[emp_id] = {date_str: _normalize(shift_id) for date_str, shift_id in days.items()}
+
+    return hints
+
+
+def schedule_hints(schedule: Dict[str, Dict[str, str]], input_data: SolverInput) -> Hints:
+    """Solver schedule -> hints for every employee and date (missing date = day off)"""
+    return {emp.id: {date_str: schedule.get(emp.id, {}).get(date_str) for date_str in input_data.calendar.dates}
+            for emp in input_data.employees}
+
+
+def apply_hints(model: cp_model.CpModel, shifts: Dict, hints: Hints) -> int:
+    """AddHint on every free shift variable of a hinted cell. Returns the number of hinted variables"""
+    # Komórki przypięte przez availability są stałymi - podpowiedź nic nie wnosi
+    constants = {model.NewConstant(0).Index(), model.NewConstant(1).Index()}
+    hinted = 0
+
+    for emp_id, days in hints.items():
+        emp_shifts = shifts.get(emp_id, {})
+        for date_str, hinted_shift in days.items():
+            for shift_id, var in emp_shifts.get(date_str, {}).items():
+                if var.Index() in constants:
+                    continue
+                model.AddHint(var, 1 if shift_id == hinted_shift else 0)
+                hinted += 1
+
+    return hinted
+
+
+def add_stability_objective(model: cp_model.CpModel, shifts: Dict, input_data: SolverInput, derived: DerivedVars = None):
+    """Number of hinted (employee, date) cells whose final assignment differs from the hint"""
+    if input_data.options.stability_weight <= 0:
+        return None
+
+    hints = collect_hints(input_data)
+    if not hints:
+        return None
+
+    if derived is None:
+        derived = DerivedVars(model, shifts, input_data)
+
+    deviations = []
+    for emp_id, days in hints.items():
+        emp_shifts = shifts.get(emp_id, {})
+        for date_str, hinted_shift in days.items():
+            if hinted_shift is None:
+                # Dzień wolny w podpowiedzi - odchyleniem jest każda zmiana
+                working = derived.is_working(emp_id, date_str)
+                if working is not None:
+                    deviations.append(working)
+                continue
+
+            var = emp_shifts.get(date_str, {}).get(hinted_shift)
+            if var is not None:
+                deviations.append(1 - var)
+            # Zmiana spoza allowed_shifts - odchylenie stałe, pomijamy
+
+    if not deviations:
+        return None
+
+    return sum(deviations)
+
+
+def hint_survival(schedule: Dict[str, Dict[str, str]], hints: Hints) -> Dict[str, float]:
+    """How many hinted cells kept their hinted value in the final schedule"""
+    hinted_cells = kept = 0
+    for emp_id, days in hints.items():
+        final = schedule.get(emp_id, {})
+        for date_str, hinted_shift in days.items():
+            hinted_cells += 1
+            if final.get(date_str) == hinted_shift:
+                kept += 1
+
+    return {
+        "hinted_cells": hinted_cells,
+        "kept": kept,
+        "changed": hinted_cells - kept,
+        "ratio": round(kept / hinted_cells, 3) if hinted_cells else 1.0,
+    }
@@ -678,6 +678,7 @@ app.post('/api/ortools/generate-schedule', authenticateCookie, async (req, res)
         python.stdin.end();
 
         python.on('close', (code) => {
+            if (res.headersSent) return;
             if (code !== 0) {
                 console.error('Python solver failed with code:', code);
                 console.error('Error output:', errorOutput);
@@ -689,36 +690,10 @@ app.post('/api/ortools/generate-schedule', authenticateCookie, async (req, res)
             }
 
             try {
-                // Szukamy ostatniej klamry zamykającej
-                const jsonEndIndex = output.lastIndexOf('}');
-
-                if (jsonEndIndex !== -1) {
-                    // Szukamy klamry otwierającej JSON (zakładamy, że wynik to {"status":...})
-                    // Szukamy frazy "status" aby namierzyć właściwy początek
-                    const statusIndex = output.indexOf('"status"');
-
-                    // Cofamy się od "status" do najbliższej klamry {
-                    let jsonStartIndex = -1;
-                    if (statusIndex !== -1) {
-                        jsonStartIndex = output.lastIndexOf('{', statusIndex);
-                    }
-
-                    // Zabezpieczenie: jeśli nie znaleziono przez "status", bierzemy pierwszą klamrę (jak dawniej)
-                    if (jsonStartIndex === -1) {
-                        jsonStartIndex = output.indexOf('{');
-                    }
-
-                    if (jsonStartIndex !== -1) {
-                        const jsonString = output.substring(jsonStartIndex, jsonEndIndex + 1);
-                        const result = JSON.parse(jsonString);
-                        console.log('Solver result status:', result.status);
-                        res.json(result);
-                    } else {
-                        throw new Error('No JSON start found');
-                    }
-                } else {
-                    throw new Error('No JSON end found');
-                }
+                // stdout zawiera wyłącznie wynik JSON (logi idą na stderr)
+                const result = JSON.parse(output);
+                console.log('Solver result status:', result.status);
+                res.json(result);
             } catch (err) {
                 console.error('Failed to parse Python output:', err);
                 console.error('Raw output (first 500 chars):', output.substring(0, 500));
@@ -730,16 +705,23 @@ app.post('/api/ortools/generate-schedule', authenticateCookie, async (req, res)
             }
         });
 
-        // Timeout after 2 minutes
+        // Timeout: SIGTERM stops the search and the solver answers with the best
+        // schedule found so far; SIGKILL only if it does not finish within the grace period
+        let killTimer = null;
         const timeout = setTimeout(() => {
-            python.kill();
-            if (!res.headersSent) {
-                res.status(408).json({ error: 'Solver timeout (2 minutes)' });
-            }
+            console.log('Solver timeout - requesting the best schedule found so far');
+            python.kill('SIGTERM');
+            killTimer = setTimeout(() => {
+                python.kill('SIGKILL');
+                if (!res.headersSent) {
+                    res.status(408).json({ error: 'Solver timeout' });
+                }
+            }, 15000);
         }, 400000);
 
         python.on('close', () => {
             clearTimeout(timeout);
+            clearTimeout(killTimer);
         });
 
     } catch (error) {
@@ -748,6 +730,63 @@ app.post('/api/ortools/generate-schedule', authenticateCookie, async (req, res)
     }
 });
 
+// ============================================================================
+// Solver progress events - NDJSON on file descriptor 3 (scheduler_solver.py --events 3)
+// ============================================================================
+function readSolverEvents(stream, onEvent) {
+    let buffer = '';
+    stream.on('data', (chunk) => {
+        buffer += chunk.toString();
+        let newline;
+        while ((newline = buffer.indexOf('\n')) !== -1) {
+            const line = buffer.slice(0, newline);
+            buffer = buffer.slice(newline + 1);
+            if (!line.trim()) continue;
+            try {
+                onEvent(JSON.parse(line));
+            } catch (err) {
+                console.error('Invalid solver event:', line.substring(0, 200));
+            }
+        }
+    });
+}
+
+function describeSolverEvent(event) {
+    switch (event.event) {
+        case 'parse':
+            return `Parsing input (${event.employees} employees, ${event.days} days)...`;
+        case 'build':
+            return event.phase === 'model'
+                ? `Model built (${event.variables} variables, ${event.constraints} constraints)`
+                : 'Creating variables...';
+        case 'group':
+            return 'Adding constraints...';
+        case 'cache':
+            return 'Result found in cache';
+        case 'window':
+            return `Solving window ${event.n}/${event.total} (${event.start} - ${event.end})...`;
+        case 'solve':
+            return 'Searching for optimal solution...';
+        case 'incumbent':
+            return `🔍 Solution #${event.n} found | Score: ${event.objective} | Time: ${event.wall_time.toFixed(1)}s`;
+        case 'schedule':
+            return event.phase === 'feasible'
+                ? '📋 First feasible schedule ready - optimising...'
+                : null;
+        case 'early_stop':
+            if (event.reason === 'gap') {
+                return `🎯 Early stop! Within ${(event.gap * 100).toFixed(2)}% of optimum (score: ${event.objective})`;
+            }
+            return event.reason === 'score_threshold'
+                ? `🎯 Early stop! Final score: ${event.objective}`
+                : '⏱️ Early stop (no improvement)';
+        case 'final':
+            return `Solver finished: ${event.status}`;
+        default:
+            return null;
+    }
+}
+
 // ============================================================================
 // 🆕 ASYNC JOB PATTERN - Solver Jobs Storage
 // ============================================================================
@@ -781,7 +820,9 @@ app.post('/api/ortools/start-job', authenticateCookie, async (req, res) => {
         employees,
         constraints,
         demand,
-        existingSchedule
+        existingSchedule,
+        twoPhase = false,
+        streamSchedules = 'diff'
     } = req.body;
 
     console.log(`🚀 Starting solver job: ${jobId}`);
@@ -811,7 +852,9 @@ app.post('/api/ortools/start-job', authenticateCookie, async (req, res) => {
                 constraints: allConstraints,
                 dateRange,
                 demand: demand || {},
-                existingSchedule: existingSchedule || {}
+                existingSchedule: existingSchedule || {},
+                // twoPhase: najpierw szybki grafik (same reguły twarde), potem poprawy jako zdarzenia "schedule"
+                options: { twoPhase: Boolean(twoPhase), streamSchedules }
             };
 
             // Update progress
@@ -828,10 +871,27 @@ app.post('/api/ortools/start-job', authenticateCookie, async (req, res) => {
             );
             const scriptPath = path.join(__dirname, 'python', 'scheduler_solver.py');
 
-            const python = spawn(pythonPath, [scriptPath], {
-                cwd: path.join(__dirname, 'python')
+            // fd 3 = zdarzenia postępu (NDJSON), stdout = wynik, stderr = logi
+            const python = spawn(pythonPath, [scriptPath, '--events', '3'], {
+                cwd: path.join(__dirname, 'python'),
+                stdio: ['pipe', 'pipe', 'pipe', 'pipe']
             });
 
+            readSolverEvents(python.stdio[3], (event) => {
+                const job = solverJobs.get(jobId);
+                const progress = describeSolverEvent(event);
+                if (job && progress) {
+                    job.progress = progress;
+                }
+                if (job && event.event === 'incumbent') {
+                    job.lastIncumbent = { n: event.n, objective: event.objective, bound: event.bound, time: event.wall_time };
+                }
+                if (job && event.event === 'schedule') {
+                    job.incumbent = applyScheduleEvent(job.incumbent, event);
+                }
+            });
+            solverJobs.get(jobId).python = python;
+
             let output = '';
             let errorOutput = '';
 
@@ -840,32 +900,7 @@ app.post('/api/ortools/start-job', authenticateCookie, async (req, res) => {
             });
 
             python.stderr.on('data', (data) => {
-                const msg = data.toString();
-                errorOutput += msg;
-
-                // Update progress from stderr logs
-                if (msg.includes('Solving...')) {
-                    solverJobs.get(jobId).progress = 'Searching for optimal solution...';
-                } else if (msg.includes('Adding constraints')) {
-                    solverJobs.get(jobId).progress = 'Adding constraints...';
-                } else if (msg.includes('Solution #')) {
-                    // 🆕 Parse solution progress: "Solution #5: score=780, time=142.8s"
-                    const match = msg.match(/Solution #(\d+): score=(\d+), time=([\d.]+)s/);
-                    if (match) {
-                        const [_, solutionNum, score, time] = match;
-                        solverJobs.get(jobId).progress = `🔍 Solution #${solutionNum} found | Score: ${score} | Time: ${time}s`;
-                    }
-                } else if (msg.includes('Early stop!')) {
-                    // 🆕 Parse early stop message
-                    if (msg.includes('Score')) {
-                        const match = msg.match(/score.*?(\d+)/i);
-                        if (match) {
-                            solverJobs.get(jobId).progress = `🎯 Early stop! Final score: ${match[1]}`;
-                        }
-                    } else {
-                        solverJobs.get(jobId).progress = '⏱️ Early stop (no improvement)';
-                    }
-                }
+                errorOutput += data.toString();
             });
 
             python.stdin.write(JSON.stringify(solverInput));
@@ -884,29 +919,13 @@ app.post('/api/ortools/start-job', authenticateCookie, async (req, res) => {
                 }
 
                 try {
-                    const jsonEndIndex = output.lastIndexOf('}');
-                    const statusIndex = output.indexOf('"status"');
-                    let jsonStartIndex = -1;
-
-                    if (statusIndex !== -1) {
-                        jsonStartIndex = output.lastIndexOf('{', statusIndex);
-                    }
-
-                    if (jsonStartIndex === -1) {
-                        jsonStartIndex = output.indexOf('{');
-                    }
+                    // stdout zawiera wyłącznie wynik JSON
+                    const result = JSON.parse(output);
 
-                    if (jsonStartIndex !== -1 && jsonEndIndex !== -1) {
-                        const jsonString = output.substring(jsonStartIndex, jsonEndIndex + 1);
-                        const result = JSON.parse(jsonString);
-
-                        job.status = 'completed';
-                        job.result = result;
-                        job.progress = 'Complete';
-                        console.log(`✅ Job ${jobId} completed: ${result.status}`);
-                    } else {
-                        throw new Error('No valid JSON found');
-                    }
+                    job.status = 'completed';
+                    job.result = result;
+                    job.progress = 'Complete';
+                    console.log(`✅ Job ${jobId} completed: ${result.status}`);
                 } catch (err) {
                     job.status = 'failed';
                     job.error = 'Invalid JSON from solver: ' + err.message;
@@ -927,6 +946,28 @@ app.post('/api/ortools/start-job', authenticateCookie, async (req, res) => {
     })();
 });
 
+// Najlepszy dotąd grafik z zdarzeń "schedule" (pełny albo zmiany względem poprzedniego)
+function applyScheduleEvent(incumbent, event) {
+    let schedule;
+    if (event.mode === 'full' || !incumbent) {
+        schedule = event.schedule || {};
+    } else {
+        schedule = { ...incumbent.schedule };
+        for (const [employeeId, cells] of Object.entries(event.changes || {})) {
+            const days = { ...(schedule[employeeId] || {}) };
+            for (const [date, shiftId] of Object.entries(cells)) {
+                if (shiftId === null) {
+                    delete days[date];
+                } else {
+                    days[date] = shiftId;
+                }
+            }
+            schedule[employeeId] = days;
+        }
+    }
+    return { n: event.n, objective: event.objective, bound: event.bound, time: event.wall_time, schedule };
+}
+
 // ============================================================================
 // 🆕 ASYNC ENDPOINT 2: Check Job Status
 // ============================================================================
@@ -944,6 +985,8 @@ app.get('/api/ortools/job-status/:jobId', authenticateCookie, (req, res) => {
         jobId,
         status: job.status,
         progress: job.progress,
+        lastIncumbent: job.lastIncumbent || null,
+        incumbentAvailable: Boolean(job.incumbent),
         elapsed,
         completed: job.status === 'completed' || job.status === 'failed'
     });
@@ -961,9 +1004,11 @@ app.get('/api/ortools/job-result/:jobId', authenticateCookie, (req, res) => {
     }
 
     if (job.status === 'running') {
+        // Najlepszy dotąd grafik - planista może go przyjąć przed końcem (job-accept)
         return res.status(202).json({
             message: 'Job still running',
-            progress: job.progress
+            progress: job.progress,
+            incumbent: job.incumbent || null
         });
     }
 
@@ -981,6 +1026,26 @@ app.get('/api/ortools/job-result/:jobId', authenticateCookie, (req, res) => {
     // solverJobs.delete(jobId);
 });
 
+// ============================================================================
+// 🆕 ASYNC ENDPOINT 4: Accept the current incumbent
+// SIGTERM stops the search; the solver returns its best schedule as the job result
+// ============================================================================
+app.post('/api/ortools/job-accept/:jobId', authenticateCookie, (req, res) => {
+    const { jobId } = req.params;
+    const job = solverJobs.get(jobId);
+
+    if (!job) {
+        return res.status(404).json({ error: 'Job not found' });
+    }
+    if (job.status !== 'running' || !job.python) {
+        return res.status(409).json({ error: 'Job is not running', status: job.status });
+    }
+
+    job.python.kill('SIGTERM');
+    job.progress = 'Stopping - keeping the best schedule found so far...';
+    res.json({ jobId, status: 'stopping' });
+});
+
 // ============================================================================
 
 // OR-Tools Schedule Validator - Checks specific rules and returns violations
@@ -1047,6 +1112,90 @@ app.post('/api/ortools/validate', authenticateCookie, async (req, res) => {
     }
 });
 
+// ============================================================================
+// Incremental validation - one long-lived `validator.py --worker` process keeps
+// edit sessions; a grid edit sends only the changed cells and gets back the
+// added/removed violations
+// ============================================================================
+let validatorWorker = null;
+let validatorRequestId = 0;
+const validatorPending = new Map(); // request id -> { resolve, reject, timer }
+
+async function getValidatorWorker() {
+    if (validatorWorker) return validatorWorker;
+
+    const { spawn } = await import('child_process');
+    const isWindows = process.platform === 'win32';
+    const pythonPath = process.env.PYTHON_PATH || path.join(
+        __dirname,
+        'python',
+        'venv',
+        isWindows ? 'Scripts' : 'bin',
+        isWindows ? 'python.exe' : 'python3'
+    );
+    const worker = spawn(pythonPath, [path.join(__dirname, 'python', 'validator.py'), '--worker'], {
+        cwd: path.join(__dirname, 'python')
+    });
+
+    // Odpowiedzi to NDJSON, tak jak zdarzenia solvera
+    readSolverEvents(worker.stdout, (response) => {
+        const pending = validatorPending.get(response.id);
+        if (!pending) return;
+        validatorPending.delete(response.id);
+        clearTimeout(pending.timer);
+        pending.resolve(response);
+    });
+    worker.stderr.on('data', (data) => {
+        const text = data.toString().trim();
+        if (text) console.error('Validator worker:', text);
+    });
+    worker.on('close', (code) => {
+        console.error(`Validator worker exited (code ${code})`);
+        if (validatorWorker === worker) validatorWorker = null;
+        for (const pending of validatorPending.values()) {
+            clearTimeout(pending.timer);
+            pending.reject(new Error('Validator worker exited'));
+        }
+        validatorPending.clear();
+    });
+
+    validatorWorker = worker;
+    return worker;
+}
+
+async function sendToValidatorWorker(request, timeoutMs = 10000) {
+    const worker = await getValidatorWorker();
+    const id = ++validatorRequestId;
+    return new Promise((resolve, reject) => {
+        const timer = setTimeout(() => {
+            validatorPending.delete(id);
+            reject(new Error('Validator worker timeout'));
+        }, timeoutMs);
+        validatorPending.set(id, { resolve, reject, timer });
+        worker.stdin.write(JSON.stringify({ ...request, id }) + '\n');
+    });
+}
+
+// op: "open" (input = jak dla /api/ortools/validate), "edit" (cells), "close"
+app.post('/api/ortools/validate/session', authenticateCookie, async (req, res) => {
+    const { op, session, input, cells } = req.body;
+    if (!['open', 'edit', 'close'].includes(op) || !session) {
+        return res.status(400).json({ error: 'op (open/edit/close) and session are required' });
+    }
+
+    try {
+        const result = await sendToValidatorWorker({ op, session, input, cells });
+        if (result.status === 'ERROR') {
+            // np. nieznana sesja po restarcie workera - klient otwiera ją ponownie
+            return res.status(409).json(result);
+        }
+        res.json(result);
+    } catch (error) {
+        console.error('Validator session error:', error);
+        res.status(500).json({ error: 'Failed to validate schedule edit', details: error.message });
+    }
+});
+
 /**
  * Merge absences from existing schedule into constraints
  */